@@ -0,0 +1,95 @@
+"""
+Run the benchmark suite.
+
+    python -m benchmarks                          # default sizes, compared to benchmarks/baseline.json
+    python -m benchmarks --sizes 1000 10000 100000 1000000
+    python -m benchmarks --suite functions --generators grid --operations shortest_path diameter
+    python -m benchmarks --save-baseline          # record the current timings as the baseline
+
+Exits with status 1 when a benchmark regressed against the baseline.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from .generators import GENERATORS, generate_csv
+from .runner import REGRESSION_RATIO, compare, format_comparison, load_report, new_report, save_report
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+# Edge counts of the generated graphs when --sizes is not given
+DEFAULT_SIZES = [1000, 10000]
+
+# The generated graphs that are directed
+DIRECTED_GENERATORS = {"airport"}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark functions.* and the API routes.")
+    parser.add_argument("--suite", choices=["all", "functions", "api"], default="all")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="edge counts of the generated graphs")
+    parser.add_argument("--generators", nargs="+", choices=sorted(GENERATORS), default=list(GENERATORS))
+    parser.add_argument("--operations", nargs="+", help="only run these functions.* operations")
+    parser.add_argument("--routes", nargs="+", help="only run these routes")
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark-results.json", help="where the results are written")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="the report compared against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the baseline instead of comparing")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO, help="slowdown ratio flagged as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # The API suite runs from a temporary directory
+    args.output, args.baseline = os.path.abspath(args.output), os.path.abspath(args.baseline)
+    report = new_report({"suite": args.suite, "sizes": args.sizes, "generators": args.generators,
+                         "repeat": args.repeat, "seed": args.seed})
+    graphs = [(kind, edges, generate_csv(kind, edges, args.seed), kind in DIRECTED_GENERATORS)
+              for kind in args.generators for edges in args.sizes]
+
+    if args.suite in ("all", "functions"):
+        from .bench_functions import run_functions
+        for kind, edges, csv, directed in graphs:
+            print(f"functions: {kind} {edges} edges", file=sys.stderr)
+            run_functions(report, kind, edges, csv, directed, args.repeat, args.operations)
+
+    if args.suite in ("all", "api"):
+        # The application keeps its database and rendered images in the working directory
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                from fastapi.testclient import TestClient
+                import main as application
+                from .bench_api import run_api
+                with TestClient(application.app) as client:
+                    for kind, edges, csv, directed in graphs:
+                        print(f"api: {kind} {edges} edges", file=sys.stderr)
+                        run_api(report, client, kind, edges, csv, directed, args.repeat, args.routes, args.seed)
+            finally:
+                os.chdir(cwd)
+
+    if args.save_baseline:
+        save_report(report, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    save_report(report, args.output)
+    print(f"Results written to {args.output}")
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with, run with --save-baseline to record one.")
+        return 0
+    rows = compare(report, load_report(args.baseline), args.ratio)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row[4] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.ratio}x.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
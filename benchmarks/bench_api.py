@@ -0,0 +1,101 @@
+import json
+import random
+import time
+
+from .runner import measure
+
+# Largest graph, in edges, each route is run on; routes not listed have no limit
+MAX_EDGES = {
+    "adjacency-matrix": 20000,
+    "incidence-matrix": 100000,
+    "get-image-graph": 5000,
+    "get-layout": 100000,
+    "get-radius": 100000,
+    "get-diameter": 100000,
+}
+
+
+def _routes(id, source, target, csv):
+    """
+    The requests of the benchmarked routes, as (name, method, url, keyword arguments of the client call).
+
+    Reads come first and mutations last, so reads are not timed against a
+    version bump that invalidated the caches.
+    """
+    graph = {"params": {"id": id}}
+    node = {"params": {"id": id}, "data": {"node": source}}
+    pair = {"params": {"id": id}, "data": {"source": source, "target": target}}
+    return [
+        ("create-graph", "POST", "/create-graph/", {"files": {"file": ("graph.csv", csv)}}),
+        ("get-graph", "GET", "/get-graph/", graph),
+        ("get-graph-changes", "GET", "/get-graph-changes/", {"params": {"id": id, "since": 0}}),
+        ("get-order", "GET", "/get-order/", graph),
+        ("get-size", "GET", "/get-size/", graph),
+        ("get-degree", "GET", "/get-degree/", graph),
+        ("get-adjacent-edges", "GET", "/get-adjacent-edges/", node),
+        ("get-adjacent-degree", "GET", "/get-adjacent-degree/", node),
+        ("is-node-pendent", "GET", "/is-node-pendent/", node),
+        ("get-has-edge", "GET", "/get-has-edge/", pair),
+        ("get-shortest-path", "GET", "/get-shortest-path/", pair),
+        ("get-shortest-paths", "POST", "/get-shortest-paths/",
+         {"params": {"id": id}, "data": {"pairs": json.dumps([[source, target], [target, source]])}}),
+        ("get-eccentricity-node", "GET", "/get-eccentricity-node/", node),
+        ("is-eulerian", "GET", "/is-eulerian/", graph),
+        ("is-semi-eulerian", "GET", "/is-semi-eulerian/", graph),
+        ("get-radius", "GET", "/get-radius/", graph),
+        ("get-diameter", "GET", "/get-diameter/", graph),
+        ("adjacency-matrix", "GET", "/adjacency-matrix/", graph),
+        ("incidence-matrix", "GET", "/incidence-matrix/", graph),
+        ("adjacency-list", "GET", "/adjacency-list/", graph),
+        ("get-layout", "GET", "/get-layout/", graph),
+        ("get-image-graph", "GET", "/get-image-graph/", graph),
+        ("get-graphs", "GET", "/get-graphs/", {}),
+        ("list-graphs", "GET", "/list-graphs/", {}),
+        ("cache-stats", "GET", "/cache-stats/", {}),
+        ("metrics", "GET", "/metrics", {}),
+        ("add-node", "PUT", "/add-node/", {"params": {"id": id}, "data": {"node": "benchmark-node"}}),
+        ("add-edge", "PUT", "/add-edge/", {"params": {"id": id}, "data": {"source": source, "target": "benchmark-node", "weight": "1"}}),
+        ("add-edges", "PUT", "/add-edges/",
+         {"params": {"id": id}, "data": {"edges": "source,target,weight\n" + "\n".join(f"{source},benchmark-{i},1" for i in range(100))}}),
+    ]
+
+
+def run_api(report, client, kind, edges, csv, directed, repeat, routes=None, seed=0):
+    """
+    Time the main.py routes on one generated graph into a report, through the ASGI test client.
+
+    Each route records its first call separately ("first"), since most
+    reads are served from a cache afterwards.
+
+    Parameters:
+    - report: The report the results are added to.
+    - client: The fastapi.testclient.TestClient of the application.
+    - kind: The generator name.
+    - edges: The requested number of edges.
+    - csv: The CSV edge list.
+    - directed: True if the graph is directed.
+    - repeat: The number of timed calls per route, after the first one.
+    - routes: The route names to run (default is all of them).
+    - seed: The random seed used to pick the queried nodes.
+    """
+    response = client.post("/create-graph/", files={"file": ("graph.csv", csv)}, data={"directed": str(directed).lower()})
+    id = response.json()["id"]
+    nodes = [line.split(",", 2)[0] for line in csv.splitlines()[1:]]
+    source, target = random.Random(seed).sample(sorted(set(nodes)), 2)
+    for name, method, url, arguments in _routes(id, source, target, csv):
+        if routes and name not in routes:
+            continue
+        if name in MAX_EDGES and edges > MAX_EDGES[name]:
+            continue
+
+        def call():
+            response = client.request(method, url, **arguments)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} failed with {response.status_code}: {response.text[:200]}")
+
+        start = time.perf_counter()
+        call()
+        first = time.perf_counter() - start
+        result = measure(call, repeat)
+        result["first"] = first
+        report["results"][f"api/{name}/{kind}/{edges}"] = result
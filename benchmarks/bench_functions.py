@@ -0,0 +1,90 @@
+import os
+import random
+import tempfile
+from io import StringIO
+
+import networkx as nx
+
+from src import export, functions
+
+from .runner import measure
+
+# Largest graph, in edges, each operation is run on; None means no limit
+MAX_EDGES = {
+    "csv_ingest": None,
+    "json_round_trip": None,
+    "shortest_path": None,
+    "eccentricity_node": None,
+    "radius": 100000,
+    "diameter": 100000,
+    "adjacency_matrix": 20000,
+    "sparse_adjacency_matrix": None,
+    "image": 5000,
+}
+
+
+def largest_component(graph):
+    """
+    Get the largest connected (strongly, if directed) component, where distances are all finite.
+    """
+    components = nx.strongly_connected_components(graph) if graph.is_directed() else nx.connected_components(graph)
+    return graph.subgraph(max(components, key=len)).copy()
+
+
+def function_cases(csv, directed, seed=0):
+    """
+    Build the functions.* operations benchmarked on one graph.
+
+    Distance queries run on the largest component, so they measure a
+    search instead of an early "not connected" error.
+
+    Parameters:
+    - csv: The CSV edge list.
+    - directed: True if the graph is directed.
+    - seed: The random seed used to pick the queried nodes.
+
+    Returns:
+    - graph: The NetworkX graph.
+    - cases: The operations, by name, as functions without arguments.
+    """
+    graph, _ = functions.build_graph_from_csv(StringIO(csv), directed)
+    component = largest_component(graph)
+    source, target = random.Random(seed).sample(sorted(component), 2)
+    image_path = os.path.join(tempfile.gettempdir(), "benchmark-graph.png")
+    cases = {
+        "csv_ingest": lambda: functions.build_csr_from_csv(StringIO(csv), directed),
+        "json_round_trip": lambda: functions.convert_json_to_graph(functions.convert_graph_to_json(graph)),
+        "shortest_path": lambda: functions.get_shortest_path(component, source, target),
+        "eccentricity_node": lambda: functions.get_eccentricity_node(component, source),
+        "radius": lambda: functions.get_radius(component),
+        "diameter": lambda: functions.get_diameter(component),
+        # The dense matrix as the adjacency-matrix endpoint streams it
+        "adjacency_matrix": lambda: b"".join(export.stream_dense({"nodes": list(graph.nodes)}, export.adjacency_matrix(graph))),
+        "sparse_adjacency_matrix": lambda: export.adjacency_matrix(graph),
+        "image": lambda: functions.generate_image_from_graph(graph, directed, image_path),
+    }
+    return graph, cases
+
+
+def run_functions(report, kind, edges, csv, directed, repeat, operations=None):
+    """
+    Time the functions.* operations on one generated graph into a report.
+
+    Parameters:
+    - report: The report the results are added to.
+    - kind: The generator name.
+    - edges: The requested number of edges.
+    - csv: The CSV edge list.
+    - directed: True if the graph is directed.
+    - repeat: The number of timed calls per operation.
+    - operations: The operation names to run (default is all of them).
+    """
+    graph, cases = function_cases(csv, directed)
+    for name, case in cases.items():
+        if operations and name not in operations:
+            continue
+        if MAX_EDGES[name] is not None and edges > MAX_EDGES[name]:
+            continue
+        result = measure(case, repeat)
+        result.update(nodes=graph.number_of_nodes(), edges=graph.number_of_edges())
+        report["results"][f"functions/{name}/{kind}/{edges}"] = result
@@ -0,0 +1,146 @@
+import itertools
+import string
+
+import numpy as np
+import pandas as pd
+
+# Average degree of the random graphs, so their node count follows the edge count
+AVERAGE_DEGREE = 8
+
+
+def _edge_list(sources, targets, weights, labels, columns=("source", "target", "weight")):
+    labels = np.asarray(labels, dtype=object)
+    return pd.DataFrame({columns[0]: labels[sources], columns[1]: labels[targets], columns[2]: weights})
+
+
+def _node_labels(n):
+    return [f"n{i}" for i in range(n)]
+
+
+def erdos_renyi(edges, seed=0):
+    """
+    Generate a G(n, m) random graph with weighted edges.
+
+    Parameters:
+    - edges: The number of edges.
+    - seed: The random seed.
+
+    Returns:
+    - df: The edge list, with source, target and weight columns.
+    """
+    rng = np.random.default_rng(seed)
+    n = max(2, 2 * edges // AVERAGE_DEGREE)
+    sources = rng.integers(0, n, edges)
+    # An offset in [1, n) never draws a self-loop
+    targets = (sources + rng.integers(1, n, edges)) % n
+    return _edge_list(sources, targets, rng.integers(1, 100, edges), _node_labels(n))
+
+
+def scale_free(edges, seed=0):
+    """
+    Generate a Barabási–Albert preferential attachment graph with weighted edges.
+
+    Each new node links to AVERAGE_DEGREE / 2 targets drawn proportionally
+    to their degree, by sampling endpoints of the edges added so far.
+
+    Parameters:
+    - edges: The number of edges (approximately).
+    - seed: The random seed.
+
+    Returns:
+    - df: The edge list, with source, target and weight columns.
+    """
+    rng = np.random.default_rng(seed)
+    m = AVERAGE_DEGREE // 2
+    n = max(m + 1, edges // m + m)
+    # Node m links to the m seed nodes, every later node to m nodes drawn by degree
+    sources = np.repeat(np.arange(m, n), m)
+    targets = np.empty(len(sources), dtype=np.int64)
+    # Endpoints of every edge so far; a uniform draw from it is a degree-proportional draw of a node
+    endpoints = np.empty(2 * len(sources), dtype=np.int64)
+    chosen = np.arange(m)
+    for i in range(n - m):
+        targets[i * m:(i + 1) * m] = chosen
+        endpoints[2 * i * m:(2 * i + 1) * m] = m + i
+        endpoints[(2 * i + 1) * m:(2 * i + 2) * m] = chosen
+        chosen = endpoints[rng.integers(0, (2 * i + 2) * m, m)]
+    return _edge_list(sources, targets, rng.integers(1, 100, len(sources)), _node_labels(n))
+
+
+def grid(edges, seed=0):
+    """
+    Generate a square grid graph with weighted edges.
+
+    Parameters:
+    - edges: The number of edges (approximately).
+    - seed: The random seed of the weights.
+
+    Returns:
+    - df: The edge list, with source, target and weight columns.
+    """
+    rng = np.random.default_rng(seed)
+    side = max(2, int(round((1 + (1 + 2 * edges) ** 0.5) / 2)))
+    ids = np.arange(side * side).reshape(side, side)
+    sources = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    targets = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    return _edge_list(sources, targets, rng.integers(1, 100, len(sources)), _node_labels(side * side))
+
+
+def _airport_codes(n):
+    letters = string.ascii_uppercase
+    width = 3
+    while len(letters) ** width < n:
+        width += 1
+    return ["".join(code) for code in itertools.islice(itertools.product(letters, repeat=width), n)]
+
+
+def airport(edges, seed=0):
+    """
+    Generate a directed flight network shaped like airport.original.csv, scaled up.
+
+    Airports get Zipf-distributed traffic, so a few hubs serve most
+    routes, and the flight time of a route grows with the distance between
+    its airports on a plane.
+
+    Parameters:
+    - edges: The number of routes (before duplicate routes are merged).
+    - seed: The random seed.
+
+    Returns:
+    - df: The route list, with From, To and Time columns.
+    """
+    rng = np.random.default_rng(seed)
+    n = max(2, 2 * edges // AVERAGE_DEGREE)
+    traffic = 1.0 / np.arange(1, n + 1) ** 0.9
+    traffic /= traffic.sum()
+    sources = rng.choice(n, edges, p=traffic)
+    targets = rng.choice(n, edges, p=traffic)
+    loops = sources == targets
+    targets[loops] = (targets[loops] + 1) % n
+    position = rng.uniform(0, 4000, (n, 2))
+    distance = np.linalg.norm(position[sources] - position[targets], axis=1)
+    times = (30 + distance / 13).astype(np.int64)
+    return _edge_list(sources, targets, times, _airport_codes(n), columns=("From", "To", "Time"))
+
+
+GENERATORS = {
+    "erdos_renyi": erdos_renyi,
+    "scale_free": scale_free,
+    "grid": grid,
+    "airport": airport,
+}
+
+
+def generate_csv(kind, edges, seed=0):
+    """
+    Generate a graph as a CSV edge list, as uploaded to /create-graph/.
+
+    Parameters:
+    - kind: The generator, one of GENERATORS.
+    - edges: The number of edges.
+    - seed: The random seed.
+
+    Returns:
+    - csv: The CSV text.
+    """
+    return GENERATORS[kind](edges, seed).to_csv(index=False)
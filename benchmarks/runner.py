@@ -0,0 +1,115 @@
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+# A result is a regression when its median is this many times the baseline one
+REGRESSION_RATIO = 1.25
+
+# Slowdowns smaller than this many seconds are timer noise, never regressions
+REGRESSION_MIN_SECONDS = 0.005
+
+
+def measure(function, repeat=5, warmup=0):
+    """
+    Time a function.
+
+    Parameters:
+    - function: The function, without arguments.
+    - repeat: The number of timed calls.
+    - warmup: The number of untimed calls made first.
+
+    Returns:
+    - timing: The median, min and max seconds of the timed calls, and their number.
+    """
+    for _ in range(warmup):
+        function()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return {
+        "median": statistics.median(seconds),
+        "min": min(seconds),
+        "max": max(seconds),
+        "runs": len(seconds),
+    }
+
+
+def new_report(config):
+    """
+    Start a benchmark report.
+
+    Parameters:
+    - config: The run parameters (sizes, generators, repeat, ...).
+
+    Returns:
+    - report: The report, with its environment and an empty result table.
+    """
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": config,
+        "results": {},
+    }
+
+
+def save_report(report, path):
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def load_report(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def compare(report, baseline, ratio=REGRESSION_RATIO, min_seconds=REGRESSION_MIN_SECONDS):
+    """
+    Compare the median timings of a report with a baseline report.
+
+    Parameters:
+    - report: The new report.
+    - baseline: The baseline report.
+    - ratio: The slowdown ratio flagged as a regression.
+    - min_seconds: The smallest slowdown, in seconds, flagged as a regression.
+
+    Returns:
+    - rows: One (key, baseline median, new median, ratio, status) tuple per
+      benchmark of the new report; status is "regression", "improvement",
+      "ok" or "new".
+    """
+    rows = []
+    for key, result in sorted(report["results"].items()):
+        base = baseline["results"].get(key)
+        if base is None:
+            rows.append((key, None, result["median"], None, "new"))
+            continue
+        change = result["median"] / base["median"] if base["median"] > 0 else float("inf")
+        delta = result["median"] - base["median"]
+        if change > ratio and delta > min_seconds:
+            status = "regression"
+        elif change < 1 / ratio and -delta > min_seconds:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((key, base["median"], result["median"], change, status))
+    return rows
+
+
+def format_comparison(rows):
+    """
+    Format a comparison as a text table.
+    """
+    width = max([len(row[0]) for row in rows] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline':>10}  {'new':>10}  {'ratio':>6}  status"]
+    for key, base, new, change, status in rows:
+        base = f"{base * 1000:.2f}ms" if base is not None else "-"
+        change = f"{change:.2f}" if change is not None else "-"
+        lines.append(f"{key:<{width}}  {base:>10}  {new * 1000:>8.2f}ms  {change:>6}  {status}")
+    return "\n".join(lines)
@@ -29,6 +29,27 @@ export const getGraph = async (graphId) => {
   }
 };
 
+export const getLayout = async (graphId, viewport = {}, maxNodes = 500) => {
+  const params = new URLSearchParams({ id: graphId, max_nodes: maxNodes });
+  Object.entries(viewport).forEach(([key, value]) => {
+    if (value !== undefined && value !== null) {
+      params.append(key, value);
+    }
+  });
+  try {
+    const response = await axios.get(
+      `http://localhost:8000/get-layout/?${params.toString()}`
+    );
+    if (response.data.nodes) {
+      return response.data;
+    } else {
+      return null;
+    }
+  } catch (error) {
+    return null;
+  }
+};
+
 export const addNode = async (graphId, node) => {
     var bodyFormData = new FormData();
     bodyFormData.append("node", node);
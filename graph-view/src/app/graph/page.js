@@ -2,7 +2,31 @@
 import { useRouter, useSearchParams } from "next/navigation";
 import React, { useEffect, useState } from "react";
 import CytoscapeComponent from "react-cytoscapejs";
-import { addNode, generateNodePositions, getGraph } from "../api";
+import { addNode, generateNodePositions, getLayout } from "../api";
+
+// Layout coordinates are in [-1, 1], scaled to pixels for display
+const LAYOUT_SCALE = 500;
+
+const toElements = (layout) => {
+  const nodeId = (node) =>
+    layout.level === "communities" ? `community-${node.community}` : node.id;
+  const nodes = layout.nodes.map((node) => ({
+    data: {
+      id: nodeId(node),
+      label: layout.level === "communities" ? `${node.size} nodes` : node.id,
+    },
+    position: { x: node.x * LAYOUT_SCALE, y: node.y * LAYOUT_SCALE },
+    style: { backgroundColor: "blue" },
+  }));
+  const edges = layout.edges.map((edge) => ({
+    data: {
+      source: layout.level === "communities" ? `community-${edge.source}` : edge.source,
+      target: layout.level === "communities" ? `community-${edge.target}` : edge.target,
+      label: layout.level === "communities" ? edge.count : edge.weight,
+    },
+  }));
+  return [...nodes, ...edges];
+};
 
 export default function Graph() {
   const router = useRouter();
@@ -32,28 +56,9 @@ export default function Graph() {
 
   useEffect(() => {
     const fetchGraph = async () => {
-      const graph = await getGraph(graphId);
-      if (graph) {
-        const positions = generateNodePositions(graph.nodes);
-        const nodes = graph.nodes.map((node) => {
-          const position = positions.find((pos) => pos.id === node.id);
-          return {
-            data: { id: node.id, label: node.id },
-            position: { x: position.x, y: position.y },
-            style: { backgroundColor: "blue" },
-          };
-        });
-
-        const edges = graph.links.map((edge) => {
-          return {
-            data: {
-              source: edge.source,
-              target: edge.target,
-              label: edge.weight,
-            },
-          };
-        });
-        setGraphData([...nodes, ...edges]);
+      const layout = await getLayout(graphId);
+      if (layout) {
+        setGraphData(toElements(layout));
       }
     };
 
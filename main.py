@@ -1,15 +1,37 @@
-from fastapi import FastAPI, Form, File, UploadFile, Depends
+from fastapi import FastAPI, Form, File, UploadFile, Depends, BackgroundTasks, Query, Header, WebSocket, WebSocketDisconnect
 from typing import Annotated
-from src import functions
-from src.db.database import engine, Base, get_db
+import json
+from src import functions, export, render, columnar
+from src.db.database import engine, async_engine, async_write_engine, Base, SessionLocal, get_db, get_async_db, get_async_write_db, migrate
 from src.models.graphs import Graph
-from src.dao.graphs import GraphRepository
+from src.dao.graphs import GraphRepository, AsyncGraphRepository
+from src.workers import get_process_pool, shutdown_process_pool, WORKER_PROCESSES
+from src.mutation_log import append_mutation, needs_compaction, compact_graph, apply_batch
+from src import summary, metrics
+from src.dao.degrees import AsyncDegreeRepository
+from src.events import find_changes, watch_changes
+from src.jobs import submit_job, cancel_job, serialize_job, owner_alive
+from src.dao.jobs import JobRepository
+from src.cache import graph_cache, load_graph, load_landmarks, load_layout, load_viewport_index, cached_result, load_backend_graph, load_components, load_versioned_csr, load_neighborhoods, load_versioned_neighborhoods, load_shared_graph
+from src.shared import remove_orphan_segments
+from src.sparse import SparseGraph
+from src.neighborhood import stream_neighborhood
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 
 Base.metadata.create_all(bind=engine)
+migrate(engine)
 
-app = FastAPI()
+class TimedJSONResponse(JSONResponse):
+    def render(self, content):
+        with metrics.phase("encode"):
+            return super().render(content)
+
+
+app = FastAPI(default_response_class=TimedJSONResponse)
 
 origins = [
     "http://localhost.tiangolo.com",
@@ -24,89 +46,251 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
 
+@app.middleware("http")
+async def server_timing(request, call_next):
+    timings = metrics.start_request()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    total = metrics.finish_request(timings, route.path if route is not None else "unmatched",
+                                   request.method, response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing(timings, total)
+    return response
+
+
+@app.on_event("startup")
+def startup():
+    db = SessionLocal()
+    try:
+        # Jobs cannot outlive the process pool that ran them; sibling workers' jobs are left alone
+        JobRepository.fail_interrupted(db, owner_alive)
+    finally:
+        db.close()
+    remove_orphan_segments()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    shutdown_process_pool()
+    await async_engine.dispose()
+    await async_write_engine.dispose()
+
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
 
 
 @app.post("/create-graph/")
-async def create_graph_api(csv_str: Annotated[str, Form(...)] = None, file: UploadFile = File(None), directed: Annotated[bool, Form(...)] = False, db: Session = Depends(get_db)):
-    graphs = None
-    if csv_str:
-        _, graphs = await functions.read_graph_csv_by_string(csv_str, directed=directed)
-    if file:
-        _, graphs = await functions.read_graph_csv_by_file(file, directed=directed)
-    if graphs is not None:
-        graph_object = GraphRepository.save(
-            db, Graph(graph=graphs, directed=directed))
-        return {"message": "Graph created successfully!", "id": graph_object.id}
+async def create_graph_api(csv_str: Annotated[str, Form(...)] = None, file: UploadFile = File(None), directed: Annotated[bool, Form(...)] = False, duplicates: Annotated[str, Form(pattern="^(keep-last|keep-min|sum)$")] = "keep-last", self_loops: Annotated[str, Form(pattern="^(keep|drop)$")] = "keep", format: Annotated[str, Form(pattern="^(csv|parquet|arrow)$")] = "csv", source_column: Annotated[str, Form(...)] = None, target_column: Annotated[str, Form(...)] = None, weight_column: Annotated[str, Form(...)] = None, db: AsyncSession = Depends(get_async_write_db)):
+    csr = None
+    ingest = None
+    try:
+        if csv_str:
+            csr, _ = await functions.read_graph_csv_string(csv_str, directed=directed, duplicates=duplicates, self_loops=self_loops)
+        if file and format != "csv":
+            columns = None
+            if source_column or target_column:
+                if not (source_column and target_column):
+                    return {"message": "Graph not created! Both source_column and target_column are needed"}
+                columns = [source_column, target_column] + ([weight_column] if weight_column else [])
+            csr, ingest = await columnar.read_graph_columnar_stream(file, format, columns, directed=directed, duplicates=duplicates, self_loops=self_loops)
+        elif file:
+            csr, ingest = await functions.read_graph_csv_stream(file, directed=directed, duplicates=duplicates, self_loops=self_loops)
+    except ValueError as e:
+        return {"message": "Graph not created! " + str(e)}
+    if csr is not None:
+        data = await run_in_threadpool(csr.to_bytes)
+        graph_object = await AsyncGraphRepository.save(db, Graph(data=data, directed=directed, byte_size=len(data)))
+        await summary.save_summary_async(db, graph_object.id, csr)
+        await db.commit()
+        response = {"message": "Graph created successfully!", "id": graph_object.id}
+        if ingest is not None:
+            response["ingest"] = ingest
+        return response
     return {"message": "Graph not created!"}
 
 
+def graph_etag(id, version):
+    return f'"{id}-{version}"'
+
+
+def etag_matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
 @app.get("/get-graph/")
-def get_graph_api(id: int, db: Session = Depends(get_db)):
+def get_graph_api(id: int, response: Response, if_none_match: Annotated[str, Header()] = None, db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        return {"message": "Graph found successfully!", "graph": graph.graph}
+        # The content of a graph is determined by its version, so it is checked before loading anything
+        if etag_matches(if_none_match, graph_etag(graph.id, graph.version)):
+            return Response(status_code=304, headers={"ETag": graph_etag(graph.id, graph.version), "Cache-Control": "no-cache"})
+        version, graph_object = load_versioned_neighborhoods(graph)
+        response.headers["ETag"] = graph_etag(graph.id, version)
+        response.headers["Cache-Control"] = "no-cache"
+        return {"message": "Graph found successfully!", "version": version, "graph": functions.convert_graph_to_json(graph_object)}
+    return {"message": "Graph not found!"}
+
+
+@app.get("/get-graph-changes/")
+def get_graph_changes_api(id: int, since: Annotated[int, Query(ge=0)], db: Session = Depends(get_db)):
+    changes = find_changes(db, id, since)
+    if changes is not None:
+        return {"message": "Changes found successfully!", "since": since, **changes}
+    return {"message": "Graph not found!"}
+
+
+def sse_message(message):
+    if message is None:
+        return b": keepalive\n\n"
+    lines = [f"event: {message['event']}"]
+    if "version" in message:
+        lines.append(f"id: {message['version']}")
+    lines.append(f"data: {json.dumps(message, default=str)}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+@app.get("/graph-events/")
+async def graph_events_api(id: int, since: Annotated[int, Query(ge=0)] = None, last_event_id: Annotated[str, Header()] = None, db: Session = Depends(get_db)):
+    graph = await run_in_threadpool(GraphRepository.find_by_id, db, id)
+    if graph is not None:
+        # Reconnecting EventSource clients resume from the last version they got
+        if last_event_id is not None and last_event_id.isdigit():
+            since = int(last_event_id)
+        if since is None:
+            since = graph.version
+        chunks = (sse_message(message) async for message in watch_changes(graph.id, since))
+        return StreamingResponse(chunks, media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
     return {"message": "Graph not found!"}
 
 
+@app.websocket("/graph-events/ws/")
+async def graph_events_ws(websocket: WebSocket, id: int, since: Annotated[int, Query(ge=0)] = None):
+    await websocket.accept()
+    db = SessionLocal()
+    try:
+        graph = await run_in_threadpool(GraphRepository.find_by_id, db, id)
+    finally:
+        db.close()
+    if graph is None:
+        await websocket.send_json({"message": "Graph not found!"})
+        await websocket.close()
+        return
+    try:
+        async for message in watch_changes(graph.id, graph.version if since is None else since):
+            await websocket.send_json(message if message is not None else {"event": "keepalive"})
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+
+
+@app.get("/metrics")
+def get_metrics_api():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache-stats/")
+def get_cache_stats_api():
+    return {"message": "Cache stats retrieved successfully!", "stats": graph_cache.stats()}
+
+
 @app.get("/get-graphs/")
-def get_graphs_api(db: Session = Depends(get_db)):
-    graphs = GraphRepository.find_all(db)
+async def get_graphs_api(db: AsyncSession = Depends(get_async_db)):
+    graphs = await AsyncGraphRepository.find_all(db)
     return {"message": "Graphs found successfully!", "graphs": [graph.id for graph in graphs]}
 
 
+@app.get("/list-graphs/")
+async def list_graphs_api(limit: Annotated[int, Query(ge=1, le=1000)] = 100, sort: Annotated[str, Query(pattern="^(id|updated_at|order|size|byte_size)$")] = "id", descending: bool = False, cursor: str = None, directed: bool = None, min_order: Annotated[int, Query(ge=0)] = None, max_order: Annotated[int, Query(ge=0)] = None, min_size: Annotated[int, Query(ge=0)] = None, max_size: Annotated[int, Query(ge=0)] = None, db: AsyncSession = Depends(get_async_db)):
+    try:
+        rows, next_cursor = await AsyncGraphRepository.find_page(
+            db, limit, sort, descending, cursor, directed, min_order, max_order, min_size, max_size)
+    except ValueError as e:
+        return {"message": "Invalid cursor! Error: " + str(e)}
+    graphs = [{
+        "id": row.id,
+        "directed": row.directed,
+        "order": row.node_count,
+        "size": row.edge_count,
+        "byte_size": row.byte_size,
+        "updated_at": row.updated_at.isoformat() if row.updated_at is not None else None,
+        "version": row.version,
+    } for row in rows]
+    return {"message": "Graphs found successfully!", "graphs": graphs, "next_cursor": next_cursor}
+
+
 @app.put("/add-edge/")
-def add_edge_api(id: int, source: str = Form(...), target: str = Form(...), weight: Annotated[int, Form(...)] = None, db: Session = Depends(get_db)):
+def add_edge_api(background_tasks: BackgroundTasks, id: int, source: str = Form(...), target: str = Form(...), weight: Annotated[int, Form(...)] = None, db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        # graph.graph.add_edge(source, target)
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        if weight:
-            graph_object.add_edge(source, target, weight=weight)
-        else:
-            graph_object.add_edge(source, target)
-
-        json_graph = functions.convert_graph_to_json(graph_object)
-        graph.graph = json_graph
-        GraphRepository.save(db, graph)
+        append_mutation(db, graph, "add_edge", source, target, weight=weight or None)
+        if needs_compaction(graph):
+            background_tasks.add_task(compact_graph, graph.id)
         return {"message": "Edge added successfully!"}
     return {"message": "Graph not found!"}
 
 
 @app.put("/add-node/")
-def add_node_api(id: int, node: str = Form(...), db: Session = Depends(get_db)):
+def add_node_api(background_tasks: BackgroundTasks, id: int, node: str = Form(...), db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        graph_object.add_node(node)
-
-        json_graph = functions.convert_graph_to_json(graph_object)
-        graph.graph = json_graph
-        GraphRepository.save(db, graph)
+        append_mutation(db, graph, "add_node", node)
+        if needs_compaction(graph):
+            background_tasks.add_task(compact_graph, graph.id)
         return {"message": "Node added successfully!"}
     return {"message": "Graph not found!"}
 
 
-@app.get("/get-order/")
-def get_order_api(id: int, db: Session = Depends(get_db)):
+@app.put("/add-edges/")
+async def add_edges_api(id: int, edges: Annotated[str, Form(...)] = None, file: UploadFile = File(None), format: Annotated[str, Form(...)] = "csv", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        return {"message": "Order retrieved successfully!", "order": graph_object.order()}
+        content = edges
+        if file:
+            content = (await file.read()).decode("utf-8")
+        if not content:
+            return {"message": "No edges to add!"}
+        try:
+            mutations = functions.parse_edge_batch(content, format)
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            return {"message": "Invalid edge batch! Error: " + str(e)}
+        result = await run_in_threadpool(apply_batch, db, graph, mutations)
+        return {"message": "Edges added successfully!", **result}
+    return {"message": "Graph not found!"}
+
+
+async def load_summary_async(db, graph):
+    if graph.summary is None:
+        graph_summary = await run_in_threadpool(summary.load_summary, graph.id)
+        # Start a new read transaction, so the rows written by the backfill are visible
+        await db.rollback()
+        return graph_summary
+    return graph.summary
+
+
+@app.get("/get-order/")
+async def get_order_api(id: int, db: AsyncSession = Depends(get_async_db)):
+    graph = await AsyncGraphRepository.find_by_id(db, id)
+    if graph is not None:
+        graph_summary = await load_summary_async(db, graph)
+        return {"message": "Order retrieved successfully!", "order": graph_summary["order"]}
     return {"message": "Graph not found!"}
 
 
 @app.get("/get-degree/")
-def get_degree_api(id: int, db: Session = Depends(get_db)):
-    graph = GraphRepository.find_by_id(db, id)
+async def get_degree_api(id: int, db: AsyncSession = Depends(get_async_db)):
+    graph = await AsyncGraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        return {"message": "Degree retrieved successfully!", "degree": dict(graph_object.degree)}
+        await load_summary_async(db, graph)
+        degrees = await AsyncDegreeRepository.find_all(db, id)
+        return {"message": "Degree retrieved successfully!", "degree": {summary.decode_node(row.node): row.degree for row in degrees}}
     return {"message": "Graph not found!"}
 
 
@@ -114,7 +298,7 @@ def get_degree_api(id: int, db: Session = Depends(get_db)):
 def get_adjacent_edges_api(id: int, node: str = Form(...), db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
+        graph_object = load_neighborhoods(graph)
         if functions.exists_node(graph_object, node):
             return {"message": "Adjacent edges retrieved successfully!", "edges": functions.get_adjacent_edges(graph_object, node, directed=graph.directed)}
         return {"message": "Node not found!"}
@@ -125,18 +309,34 @@ def get_adjacent_edges_api(id: int, node: str = Form(...), db: Session = Depends
 def get_adjacent_degree_api(id: int, node: str = Form(...), db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
+        graph_object = load_neighborhoods(graph)
         if functions.exists_node(graph_object, node):
             return {"message": "Adjacent edges with degree retrieved successfully!", "edges": functions.get_adjacent_degree(graph_object, node, directed=graph.directed)}
         return {"message": "Node not found!"}
     return {"message": "Graph not found!"}
 
 
+@app.get("/get-neighborhood/")
+def get_neighborhood_api(id: int, node: str = Form(...), max_hops: Annotated[int, Query(ge=0)] = 1, max_cost: float = None, direction: Annotated[str, Query(pattern="^(out|in|both)$")] = "both", max_nodes: Annotated[int, Query(ge=1, le=1000000)] = 1000, max_edges: Annotated[int, Query(ge=0, le=10000000)] = 10000, edges: bool = True, format: Annotated[str, Query(pattern="^(json|ndjson)$")] = "json", db: Session = Depends(get_db)):
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is not None:
+        neighborhoods = load_neighborhoods(graph)
+        if neighborhoods.has_node(node):
+            with metrics.phase("algorithm"):
+                neighborhood = neighborhoods.neighborhood(node, max_hops, max_cost, direction, max_nodes, max_edges, edges)
+            if format == "ndjson":
+                return StreamingResponse(stream_neighborhood(neighborhood, ndjson=True), media_type="application/x-ndjson")
+            return StreamingResponse(export.stream_message("Neighborhood retrieved successfully!", stream_neighborhood(neighborhood)),
+                                     media_type="application/json")
+        return {"message": "Node not found!"}
+    return {"message": "Graph not found!"}
+
+
 @app.get("/get-has-edge/")
 def get_has_edge_api(id: int, source: str = Form(...), target: str = Form(...), db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
+        graph_object = load_neighborhoods(graph)
         if functions.exists_node(graph_object, source) and functions.exists_node(graph_object, target):
             if functions.get_has_edge(graph_object, source, target):
                 return {"message": "The edge's exists!", "results": functions.get_has_edge(graph_object, source, target)}
@@ -146,79 +346,198 @@ def get_has_edge_api(id: int, source: str = Form(...), target: str = Form(...),
 
 
 @app.get("/get-shortest-path/")
-def get_shortest_path_api(id: int, source: str = Form(...), target: str = Form(...), db: Session = Depends(get_db)):
+def get_shortest_path_api(id: int, source: str = Form(...), target: str = Form(...), landmarks: Annotated[int, Query(ge=0, le=64)] = 0, backend: Annotated[str, Query(pattern="^(auto|networkx|scipy)$")] = "auto", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
+        graph_object = load_backend_graph(graph, backend)
         if functions.exists_node(graph_object, source) and functions.exists_node(graph_object, target):
-            return {"result": functions.get_shortest_path(graph_object, source, target)}
+            # Landmarks and backends only change how fast the search is, the path length is the same
+            use_landmarks = landmarks and not isinstance(graph_object, SparseGraph)
+            return {"result": cached_result(graph.id, graph.version, ("shortest_path", source, target), lambda: functions.get_shortest_path(
+                graph_object, source, target, landmarks=load_landmarks(graph, landmarks) if use_landmarks else None, components=load_components(graph)))}
         return {"message": "Some node not found!"}
     return {"message": "Graph not found!"}
 
 
+@app.post("/get-shortest-paths/")
+def get_shortest_paths_api(id: int, pairs: Annotated[str, Form(...)] = None, sources: Annotated[str, Form(...)] = None, targets: Annotated[str, Form(...)] = None, output: Annotated[str, Form(...)] = "paths", db: Session = Depends(get_db)):
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is not None:
+        try:
+            if pairs:
+                pair_list = [tuple(pair) for pair in json.loads(pairs)]
+                if any(len(pair) != 2 for pair in pair_list):
+                    raise ValueError("each pair must have a source and a target")
+            else:
+                source_list, target_list = json.loads(sources), json.loads(targets)
+                pair_list = [(source, target) for source in source_list for target in target_list]
+            # Node labels are JSON scalars; lists and objects cannot be nodes
+            if any(isinstance(node, (list, dict)) for pair in pair_list for node in pair):
+                raise ValueError("nodes must be strings or numbers")
+        except (ValueError, TypeError) as e:
+            return JSONResponse(status_code=400, content={"message": "Invalid pairs! Error: " + str(e)})
+        if output not in ("paths", "costs", "matrix"):
+            return {"message": "Invalid output! Use paths, costs or matrix."}
+        neighborhoods = load_neighborhoods(graph)
+        missing = sorted({str(node) for pair in pair_list for node in pair if not functions.exists_node(neighborhoods, node)})
+        if missing:
+            return {"message": "Some node not found!", "missing": missing}
+        graph_object = load_graph(graph)
+        results = functions.get_many_shortest_paths(
+            graph_object, pair_list, paths=output == "paths", pool=get_process_pool(), workers=WORKER_PROCESSES,
+            shared=load_shared_graph(graph))
+        if output == "matrix" and not pairs:
+            matrix = [[results[(source, target)][0] for target in target_list] for source in source_list]
+            return {"message": "Distance matrix computed successfully!", "sources": source_list, "targets": target_list, "matrix": matrix}
+        return {"message": "Shortest paths computed successfully!", "results": [
+            {"source": source, "target": target, "path": results[(source, target)][1], "shortest_path_length": results[(source, target)][0]}
+            for source, target in pair_list]}
+    return {"message": "Graph not found!"}
+
+
 @app.get("/get-eccentricity-node/")
-def get_eccentricity_node_api(id: int, node: str = Form(...), db: Session = Depends(get_db)):
+def get_eccentricity_node_api(id: int, node: str = Form(...), weighted: bool = False, backend: Annotated[str, Query(pattern="^(auto|networkx|scipy)$")] = "auto", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        if functions.exists_node(graph_object, node):
-            return {"message": "Eccentricity node retrieved successfully!", "eccentricity": functions.get_eccentricity_node(graph_object, node)}
+        weight = "weight" if weighted else None
+        eccentricities = cached_result(graph.id, graph.version, ("eccentricities", weight),
+                                       lambda: functions.get_eccentricities(load_backend_graph(graph, backend), weight=weight, components=load_components(graph)))
+        if isinstance(eccentricities, dict):
+            if node in eccentricities:
+                return {"message": "Eccentricity node retrieved successfully!", "eccentricity": eccentricities[node]}
+        elif functions.exists_node(load_neighborhoods(graph), node):
+            # Without every eccentricity, e.g. in a directed graph that is not strongly
+            # connected, the node may still reach every other one
+            eccentricity = cached_result(graph.id, graph.version, ("eccentricity", node, weight),
+                                         lambda: functions.get_eccentricity_node(load_backend_graph(graph, backend), node, weight=weight, components=load_components(graph)))
+            return {"message": "Eccentricity node retrieved successfully!", "eccentricity": eccentricity}
         return {"message": "Node not found!"}
     return {"message": "Graph not found!"}
 
 
 @app.get("/is-eulerian/")
-def is_eulerian_api(id: int, db: Session = Depends(get_db)):
+def is_eulerian_api(id: int, backend: Annotated[str, Query(pattern="^(auto|networkx|scipy)$")] = "auto", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        return {"message": "Eulerian graph retrieved successfully!", "is_eulerian": functions.is_eulerian(graph_object)}
+        result = summary.is_eulerian_from_summary(
+            summary.ensure_summary(db, graph), graph.directed)
+        if result is None:
+            # The degrees allow a circuit, so it only depends on (strong) connectivity
+            result = load_components(graph).is_connected()
+        if result is None:
+            result = functions.is_eulerian(load_backend_graph(graph, backend))
+        return {"message": "Eulerian graph retrieved successfully!", "is_eulerian": result}
     return {"message": "Graph not found!"}
 
 
 @app.get("/is-semi-eulerian/")
-def is_semi_eulerian_api(id: int, db: Session = Depends(get_db)):
+def is_semi_eulerian_api(id: int, backend: Annotated[str, Query(pattern="^(auto|networkx|scipy)$")] = "auto", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        return {"message": "Semi-Eulerian graph retrieved successfully!", "is_semi_eulerian": functions.is_semi_eulerian(graph_object)}
+        result = summary.is_semi_eulerian_from_summary(
+            summary.ensure_summary(db, graph), graph.directed)
+        if result is None:
+            # The degrees allow a path but no circuit, so it only depends on (weak) connectivity
+            result = load_components(graph).is_connected(strong=False)
+        if result is None:
+            result = functions.is_semi_eulerian(load_backend_graph(graph, backend))
+        return {"message": "Semi-Eulerian graph retrieved successfully!", "is_semi_eulerian": result}
     return {"message": "Graph not found!"}
 
 
+def matrix_response(message, head, matrix, format, row_start, row_count, filename):
+    if format == "npz":
+        return Response(export.npz_bytes(matrix), media_type="application/octet-stream",
+                        headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    if format == "coo":
+        chunks = export.stream_coo(head, matrix)
+    elif format == "csr":
+        chunks = export.stream_csr(head, matrix)
+    else:
+        chunks = export.stream_dense(head, matrix, row_start, row_count)
+    return StreamingResponse(export.stream_message(message, chunks), media_type="application/json")
+
+
 @app.get("/adjacency-matrix/")
-def adjacency_matrix_api(id: int, db: Session = Depends(get_db)):
+def adjacency_matrix_api(id: int, format: Annotated[str, Query(pattern="^(dense|coo|csr|npz)$")] = "dense", row_start: Annotated[int, Query(ge=0)] = 0, row_count: Annotated[int, Query(ge=0)] = None, db: Session = Depends(get_db)):
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is not None:
+        graph_object = load_neighborhoods(graph)
+        matrix = export.adjacency_matrix(graph_object)
+        return matrix_response("Adjacency matrix generated successfully!", {"nodes": graph_object.labels()},
+                               matrix, format, row_start, row_count, f"adjacency-{graph.id}.npz")
+    return {"message": "Graph not found!"}
+
+
+@app.get("/incidence-matrix/")
+def incidence_matrix_api(id: int, format: Annotated[str, Query(pattern="^(dense|coo|csr|npz)$")] = "coo", row_start: Annotated[int, Query(ge=0)] = 0, row_count: Annotated[int, Query(ge=0)] = None, db: Session = Depends(get_db)):
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is not None:
+        graph_object = load_neighborhoods(graph)
+        matrix, edges = export.incidence_matrix(graph_object)
+        return matrix_response("Incidence matrix generated successfully!", {"nodes": graph_object.labels(), "edges": edges},
+                               matrix, format, row_start, row_count, f"incidence-{graph.id}.npz")
+    return {"message": "Graph not found!"}
+
+
+@app.get("/export-graph/")
+def export_graph_api(id: int, format: Annotated[str, Query(pattern="^(parquet|arrow)$")] = "parquet", table: Annotated[str, Query(pattern="^(edges|nodes)$")] = "edges", db: Session = Depends(get_db)):
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is not None:
+        version, csr = load_versioned_csr(graph)
+        try:
+            chunks = columnar.stream_table(csr, table, format)
+        except ValueError as e:
+            return {"message": "Graph not exported! " + str(e)}
+        filename = f"graph-{graph.id}-{table}.{columnar.EXTENSIONS[format]}"
+        return StreamingResponse(chunks, media_type=columnar.MEDIA_TYPES[format],
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}"',
+                                          "ETag": graph_etag(graph.id, version)})
+    return {"message": "Graph not found!"}
+
+
+@app.get("/adjacency-list/")
+def adjacency_list_api(id: int, format: Annotated[str, Query(pattern="^(json|ndjson)$")] = "json", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        matrix = functions.generate_adjacency_matrix(graph_object)
-        return {"message": "Adjacency matrix generated successfully!", "result": matrix}
+        graph_object = load_neighborhoods(graph)
+        if format == "ndjson":
+            return StreamingResponse(export.stream_adjacency_list(graph_object, ndjson=True), media_type="application/x-ndjson")
+        return StreamingResponse(export.stream_message("Adjacency list generated successfully!", export.stream_adjacency_list(graph_object)),
+                                 media_type="application/json")
     return {"message": "Graph not found!"}
 
 
 @app.get("/get-radius/")
-def get_radius_api(id: int, db: Session = Depends(get_db)):
+def get_radius_api(id: int, weighted: bool = False, max_probes: Annotated[int, Query(ge=1)] = None, backend: Annotated[str, Query(pattern="^(auto|networkx|scipy)$")] = "auto", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        return {"message": "Radius retrieved successfully!", "radius": functions.get_radius(graph_object)}
+        weight = "weight" if weighted else None
+        radius = cached_result(graph.id, graph.version, ("radius", weight, max_probes),
+                               lambda: functions.get_radius(load_backend_graph(graph, backend), weight=weight, max_probes=max_probes,
+                                                            components=load_components(graph)))
+        return {"message": "Radius retrieved successfully!", "radius": radius}
     return {"message": "Graph not found!"}
 
 
 @app.get("/get-size/")
-def get_size_api(id: int, db: Session = Depends(get_db)):
-    graph = GraphRepository.find_by_id(db, id)
+async def get_size_api(id: int, db: AsyncSession = Depends(get_async_db)):
+    graph = await AsyncGraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        return {"message": "Size retrieved successfully!", "size": graph_object.size()}
+        graph_summary = await load_summary_async(db, graph)
+        return {"message": "Size retrieved successfully!", "size": graph_summary["size"]}
     return {"message": "Graph not found!"}
 
 
 @app.get("/get-diameter/")
-def get_diameter_api(id: int, db: Session = Depends(get_db)):
+def get_diameter_api(id: int, weighted: bool = False, max_probes: Annotated[int, Query(ge=1)] = None, backend: Annotated[str, Query(pattern="^(auto|networkx|scipy)$")] = "auto", db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        return {"message": "Diameter retrieved successfully!", "diameter": functions.get_diameter(graph_object)}
+        weight = "weight" if weighted else None
+        diameter = cached_result(graph.id, graph.version, ("diameter", weight, max_probes),
+                                 lambda: functions.get_diameter(load_backend_graph(graph, backend), weight=weight, max_probes=max_probes,
+                                                                components=load_components(graph)))
+        return {"message": "Diameter retrieved successfully!", "diameter": diameter}
     return {"message": "Graph not found!"}
 
 
@@ -226,7 +545,7 @@ def get_diameter_api(id: int, db: Session = Depends(get_db)):
 def is_node_pendent_api(id: int, node: str = Form(...), db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
+        graph_object = load_neighborhoods(graph)
         if functions.exists_node(graph_object, node):
             return {"message": "Node pendent retrieved successfully!", "is_node_pendent": functions.get_pendent_node(graph_object, node)}
         return {"message": "Node not found!"}
@@ -234,17 +553,90 @@ def is_node_pendent_api(id: int, node: str = Form(...), db: Session = Depends(ge
 
 
 @app.get("/get-image-graph/")
-def get_image_graph_api(id: int, db: Session = Depends(get_db)):
+def get_image_graph_api(id: int, width: Annotated[float, Query(gt=0, le=100)] = 12, height: Annotated[float, Query(gt=0, le=100)] = 8, dpi: Annotated[int, Query(ge=10, le=600)] = 100, labels: bool = True, edge_labels: bool = True, seed: int = None, raw: bool = False, db: Session = Depends(get_db)):
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is not None:
+        options = {"width": width, "height": height, "dpi": dpi, "labels": labels, "edge_labels": edge_labels}
+        key = render.image_key(graph.id, graph.version, {**options, "seed": seed})
+        image = render.read_image(key)
+        if image is None:
+            pos = load_layout(graph, seed)
+            graph_object = load_graph(graph)
+            with metrics.phase("render"):
+                image = get_process_pool().submit(
+                    render.draw_graph, graph_object, graph.directed, pos, options).result()
+            render.write_image(graph.id, key, image)
+        if raw:
+            return Response(image, media_type="image/png")
+        return {"message": "Image generated successfully!", "image": f"/images/{key}"}
+    return {"message": "Graph not found!"}
+
+
+@app.post("/submit-job/")
+def submit_job_api(id: int, operation: Annotated[str, Form(...)], params: Annotated[str, Form(...)] = None, db: Session = Depends(get_db)):
     graph = GraphRepository.find_by_id(db, id)
     if graph is not None:
-        graph_object = functions.convert_json_to_graph(graph.graph)
-        directed = graph.directed
-        image_path = functions.generate_image_from_graph(
-            graph_object, directed, 'graph.png')
-        return {"message": "Image generated successfully!", "image": image_path}
+        try:
+            params = json.loads(params) if params else {}
+            if not isinstance(params, dict):
+                raise ValueError("params must be a JSON object")
+            job, reused = submit_job(db, graph, operation, params)
+        except ValueError as e:
+            return {"message": "Job not submitted! Error: " + str(e)}
+        message = "Job found successfully!" if reused else "Job submitted successfully!"
+        return {"message": message, "job": serialize_job(job, result=job.status == "done")}
     return {"message": "Graph not found!"}
 
 
+@app.get("/get-job/")
+def get_job_api(id: int, db: Session = Depends(get_db)):
+    job = JobRepository.find_by_id(db, id)
+    if job is not None:
+        return {"message": "Job found successfully!", "job": serialize_job(job)}
+    return {"message": "Job not found!"}
+
+
+@app.get("/get-job-result/")
+def get_job_result_api(id: int, db: Session = Depends(get_db)):
+    job = JobRepository.find_by_id(db, id)
+    if job is not None:
+        if job.status == "done":
+            return {"message": "Job result retrieved successfully!", "job": serialize_job(job, result=True)}
+        return {"message": "Job result not available! Status: " + job.status, "job": serialize_job(job)}
+    return {"message": "Job not found!"}
+
+
+@app.put("/cancel-job/")
+def cancel_job_api(id: int, db: Session = Depends(get_db)):
+    job = JobRepository.find_by_id(db, id)
+    if job is not None:
+        if cancel_job(db, job):
+            return {"message": "Job cancelled successfully!", "job": serialize_job(job)}
+        return {"message": "Job already finished! Status: " + job.status, "job": serialize_job(job)}
+    return {"message": "Job not found!"}
+
+
+@app.get("/get-layout/")
+def get_layout_api(id: int, x_min: float = None, y_min: float = None, x_max: float = None, y_max: float = None, max_nodes: Annotated[int, Query(ge=1, le=10000)] = 500, max_edges: Annotated[int, Query(ge=0, le=100000)] = 2000, level: Annotated[str, Query(pattern="^(auto|nodes|communities)$")] = "auto", seed: int = 0, db: Session = Depends(get_db)):
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is not None:
+        index = load_viewport_index(graph, seed)
+        bounds = index.bounds()
+        viewport = [bounds[i] if value is None else value for i, value in enumerate((x_min, y_min, x_max, y_max))]
+        view = index.query(load_graph(graph), viewport, max_nodes, max_edges, level)
+        return {"message": "Layout computed successfully!", "version": graph.version, "bounds": bounds,
+                "viewport": viewport, **view}
+    return {"message": "Graph not found!"}
+
+
+@app.get("/images/{key}")
+def get_image_api(key: str):
+    image = render.read_image(key)
+    if image is not None:
+        return Response(image, media_type="image/png")
+    return {"message": "Image not found!"}
+
+
 @app.post("/read-graph-csv-by-file/")
 async def read_graph_csv_by_file_api(file: UploadFile = File()):
     try:
@@ -0,0 +1,790 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import object_session
+
+from . import functions, render, storage, viewport
+from .metrics import phase, record_graph, registry
+from .components import ComponentIndex
+from .landmarks import LandmarkIndex
+from .neighborhood import NeighborhoodIndex
+from .shared import SHARED_GRAPH_DIR, SharedCSRGraph, SharedGraph, attach_csr, publish_csr
+from .sparse import SparseGraph
+from .workers import get_process_pool
+from .dao.graphs import GraphRepository
+from .dao.mutations import MutationRepository
+
+# Memory budget of the decoded graph cache, in bytes. Reads are served from
+# the shared CSR arrays, so with shared segments only the NetworkX algorithms
+# (layouts, images, small-graph analytics) need decoded graphs
+GRAPH_CACHE_MAX_BYTES = int(os.getenv("GRAPH_CACHE_MAX_BYTES", (64 if SHARED_GRAPH_DIR else 512) * 1024 * 1024))
+
+# Memory budget of the stored snapshot cache, in bytes
+CSR_CACHE_MAX_BYTES = int(os.getenv("CSR_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+
+# Memory budget of the analytics result cache, in bytes
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Seconds an analytics result is served from the cache before it is computed again
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", 600))
+
+# Analytics results kept per graph version; the least recently used are dropped first
+RESULT_CACHE_MAX_KEYS = int(os.getenv("RESULT_CACHE_MAX_KEYS", 1024))
+
+# Memory budget of the scipy.sparse backend matrix cache, in bytes
+SPARSE_CACHE_MAX_BYTES = int(os.getenv("SPARSE_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Graphs with at least this many edges run on the scipy.sparse backend when the backend is "auto"
+SPARSE_BACKEND_MIN_EDGES = int(os.getenv("SPARSE_BACKEND_MIN_EDGES", 100000))
+
+# Memory budget of the connected component index cache, in bytes
+COMPONENT_CACHE_MAX_BYTES = int(os.getenv("COMPONENT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Memory budget of the neighborhood index cache, in bytes
+NEIGHBORHOOD_CACHE_MAX_BYTES = int(os.getenv("NEIGHBORHOOD_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+
+# Memory budget of the landmark index cache, in bytes
+LANDMARK_CACHE_MAX_BYTES = int(os.getenv("LANDMARK_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Memory budget of the layout cache, in bytes
+LAYOUT_CACHE_MAX_BYTES = int(os.getenv("LAYOUT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+# Memory budget of the viewport index cache, in bytes
+VIEWPORT_CACHE_MAX_BYTES = int(os.getenv("VIEWPORT_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+
+# Approximate cost of a node and of an edge in NetworkX's dict-of-dicts
+NODE_BYTES = 500
+EDGE_BYTES = 600
+
+
+def estimate_graph_bytes(graph):
+    """
+    Estimate the memory used by a decoded NetworkX graph.
+
+    Parameters:
+    - graph: The NetworkX graph.
+
+    Returns:
+    - size: The estimated size of the graph in bytes.
+    """
+    return graph.number_of_nodes() * NODE_BYTES + graph.number_of_edges() * EDGE_BYTES
+
+
+def estimate_csr_bytes(csr):
+    """
+    Estimate the memory used by a CSR graph and its node label index.
+
+    Parameters:
+    - csr: The CSRGraph.
+
+    Returns:
+    - size: The estimated size of the graph in bytes.
+    """
+    if isinstance(csr, SharedCSRGraph):
+        # The arrays live in shared memory, only the label table is private
+        return csr.number_of_nodes() * NODE_BYTES
+    arrays = [csr.indptr, csr.indices, csr.weights]
+    if csr.weight_mask is not None:
+        arrays.append(csr.weight_mask)
+    return sum(array.nbytes for array in arrays) + csr.number_of_nodes() * NODE_BYTES
+
+
+def estimate_result_bytes(results):
+    """
+    Estimate the memory used by the cached analytics results of a graph.
+
+    Parameters:
+    - results: The results, keyed by operation and arguments.
+
+    Returns:
+    - size: The estimated size in bytes.
+    """
+    return sum(len(value) * NODE_BYTES if isinstance(value, dict) else NODE_BYTES for value in results.values())
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one computation.
+
+    The first caller of a key runs the computation; callers arriving while
+    it runs wait for it and get its result, or its exception.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        """
+        Run a computation, or wait for the one already running for the key.
+
+        Parameters:
+        - key: The key of the computation.
+        - compute: A function without arguments computing the result.
+
+        Returns:
+        - result: The result of the computation.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            registry.increment("singleflight_shared_total", {"flight": self.name},
+                               help="Calls that waited for an identical computation already running.")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = compute()
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class GraphCache:
+    """
+    Bounded LRU cache of decoded graphs, keyed by graph id and version.
+
+    Only the newest version of each graph is kept. After a version bump the
+    stale entry stays available through get_latest, so the new version can
+    be built by replaying the mutation log onto it instead of decoding the
+    stored payload again.
+    """
+
+    def __init__(self, max_bytes=GRAPH_CACHE_MAX_BYTES, sizeof=estimate_graph_bytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, id, version):
+        """
+        Get a decoded graph from the cache.
+
+        Parameters:
+        - id: The graph id.
+        - version: The graph version.
+
+        Returns:
+        - graph: The cached NetworkX graph, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def get_latest(self, id):
+        """
+        Get the newest cached version of a graph, whatever its version.
+
+        Parameters:
+        - id: The graph id.
+
+        Returns:
+        - version: The cached version, or None if the graph is not cached.
+        - graph: The cached NetworkX graph, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(id)
+            if entry is None:
+                return None, None
+            return entry[0], entry[1]
+
+    def put(self, id, version, graph):
+        """
+        Store a decoded graph, evicting the least recently used ones if needed.
+
+        A graph bigger than the whole budget is not cached, and an older
+        version never replaces a newer one.
+
+        Parameters:
+        - id: The graph id.
+        - version: The graph version.
+        - graph: The NetworkX graph.
+        """
+        size = self.sizeof(graph)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            entry = self._entries.get(id)
+            if entry is not None:
+                if entry[0] > version:
+                    return
+                self._remove(id)
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[id] = (version, graph, size)
+            self.current_bytes += size
+
+    def invalidate(self, id):
+        """
+        Drop a graph from the cache.
+
+        Parameters:
+        - id: The graph id.
+        """
+        with self._lock:
+            if id in self._entries:
+                self._remove(id)
+
+    def clear(self):
+        """
+        Drop every graph from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """
+        Get the cache counters.
+
+        Returns:
+        - stats: The entries, bytes, budget, hits, misses and evictions of the cache.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, id):
+        _, _, size = self._entries.pop(id)
+        self.current_bytes -= size
+
+
+graph_cache = GraphCache()
+# Stored snapshots as CSR arrays, keyed by graph id and snapshot version
+csr_cache = GraphCache(CSR_CACHE_MAX_BYTES, sizeof=estimate_csr_bytes)
+# Analytics results of the newest version of each graph, keyed by operation and arguments
+result_cache = GraphCache(RESULT_CACHE_MAX_BYTES, sizeof=lambda results: sum(entry[2] for entry in results.values()))
+# scipy.sparse matrices of the newest version of each graph
+sparse_cache = GraphCache(SPARSE_CACHE_MAX_BYTES,
+                          sizeof=lambda sparse: sparse.nbytes() + sparse.number_of_nodes() * NODE_BYTES)
+# Connected component indexes of the newest version of each graph
+component_cache = GraphCache(COMPONENT_CACHE_MAX_BYTES,
+                             sizeof=lambda index: index.nbytes() + len(index.added) * NODE_BYTES)
+# Neighborhood indexes of the newest version of each graph
+neighborhood_cache = GraphCache(NEIGHBORHOOD_CACHE_MAX_BYTES,
+                                sizeof=lambda index: index.nbytes() + (len(index.added) + len(index.overridden)) * NODE_BYTES)
+# Node positions of the newest version of each graph, keyed by layout seed
+layout_cache = GraphCache(LAYOUT_CACHE_MAX_BYTES, sizeof=estimate_result_bytes)
+# Viewport indexes of the newest version of each graph, keyed by layout seed
+viewport_cache = GraphCache(VIEWPORT_CACHE_MAX_BYTES,
+                            sizeof=lambda indexes: sum(index.nbytes() for index in indexes.values()))
+# Landmark indexes of the newest version of each graph, keyed by number of landmarks
+landmark_cache = GraphCache(LANDMARK_CACHE_MAX_BYTES,
+                            sizeof=lambda indexes: sum(index.nbytes() for index in indexes.values()))
+for _name, _cache in (("graph", graph_cache), ("csr", csr_cache), ("result", result_cache), ("sparse", sparse_cache),
+                      ("component", component_cache), ("neighborhood", neighborhood_cache), ("layout", layout_cache),
+                      ("viewport", viewport_cache), ("landmark", landmark_cache)):
+    registry.register_cache(_name, _cache)
+
+
+# Graph rebuilds in progress, so concurrent requests decode a graph version once
+_graph_flights = SingleFlight("graph")
+
+
+def load_graph(graph):
+    """
+    Get the decoded NetworkX graph of a stored graph, going through the cache.
+
+    The returned graph is shared with other requests and must not be mutated;
+    copy it first.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+
+    Returns:
+    - graph_object: The NetworkX graph.
+    """
+    return load_versioned_graph(graph)[1]
+
+
+def load_versioned_graph(graph, version=None, commit=True):
+    """
+    Get the decoded NetworkX graph of a stored graph and the version it reflects.
+
+    The graph is rebuilt from the newest cached version, or else from the
+    stored snapshot, by replaying the logged mutations up to the requested
+    version. If another request already cached a newer version, that one is
+    returned.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+    - version: The version to load (default is graph.version).
+    - commit: False inside a write transaction, so migrating a legacy row does not commit it (default is True).
+
+    Returns:
+    - version: The version of the returned graph.
+    - graph_object: The NetworkX graph.
+    """
+    if version is None:
+        version = graph.version
+    graph_object = graph_cache.get(graph.id, version)
+    if graph_object is not None:
+        record_graph(graph_object)
+        return version, graph_object
+    version, graph_object = _graph_flights.do((graph.id, version), lambda: _rebuild_graph(graph, version, commit))
+    record_graph(graph_object)
+    return version, graph_object
+
+
+def _rebuild_graph(graph, version, commit):
+    db = object_session(graph)
+    base_version, graph_object = graph_cache.get_latest(graph.id)
+    if graph_object is not None and base_version >= version:
+        return base_version, graph_object
+    # Batches and compaction drop the mutations they fold into a snapshot, so older graphs cannot replay them
+    if graph_object is None or base_version < GraphRepository.find_snapshot_version(db, graph.id):
+        base_version, csr = load_versioned_snapshot_csr(db, graph.id, commit)
+        with phase("decode"):
+            graph_object = csr.to_networkx()
+
+    mutations = MutationRepository.find_range(db, graph.id, base_version, version)
+    if mutations:
+        with phase("decode"):
+            graph_object = graph_object.copy()
+            for mutation in mutations:
+                functions.apply_mutation(graph_object, mutation.operation, mutation.source,
+                                         mutation.target, mutation.weight)
+    version = max(base_version, version)
+    graph_cache.put(graph.id, version, graph_object)
+    return version, graph_object
+
+
+def migrate_graph(db, id, graph_object, version, commit=True):
+    """
+    Rewrite a legacy node_link JSON row in the binary CSR storage format.
+
+    The content is unchanged, so the snapshot keeps its version.
+
+    Parameters:
+    - db: The database session.
+    - id: The graph id.
+    - graph_object: The decoded NetworkX graph.
+    - version: The snapshot version of the row.
+    - commit: False to leave the rewrite to the transaction in progress (default is True).
+    """
+    GraphRepository.save_snapshot(db, id, storage.encode_graph(graph_object), version, commit)
+
+
+def load_snapshot_csr(db, id, commit=True):
+    """
+    Get the stored snapshot of a graph as CSR arrays, going through the cache.
+
+    The snapshot does not include the mutations logged after it.
+
+    Parameters:
+    - db: The database session.
+    - id: The graph id.
+    - commit: False inside a write transaction, so migrating a legacy row does not commit it (default is True).
+
+    Returns:
+    - csr: The CSRGraph of the snapshot.
+    """
+    return load_versioned_snapshot_csr(db, id, commit)[1]
+
+
+def load_versioned_snapshot_csr(db, id, commit=True):
+    """
+    Get the stored snapshot of a graph as CSR arrays and the version it reflects.
+
+    The arrays come from the segment another server process shared for that
+    version if there is one. Otherwise the snapshot is decoded and shared
+    in turn, and the process keeps the shared copy instead of its own.
+
+    Parameters:
+    - db: The database session.
+    - id: The graph id.
+    - commit: False inside a write transaction, so migrating a legacy row does not commit it (default is True).
+
+    Returns:
+    - version: The snapshot version.
+    - csr: The CSRGraph of the snapshot.
+    """
+    version = GraphRepository.find_snapshot_version(db, id)
+    csr = csr_cache.get(id, version)
+    if csr is not None:
+        return version, csr
+    csr = attach_csr(id, version)
+    if csr is None:
+        snapshot = GraphRepository.find_snapshot(db, id)
+        version = snapshot.snapshot_version
+        if snapshot.data is not None:
+            with phase("decode"):
+                csr = storage.CSRGraph.from_bytes(snapshot.data, snapshot.directed)
+        else:
+            graph_object = functions.convert_json_to_graph(snapshot.graph)
+            migrate_graph(db, id, graph_object, version, commit)
+            csr = storage.CSRGraph.from_networkx(graph_object)
+        publish_csr(id, version, csr)
+        csr = attach_csr(id, version) or csr
+    csr_cache.put(id, version, csr)
+    return version, csr
+
+
+# Computations in progress, so concurrent identical requests share one
+_result_flights = SingleFlight("result")
+# Serializes the read-modify-write of the result entry of a graph
+_results_lock = threading.Lock()
+
+
+def _store_result(id, version, key, value):
+    # The JSON size tracks the size of the result closely enough for the budget
+    entry = (value, time.monotonic(), NODE_BYTES + len(json.dumps(value, default=str, skipkeys=True)))
+    with _results_lock:
+        cached_version, results = result_cache.get_latest(id)
+        results = dict(results) if results is not None and cached_version == version else {}
+        results.pop(key, None)
+        results[key] = entry
+        while len(results) > RESULT_CACHE_MAX_KEYS:
+            del results[next(iter(results))]
+        result_cache.put(id, version, results)
+
+
+def cached_result(id, version, key, compute):
+    """
+    Get an analytics result of a graph version, computing it on a miss.
+
+    Results expire after RESULT_CACHE_TTL_SECONDS. Concurrent misses on the
+    same result wait for a single computation.
+
+    Parameters:
+    - id: The graph id.
+    - version: The graph version.
+    - key: The key of the result, e.g. ("radius", weight).
+    - compute: A function without arguments computing the result.
+
+    Returns:
+    - result: The cached or computed result.
+    """
+    results = result_cache.get(id, version)
+    entry = results.get(key) if results is not None else None
+    if entry is not None and time.monotonic() - entry[1] < RESULT_CACHE_TTL_SECONDS:
+        with _results_lock:
+            if results.get(key) is entry:
+                results[key] = results.pop(key)
+        return entry[0]
+
+    def compute_and_store():
+        with phase("algorithm"):
+            value = compute()
+        _store_result(id, version, key, value)
+        return value
+
+    return _result_flights.do((id, version, key), compute_and_store)
+
+
+def load_versioned_csr(graph):
+    """
+    Get the CSR arrays of the current version of a stored graph.
+
+    The snapshot CSR is used as is, unless mutations were logged after the
+    snapshot; then the arrays are built from the neighborhood index, so the
+    graph is never decoded.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+
+    Returns:
+    - version: The version the arrays hold.
+    - csr: The CSRGraph.
+    """
+    version, csr = load_versioned_snapshot_csr(object_session(graph), graph.id)
+    if version < graph.version:
+        version, neighborhoods = load_versioned_neighborhoods(graph)
+        with phase("decode"):
+            csr = neighborhoods.to_csr()
+    return version, csr
+
+
+def load_shared_graph(graph):
+    """
+    Get a reference to the current version of a stored graph for process pool tasks.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+
+    Returns:
+    - shared: The SharedGraph, or None if the snapshot is not in a shared segment.
+    """
+    db = object_session(graph)
+    snapshot_version, csr = load_versioned_snapshot_csr(db, graph.id)
+    if not isinstance(csr, SharedCSRGraph):
+        return None
+    mutations = [(mutation.operation, mutation.source, mutation.target, mutation.weight)
+                 for mutation in MutationRepository.find_range(db, graph.id, snapshot_version, graph.version)]
+    return SharedGraph(graph.id, max(snapshot_version, graph.version), snapshot_version, mutations)
+
+
+def load_sparse_graph(graph):
+    """
+    Get the scipy.sparse representation of a stored graph, going through the cache.
+
+    The matrix is built on the snapshot CSR arrays, or on the arrays of the
+    neighborhood index when mutations were logged after the snapshot.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+
+    Returns:
+    - sparse: The SparseGraph.
+    """
+    sparse = sparse_cache.get(graph.id, graph.version)
+    if sparse is not None:
+        return sparse
+    version, csr = load_versioned_csr(graph)
+    with phase("decode"):
+        sparse = SparseGraph(csr)
+    sparse_cache.put(graph.id, version, sparse)
+    return sparse
+
+
+def load_backend_graph(graph, backend="auto"):
+    """
+    Get the representation of a stored graph that a compute backend runs on.
+
+    "auto" picks scipy for graphs of at least SPARSE_BACKEND_MIN_EDGES
+    edges. Graphs with negative weights always run on NetworkX, whose
+    Dijkstra results csgraph does not reproduce for them.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+    - backend: "auto", "networkx" or "scipy".
+
+    Returns:
+    - graph_object: The NetworkX graph or its SparseGraph.
+    """
+    if backend == "auto":
+        backend = "scipy" if (graph.edge_count or 0) >= SPARSE_BACKEND_MIN_EDGES else "networkx"
+    if backend == "scipy":
+        sparse = load_sparse_graph(graph)
+        if not sparse.negative:
+            return sparse
+    return load_graph(graph)
+
+
+def load_components(graph):
+    """
+    Get the connected component index of a stored graph, going through the cache.
+
+    A cached index of an older version is brought up to date by replaying
+    the mutations logged since; otherwise the index is built from the
+    snapshot CSR arrays.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+
+    Returns:
+    - components: The ComponentIndex.
+    """
+    components = component_cache.get(graph.id, graph.version)
+    if components is not None:
+        return components
+    db = object_session(graph)
+    base_version, components = component_cache.get_latest(graph.id)
+    if components is not None and base_version >= graph.version:
+        return components
+    # Batches drop the mutations they fold into a snapshot, so older indexes cannot replay them
+    if components is None or base_version < GraphRepository.find_snapshot_version(db, graph.id):
+        base_version, csr = load_versioned_snapshot_csr(db, graph.id)
+        with phase("index"):
+            components = ComponentIndex(csr)
+    else:
+        components = components.copy()
+    mutations = MutationRepository.find_range(db, graph.id, base_version, graph.version)
+    with phase("index"):
+        for mutation in mutations:
+            components.apply_mutation(mutation.operation, mutation.source, mutation.target)
+    version = max(base_version, graph.version)
+    component_cache.put(graph.id, version, components)
+    return components
+
+
+def advance_components(id, base_version, version, mutations):
+    """
+    Apply new mutations to the cached component index of a graph, if it is
+    at the version they were made on, so the next read needs no replay.
+
+    Parameters:
+    - id: The graph id.
+    - base_version: The version the mutations were applied to.
+    - version: The version they produced.
+    - mutations: The (operation, source, target, weight) tuples.
+    """
+    cached_version, components = component_cache.get_latest(id)
+    if components is None or cached_version != base_version:
+        return
+    components = components.copy()
+    for operation, source, target, _ in mutations:
+        components.apply_mutation(operation, source, target)
+    component_cache.put(id, version, components)
+
+
+def load_neighborhoods(graph):
+    """
+    Get the neighborhood index of a stored graph, going through the cache.
+
+    The index also answers the NetworkX read methods (edges, degree,
+    has_edge, adjacency), so the read endpoints never decode the graph.
+    Edges come in the order of the decoded graph, rows by node position,
+    not in the order they were first inserted.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+
+    Returns:
+    - neighborhoods: The NeighborhoodIndex.
+    """
+    return load_versioned_neighborhoods(graph)[1]
+
+
+def load_versioned_neighborhoods(graph):
+    """
+    Get the neighborhood index of a stored graph and the version it reflects.
+
+    Like load_components, a cached index of an older version is brought up
+    to date by replaying the mutations logged since; otherwise the index is
+    built on the snapshot CSR arrays, so the graph is never decoded.
+
+    Parameters:
+    - graph: The Graph model instance, attached to a session.
+
+    Returns:
+    - version: The version of the returned index.
+    - neighborhoods: The NeighborhoodIndex.
+    """
+    neighborhoods = neighborhood_cache.get(graph.id, graph.version)
+    if neighborhoods is not None:
+        return graph.version, neighborhoods
+    db = object_session(graph)
+    base_version, neighborhoods = neighborhood_cache.get_latest(graph.id)
+    if neighborhoods is not None and base_version >= graph.version:
+        return base_version, neighborhoods
+    if neighborhoods is None or base_version < GraphRepository.find_snapshot_version(db, graph.id):
+        base_version, csr = load_versioned_snapshot_csr(db, graph.id)
+        with phase("index"):
+            neighborhoods = NeighborhoodIndex(csr)
+    else:
+        neighborhoods = neighborhoods.copy()
+    mutations = MutationRepository.find_range(db, graph.id, base_version, graph.version)
+    with phase("index"):
+        for mutation in mutations:
+            neighborhoods.apply_mutation(mutation.operation, mutation.source, mutation.target, mutation.weight)
+    version = max(base_version, graph.version)
+    neighborhood_cache.put(graph.id, version, neighborhoods)
+    return version, neighborhoods
+
+
+def load_landmarks(graph, k):
+    """
+    Get the landmark index of a stored graph, building it on first use.
+
+    The index is tied to the graph version, so any mutation invalidates it.
+
+    Parameters:
+    - graph: The Graph model instance.
+    - k: The number of landmarks.
+
+    Returns:
+    - landmarks: The LandmarkIndex of the graph.
+    """
+    indexes = landmark_cache.get(graph.id, graph.version)
+    if indexes is not None and k in indexes:
+        return indexes[k]
+    graph_object = load_graph(graph)
+    with phase("index"):
+        landmarks = LandmarkIndex(graph_object, k)
+    indexes = dict(indexes or {})
+    indexes[k] = landmarks
+    landmark_cache.put(graph.id, graph.version, indexes)
+    return landmarks
+
+
+def load_layout(graph, seed=None):
+    """
+    Get the node positions of a stored graph, computing the layout in a worker process on a miss.
+
+    The layout of the previous cached version, if any, is refined instead
+    of starting over, so nodes do not jump around after a mutation.
+
+    Parameters:
+    - graph: The Graph model instance.
+    - seed: The random seed of the layout (default is None).
+
+    Returns:
+    - pos: The position of each node, as a [x, y] list.
+    """
+    layouts = layout_cache.get(graph.id, graph.version)
+    if layouts is not None and seed in layouts:
+        return layouts[seed]
+    initial = None
+    if layouts is None:
+        _, previous = layout_cache.get_latest(graph.id)
+        initial = previous.get(seed) if previous is not None else None
+    graph_object = load_graph(graph)
+    with phase("layout"):
+        pos = get_process_pool().submit(render.compute_layout, graph_object, seed, initial).result()
+    layouts = dict(layouts or {})
+    layouts[seed] = pos
+    layout_cache.put(graph.id, graph.version, layouts)
+    return pos
+
+
+def load_viewport_index(graph, seed=None):
+    """
+    Get the viewport index of a stored graph, grouping its nodes into communities in a worker process on a miss.
+
+    Parameters:
+    - graph: The Graph model instance.
+    - seed: The random seed of the layout and of the communities (default is None).
+
+    Returns:
+    - index: The ViewportIndex of the graph.
+    """
+    indexes = viewport_cache.get(graph.id, graph.version)
+    if indexes is not None and seed in indexes:
+        return indexes[seed]
+    pos = load_layout(graph, seed)
+    graph_object = load_graph(graph)
+    with phase("index"):
+        community, edges = get_process_pool().submit(
+            viewport.aggregate_communities, graph_object, list(pos), seed).result()
+        index = viewport.ViewportIndex(graph_object, pos, community, edges)
+    indexes = dict(indexes or {})
+    indexes[seed] = index
+    viewport_cache.put(graph.id, graph.version, indexes)
+    return index
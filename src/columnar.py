@@ -0,0 +1,250 @@
+import asyncio
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from .functions import build_csr_from_edge_chunks, factorize_edge_labels
+from .metrics import timed
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Number of rows per record batch read from an upload, and written to an export
+ARROW_BATCH_ROWS = int(os.getenv("ARROW_BATCH_ROWS", 65536))
+
+# Media types of the exported files, by format
+MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+
+# Extensions of the exported files, by format
+EXTENSIONS = {"parquet": "parquet", "arrow": "arrows"}
+
+# First bytes of an Arrow IPC file, as opposed to a stream
+_ARROW_FILE_MAGIC = b"ARROW1"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ValueError("pyarrow is not installed")
+
+
+def _projection(names, columns):
+    if columns is None:
+        # Like a CSV upload: source, target and, if any, weight
+        return names[:3]
+    unknown = [name for name in columns if name not in names]
+    if unknown:
+        raise ValueError("Unknown column: " + ", ".join(unknown))
+    return columns
+
+
+def _read_batches(file, format, columns=None, batch_rows=ARROW_BATCH_ROWS):
+    if format == "parquet":
+        parquet = pq.ParquetFile(file)
+        # Only the projected columns are read from disk
+        yield from parquet.iter_batches(batch_size=batch_rows, columns=_projection(parquet.schema_arrow.names, columns))
+        return
+    magic = file.read(len(_ARROW_FILE_MAGIC))
+    file.seek(0)
+    reader = ipc.open_file(file) if magic == _ARROW_FILE_MAGIC else ipc.open_stream(file)
+    names = _projection(reader.schema.names, columns)
+    if magic == _ARROW_FILE_MAGIC:
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = iter(reader)
+    for batch in batches:
+        yield batch.select(names)
+
+
+def _decode(column):
+    if pa.types.is_dictionary(column.type):
+        return column.dictionary_decode()
+    return column
+
+
+def _edge_chunks(batches):
+    for batch in batches:
+        if batch.num_columns < 2:
+            raise ValueError("An edge list needs a source and a target column")
+        sources, targets = _decode(batch.column(0)), _decode(batch.column(1))
+        if sources.null_count or targets.null_count:
+            raise ValueError("Source and target nodes cannot be null")
+        n = len(sources)
+        if sources.type == targets.type:
+            # Interleaved as source, target, source, ... so labels are numbered in insertion order
+            order = np.empty(2 * n, dtype=np.int64)
+            order[0::2] = np.arange(n)
+            order[1::2] = np.arange(n, 2 * n)
+            encoded = pa.concat_arrays([sources, targets]).take(pa.array(order)).dictionary_encode()
+            codes = encoded.indices.to_numpy(zero_copy_only=False)
+            uniques = encoded.dictionary.to_numpy(zero_copy_only=False)
+        else:
+            codes, uniques = factorize_edge_labels(sources.to_numpy(zero_copy_only=False),
+                                                   targets.to_numpy(zero_copy_only=False))
+        weights = None
+        if batch.num_columns >= 3:
+            column = _decode(batch.column(2))
+            if pa.types.is_integer(column.type) or pa.types.is_floating(column.type) or pa.types.is_boolean(column.type):
+                # Nulls are edges without a weight, filled first so an int column stays int
+                weights = column.fill_null(False if pa.types.is_boolean(column.type) else 0).to_numpy(zero_copy_only=False)
+                if column.null_count:
+                    weights = np.ma.MaskedArray(weights, mask=column.is_null().to_numpy(zero_copy_only=False))
+            else:
+                weights = pd.to_numeric(column.to_pandas()).to_numpy()
+        yield codes, uniques, weights
+
+
+@timed("ingest")
+def build_csr_from_arrow(file, format="parquet", columns=None, directed=False, batch_rows=ARROW_BATCH_ROWS,
+                         duplicates="keep-last", self_loops="keep"):
+    """
+    Build the stored representation of a graph from a Parquet file or an Arrow IPC stream (or file) edge list.
+
+    Only the projected columns are read, one record batch at a time. Each
+    batch is dictionary encoded by Arrow into node positions, so labels are
+    never turned into Python objects one by one, see build_csr_from_edge_chunks.
+
+    Parameters:
+    - file: The seekable file-like object holding the data.
+    - format: "parquet" or "arrow".
+    - columns: The source, target and, optionally, weight column names
+      (default is the first three columns, like a CSV upload).
+    - directed: True to build a directed graph (default is False).
+    - batch_rows: The number of rows read at a time.
+    - duplicates: How repeated edges are merged, see DUPLICATE_POLICIES (default is "keep-last").
+    - self_loops: "keep" or "drop" (default is "keep").
+
+    Returns:
+    - csr: The CSRGraph.
+    - stats: The ingest statistics, see build_csr_from_edge_chunks.
+    """
+    _require_pyarrow()
+    batches = _read_batches(file, format, columns, batch_rows)
+    return build_csr_from_edge_chunks(_edge_chunks(batches), directed, duplicates, self_loops)
+
+
+async def read_graph_columnar_stream(file, format="parquet", columns=None, directed=False, duplicates="keep-last", self_loops="keep"):
+    """
+    Read graph from an uploaded Parquet or Arrow file off the event loop, see build_csr_from_arrow.
+
+    Returns:
+    - csr: The CSRGraph.
+    - stats: The ingest statistics, see build_csr_from_edge_chunks.
+    """
+    await file.seek(0)
+    return await asyncio.to_thread(build_csr_from_arrow, file.file, format, columns, directed, ARROW_BATCH_ROWS,
+                                   duplicates, self_loops)
+
+
+class _Sink(io.RawIOBase):
+    """
+    Write-only file that keeps what was written until it is drained, so a
+    writer's output can be streamed as it goes.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _labels(nodes):
+    try:
+        return pa.array(nodes)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # A column has one type, so labels of mixed types are written as strings
+        return pa.array([str(node) for node in nodes])
+
+
+def _edge_batches(csr, format, batch_rows):
+    rows, cols, weights, mask = csr.edge_arrays()
+    labels = _labels(csr.nodes)
+    weighted = csr.weighted
+    # An empty graph still gets one (empty) batch, so the file has a schema
+    for start in range(0, max(len(rows), 1), batch_rows):
+        stop = start + batch_rows
+        sources, targets = pa.array(rows[start:stop].astype(np.int32)), pa.array(cols[start:stop].astype(np.int32))
+        if format == "arrow":
+            # Arrow streams send the label table once, and then positions into it
+            columns = [pa.DictionaryArray.from_arrays(sources, labels), pa.DictionaryArray.from_arrays(targets, labels)]
+        else:
+            columns = [labels.take(sources), labels.take(targets)]
+        names = ["source", "target"]
+        if weighted:
+            columns.append(pa.array(weights[start:stop], mask=~mask[start:stop] if mask is not None else None))
+            names.append("weight")
+        yield pa.RecordBatch.from_arrays(columns, names=names)
+
+
+def _node_batches(csr, batch_rows):
+    n = len(csr.nodes)
+    labels = _labels(csr.nodes)
+    out_degrees = np.diff(csr.indptr)
+    if csr.directed:
+        degrees = {"in_degree": np.bincount(csr.indices, minlength=n), "out_degree": out_degrees}
+    else:
+        # Self-loops are stored once, and count twice
+        rows = np.repeat(np.arange(n), out_degrees)
+        degrees = {"degree": out_degrees + np.bincount(rows[rows == csr.indices], minlength=n)}
+    for start in range(0, max(n, 1), batch_rows):
+        stop = start + batch_rows
+        columns = [labels.slice(start, stop - start)] + [pa.array(values[start:stop].astype(np.int64)) for values in degrees.values()]
+        yield pa.RecordBatch.from_arrays(columns, names=["node", *degrees])
+
+
+def _stream(batches, format):
+    sink = _Sink()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pq.ParquetWriter(sink, batch.schema) if format == "parquet" else ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def stream_table(csr, table="edges", format="parquet", batch_rows=ARROW_BATCH_ROWS):
+    """
+    Stream the edge list or the node table of a graph as a Parquet file or an Arrow IPC stream.
+
+    Batches are built from slices of the CSR arrays and written as they
+    are built, so the graph is never materialized as Python objects. The
+    edges table has source, target and, if the graph is weighted, weight
+    columns, each undirected edge once; in Arrow streams, source and target
+    are dictionary encoded over the node labels. The nodes table has the
+    node label and its degree, or in and out degree if directed.
+
+    Parameters:
+    - csr: The CSRGraph.
+    - table: "edges" or "nodes".
+    - format: "parquet" or "arrow".
+    - batch_rows: The number of rows per record batch (and Parquet row group).
+
+    Returns:
+    - chunks: A generator of the encoded bytes.
+    """
+    _require_pyarrow()
+    batches = _edge_batches(csr, format, batch_rows) if table == "edges" else _node_batches(csr, batch_rows)
+    return _stream(batches, format)
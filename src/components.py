@@ -0,0 +1,168 @@
+import numpy as np
+from scipy.sparse import csgraph, csr_matrix
+
+
+class ComponentIndex:
+    """
+    Connected components of a graph, kept up to date as nodes and edges are added.
+
+    Weak components (the components, for undirected graphs) are a union-find
+    forest over node positions, so adding an edge and checking whether two
+    nodes share a component take O(α(n)). Strong components of directed
+    graphs are labels computed with csgraph; an added edge between two of
+    them may merge them, so the labels are dropped until the index is built
+    again.
+
+    Positions of the nodes of the snapshot come from its CSRGraph and are
+    never modified, so copies of the index share them.
+    """
+
+    def __init__(self, csr):
+        self.directed = csr.directed
+        self.index = csr.index
+        self.added = {}
+        self.n = len(csr.nodes)
+        matrix = csr_matrix((np.ones(len(csr.indices), dtype=np.int8), csr.indices, csr.indptr), shape=(self.n, self.n))
+        self.count, labels = csgraph.connected_components(matrix, directed=self.directed, connection="weak")
+        # The first node of each component is its root
+        _, roots = np.unique(labels, return_index=True)
+        self.parent = roots[labels].astype(np.int64)
+        self.size = np.zeros(self.n, dtype=np.int64)
+        self.size[roots] = np.bincount(labels)
+        self.strong = None
+        self.strong_count = None
+        if self.directed:
+            self.strong_count, self.strong = csgraph.connected_components(matrix, directed=True, connection="strong")
+
+    def copy(self):
+        index = object.__new__(ComponentIndex)
+        index.__dict__.update(self.__dict__)
+        index.added = dict(self.added)
+        index.parent = self.parent.copy()
+        index.size = self.size.copy()
+        index.strong = self.strong.copy() if self.strong is not None else None
+        return index
+
+    def nbytes(self):
+        """
+        Memory used by the arrays, in bytes.
+        """
+        arrays = [self.parent, self.size] + ([self.strong] if self.strong is not None else [])
+        return sum(array.nbytes for array in arrays)
+
+    def number_of_nodes(self):
+        return self.n
+
+    def _position(self, node):
+        position = self.index.get(node)
+        return position if position is not None else self.added.get(node)
+
+    def has_node(self, node):
+        return self._position(node) is not None
+
+    def _find(self, i):
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        # Path compression only points nodes at an ancestor, so it is safe for concurrent readers
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def _grow(self):
+        capacity = max(2 * len(self.parent), 16)
+        for name in ("parent", "size", "strong"):
+            array = getattr(self, name)
+            if array is not None:
+                grown = np.zeros(capacity, dtype=array.dtype)
+                grown[:len(array)] = array
+                setattr(self, name, grown)
+
+    def add_node(self, node):
+        """
+        Add a node, as its own component, if it is not in the index yet.
+
+        Returns:
+        - position: The position of the node.
+        """
+        position = self._position(node)
+        if position is not None:
+            return position
+        position = self.n
+        if position == len(self.parent):
+            self._grow()
+        self.parent[position] = position
+        self.size[position] = 1
+        self.added[node] = position
+        self.n += 1
+        self.count += 1
+        if self.strong is not None:
+            self.strong[position] = self.strong_count
+            self.strong_count += 1
+        return position
+
+    def add_edge(self, source, target):
+        """
+        Add an edge, merging the components of its ends.
+        """
+        u, v = self.add_node(source), self.add_node(target)
+        if self.strong is not None and self.strong[u] != self.strong[v]:
+            self.strong = None
+            self.strong_count = None
+        u, v = self._find(u), self._find(v)
+        if u == v:
+            return
+        if self.size[u] < self.size[v]:
+            u, v = v, u
+        self.parent[v] = u
+        self.size[u] += self.size[v]
+        self.count -= 1
+
+    def apply_mutation(self, operation, source, target=None):
+        """
+        Apply a logged mutation, like functions.apply_mutation does to the graph.
+        """
+        if operation == "add_node":
+            self.add_node(source)
+        elif operation == "add_edge":
+            self.add_edge(source, target)
+        else:
+            raise ValueError("Unknown mutation: " + str(operation))
+
+    def same_component(self, source, target):
+        """
+        Check if two nodes are in the same (weak) component. Nodes in
+        different components have no path between them, either way.
+
+        Parameters:
+        - source: The source node label.
+        - target: The target node label.
+
+        Returns:
+        - same: True if both nodes exist and share a component.
+        """
+        u, v = self._position(source), self._position(target)
+        if u is None or v is None:
+            return False
+        return self._find(u) == self._find(v)
+
+    def is_connected(self, strong=True):
+        """
+        Check if the graph is connected (strongly or weakly, if directed).
+
+        Parameters:
+        - strong: For directed graphs, True to check strong connectivity.
+
+        Returns:
+        - connected: True or False, or None when it is not known: for the
+          null graph, whose connectivity is undefined, and for strong
+          connectivity after an added edge dropped the strong labels.
+        """
+        if self.n == 0:
+            return None
+        if self.count > 1 or not self.directed or not strong:
+            return self.count == 1
+        if self.strong is None:
+            return None
+        return self.strong_count == 1
@@ -0,0 +1,51 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.degrees import GraphDegree
+
+
+class DegreeRepository:
+    @staticmethod
+    def find_all(db: Session, graph_id: int) -> list[GraphDegree]:
+        return db.query(GraphDegree).filter(GraphDegree.graph_id == graph_id).order_by(GraphDegree.position).all()
+
+    @staticmethod
+    def find_nodes(db: Session, graph_id: int, nodes: list[str]) -> list[GraphDegree]:
+        return db.query(GraphDegree).filter(GraphDegree.graph_id == graph_id, GraphDegree.node.in_(nodes)).all()
+
+    @staticmethod
+    def replace_all(db: Session, graph_id: int, degrees: list[dict]) -> None:
+        db.query(GraphDegree).filter(GraphDegree.graph_id == graph_id).delete(synchronize_session=False)
+        db.bulk_insert_mappings(GraphDegree, [{"graph_id": graph_id, **degree} for degree in degrees])
+
+    @staticmethod
+    def upsert_all(db: Session, graph_id: int, degrees: list[dict]) -> None:
+        if not degrees:
+            return
+        statement = sqlite_insert(GraphDegree)
+        statement = statement.on_conflict_do_update(
+            index_elements=[GraphDegree.graph_id, GraphDegree.node],
+            set_={"degree": statement.excluded.degree, "in_degree": statement.excluded.in_degree,
+                  "out_degree": statement.excluded.out_degree},
+        )
+        db.execute(statement, [{"graph_id": graph_id, **degree} for degree in degrees])
+
+    @staticmethod
+    def delete_by_graph_id(db: Session, graph_id: int) -> None:
+        db.query(GraphDegree).filter(GraphDegree.graph_id == graph_id).delete(synchronize_session=False)
+
+
+class AsyncDegreeRepository:
+    @staticmethod
+    async def find_all(db: AsyncSession, graph_id: int) -> list[GraphDegree]:
+        result = await db.execute(
+            select(GraphDegree).where(GraphDegree.graph_id == graph_id).order_by(GraphDegree.position))
+        return list(result.scalars())
+
+    @staticmethod
+    async def replace_all(db: AsyncSession, graph_id: int, degrees: list[dict]) -> None:
+        await db.execute(delete(GraphDegree).where(GraphDegree.graph_id == graph_id))
+        if degrees:
+            await db.execute(insert(GraphDegree), [{"graph_id": graph_id, **degree} for degree in degrees])
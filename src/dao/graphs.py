@@ -1,12 +1,20 @@
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import datetime
 
-from ..models.graphs import Graph
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
+
+from ..models.graphs import Graph, utcnow
+from ..models.mutations import GraphMutation
+from ..models.degrees import GraphDegree
 
 
 class GraphRepository:
     @staticmethod
     def find_all(db: Session) -> list[Graph]:
-        return db.query(Graph).all()
+        return db.query(Graph).options(defer(Graph.graph), defer(Graph.data), defer(Graph.summary)).all()
 
     @staticmethod
     def save(db: Session, graph: Graph) -> Graph:
@@ -19,7 +27,49 @@ class GraphRepository:
 
     @staticmethod
     def find_by_id(db: Session, id: int) -> Graph:
-        return db.query(Graph).filter(Graph.id == id).first()
+        # The graph payload is loaded on first access, so cache hits skip it
+        return db.query(Graph).options(defer(Graph.graph), defer(Graph.data)).filter(Graph.id == id).first()
+
+    @staticmethod
+    def find_snapshot(db: Session, id: int):
+        # Payload and snapshot version are read together so they always match
+        return db.execute(
+            select(Graph.data, Graph.graph, Graph.directed, Graph.snapshot_version).where(Graph.id == id)
+        ).first()
+
+    @staticmethod
+    def save_snapshot(db: Session, id: int, data: bytes, version: int, commit: bool = True) -> bool:
+        result = db.execute(
+            update(Graph)
+            .where(Graph.id == id, Graph.snapshot_version <= version)
+            .values(data=data, graph=None, snapshot_version=version, byte_size=len(data))
+        )
+        if commit:
+            db.commit()
+        return result.rowcount > 0
+
+    @staticmethod
+    def find_snapshot_version(db: Session, id: int) -> int:
+        return db.execute(select(Graph.snapshot_version).where(Graph.id == id)).scalar_one()
+
+    @staticmethod
+    def find_summary(db: Session, id: int) -> dict:
+        return db.execute(select(Graph.summary).where(Graph.id == id)).scalar_one()
+
+    @staticmethod
+    def save_summary(db: Session, id: int, summary: dict) -> None:
+        db.execute(update(Graph).where(Graph.id == id).values(
+            summary=summary, node_count=summary["order"], edge_count=summary["size"]))
+
+    @staticmethod
+    def bump_version(db: Session, id: int) -> int:
+        # In WAL mode a read transaction cannot be upgraded to a write once
+        # another writer has committed, so the reads made so far are ended and
+        # the write transaction starts with this UPDATE, waiting for the lock
+        if db.in_transaction():
+            db.commit()
+        db.execute(update(Graph).where(Graph.id == id).values(version=Graph.version + 1, updated_at=utcnow()))
+        return db.execute(select(Graph.version).where(Graph.id == id)).scalar_one()
 
     @staticmethod
     def exists_by_id(db: Session, id: int) -> bool:
@@ -29,5 +79,127 @@ class GraphRepository:
     def delete_by_id(db: Session, id: int) -> None:
         graph = db.query(Graph).filter(Graph.id == id).first()
         if graph is not None:
+            db.query(GraphMutation).filter(GraphMutation.graph_id == id).delete(synchronize_session=False)
+            db.query(GraphDegree).filter(GraphDegree.graph_id == id).delete(synchronize_session=False)
             db.delete(graph)
             db.commit()
+
+
+# Columns the graph listing can be sorted by
+LISTING_SORT_COLUMNS = {
+    "id": Graph.id,
+    "updated_at": Graph.updated_at,
+    "order": Graph.node_count,
+    "size": Graph.edge_count,
+    "byte_size": Graph.byte_size,
+}
+
+
+def encode_cursor(sort: str, value, id: int) -> str:
+    """
+    Encode the position after a listed graph as an opaque cursor.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort, value, id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(sort: str, cursor: str):
+    """
+    Decode a cursor made by encode_cursor for the same sort column.
+
+    Returns:
+    - value: The sort value of the last listed graph.
+    - id: The id of the last listed graph.
+
+    Raises:
+    - ValueError: If the cursor is malformed or was made for another sort column.
+    """
+    try:
+        cursor_sort, value, id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != sort or not isinstance(id, int):
+        raise ValueError("Cursor was made for another sort column")
+    if sort == "updated_at" and value is not None:
+        value = datetime.fromisoformat(value)
+    return value, id
+
+
+def _after_cursor(column, value, id: int, descending: bool):
+    # SQLite sorts NULLs (legacy rows without a summary) first, and last when descending
+    if value is None:
+        if descending:
+            return and_(column.is_(None), Graph.id < id)
+        return or_(column.is_not(None), and_(column.is_(None), Graph.id > id))
+    if descending:
+        return or_(column < value, and_(column == value, Graph.id < id), column.is_(None))
+    return or_(column > value, and_(column == value, Graph.id > id))
+
+
+class AsyncGraphRepository:
+    @staticmethod
+    async def find_all(db: AsyncSession) -> list[Graph]:
+        result = await db.execute(
+            select(Graph).options(defer(Graph.graph), defer(Graph.data), defer(Graph.summary)))
+        return list(result.scalars())
+
+    @staticmethod
+    async def find_page(db: AsyncSession, limit: int, sort: str = "id", descending: bool = False,
+                        cursor: str = None, directed: bool = None, min_order: int = None, max_order: int = None,
+                        min_size: int = None, max_size: int = None) -> tuple[list, str]:
+        # Only metadata columns are selected, the payloads are never read
+        column = LISTING_SORT_COLUMNS[sort]
+        query = select(Graph.id, Graph.directed, Graph.node_count, Graph.edge_count, Graph.byte_size,
+                       Graph.updated_at, Graph.version, column.label("sort_key"))
+        if directed is not None:
+            query = query.where(Graph.directed == directed)
+        if min_order is not None:
+            query = query.where(Graph.node_count >= min_order)
+        if max_order is not None:
+            query = query.where(Graph.node_count <= max_order)
+        if min_size is not None:
+            query = query.where(Graph.edge_count >= min_size)
+        if max_size is not None:
+            query = query.where(Graph.edge_count <= max_size)
+        if cursor is not None:
+            value, id = decode_cursor(sort, cursor)
+            query = query.where(_after_cursor(column, value, id, descending))
+        order = [column.desc(), Graph.id.desc()] if descending else [column, Graph.id]
+        rows = (await db.execute(query.order_by(*order).limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1].sort_key, rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    async def save(db: AsyncSession, graph: Graph) -> Graph:
+        if graph.id:
+            graph = await db.merge(graph)
+        else:
+            db.add(graph)
+        await db.commit()
+        return graph
+
+    @staticmethod
+    async def find_by_id(db: AsyncSession, id: int) -> Graph:
+        result = await db.execute(select(Graph).options(defer(Graph.graph), defer(Graph.data)).where(Graph.id == id))
+        return result.scalars().first()
+
+    @staticmethod
+    async def find_snapshot_version(db: AsyncSession, id: int) -> int:
+        return (await db.execute(select(Graph.snapshot_version).where(Graph.id == id))).scalar_one()
+
+    @staticmethod
+    async def find_summary(db: AsyncSession, id: int) -> dict:
+        return (await db.execute(select(Graph.summary).where(Graph.id == id))).scalar_one()
+
+    @staticmethod
+    async def save_summary(db: AsyncSession, id: int, summary: dict) -> None:
+        await db.execute(update(Graph).where(Graph.id == id).values(
+            summary=summary, node_count=summary["order"], edge_count=summary["size"]))
+
+    @staticmethod
+    async def exists_by_id(db: AsyncSession, id: int) -> bool:
+        return (await db.execute(select(Graph.id).where(Graph.id == id))).first() is not None
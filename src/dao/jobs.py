@@ -0,0 +1,84 @@
+from sqlalchemy.orm import Session
+
+from ..models.graphs import utcnow
+from ..models.jobs import GraphJob
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobRepository:
+    @staticmethod
+    def save(db: Session, job: GraphJob) -> GraphJob:
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def find_by_id(db: Session, id: int) -> GraphJob:
+        return db.query(GraphJob).filter(GraphJob.id == id).first()
+
+    @staticmethod
+    def find_reusable(db: Session, graph_id: int, version: int, operation: str, params_key: str) -> GraphJob:
+        """
+        Find a finished or in-flight job with the same graph version, operation and parameters.
+        """
+        return db.query(GraphJob).filter(
+            GraphJob.graph_id == graph_id,
+            GraphJob.version == version,
+            GraphJob.operation == operation,
+            GraphJob.params_key == params_key,
+            GraphJob.status.in_(ACTIVE_STATUSES + ("done",)),
+        ).order_by(GraphJob.status == "done", GraphJob.id.desc()).first()
+
+    @staticmethod
+    def find_status(db: Session, id: int) -> str:
+        return db.query(GraphJob.status).filter(GraphJob.id == id).scalar()
+
+    @staticmethod
+    def start(db: Session, id: int) -> bool:
+        """
+        Mark a queued job as running. Returns False if it was cancelled first.
+        """
+        updated = db.query(GraphJob).filter(GraphJob.id == id, GraphJob.status == "queued").update(
+            {"status": "running", "started_at": utcnow()}, synchronize_session=False)
+        db.commit()
+        return updated == 1
+
+    @staticmethod
+    def save_progress(db: Session, id: int, progress: float) -> None:
+        db.query(GraphJob).filter(GraphJob.id == id, GraphJob.status == "running").update(
+            {"progress": progress}, synchronize_session=False)
+        db.commit()
+
+    @staticmethod
+    def finish(db: Session, id: int, status: str, result=None, error: str = None) -> bool:
+        """
+        Store the outcome of an active job. Returns False if it was no longer active, e.g. cancelled.
+        """
+        values = {"status": status, "result": result, "error": error, "finished_at": utcnow()}
+        if status == "done":
+            values["progress"] = 1.0
+        updated = db.query(GraphJob).filter(GraphJob.id == id, GraphJob.status.in_(ACTIVE_STATUSES)).update(
+            values, synchronize_session=False)
+        db.commit()
+        return updated == 1
+
+    @staticmethod
+    def fail_interrupted(db: Session, is_alive) -> int:
+        """
+        Mark the jobs left active by server processes that no longer exist as failed.
+
+        Parameters:
+        - is_alive: A function telling if the process that owns a job still exists.
+        """
+        owners = [owner for (owner,) in db.query(GraphJob.owner).filter(GraphJob.status.in_(ACTIVE_STATUSES)).distinct()]
+        gone = [owner for owner in owners if owner is not None and not is_alive(owner)]
+        query = db.query(GraphJob).filter(GraphJob.status.in_(ACTIVE_STATUSES))
+        # Jobs without an owner were submitted before owners were recorded
+        query = query.filter(GraphJob.owner.in_(gone) | GraphJob.owner.is_(None))
+        updated = query.update(
+            {"status": "failed", "error": "Interrupted by a server restart", "finished_at": utcnow()},
+            synchronize_session=False)
+        db.commit()
+        return updated
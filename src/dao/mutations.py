@@ -0,0 +1,41 @@
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+
+from ..models.mutations import GraphMutation
+
+
+class MutationRepository:
+    @staticmethod
+    def add(db: Session, graph_id: int, version: int, operation: str, source: str, target: str = None, weight=None) -> GraphMutation:
+        mutation = GraphMutation(graph_id=graph_id, version=version, operation=operation,
+                                 source=source, target=target, weight=weight)
+        db.add(mutation)
+        return mutation
+
+    @staticmethod
+    def find_range(db: Session, graph_id: int, after_version: int, until_version: int) -> list[GraphMutation]:
+        return db.query(GraphMutation).filter(
+            GraphMutation.graph_id == graph_id,
+            GraphMutation.version > after_version,
+            GraphMutation.version <= until_version,
+        ).order_by(GraphMutation.version).all()
+
+    @staticmethod
+    def exists_edge(db: Session, graph_id: int, source: str, target: str, directed: bool) -> bool:
+        condition = and_(GraphMutation.source == source, GraphMutation.target == target)
+        if not directed:
+            condition = or_(condition, and_(GraphMutation.source == target, GraphMutation.target == source))
+        return db.query(GraphMutation.id).filter(
+            GraphMutation.graph_id == graph_id,
+            GraphMutation.operation == "add_edge",
+            condition,
+        ).first() is not None
+
+    @staticmethod
+    def delete_until(db: Session, graph_id: int, version: int, commit: bool = True) -> None:
+        db.query(GraphMutation).filter(
+            GraphMutation.graph_id == graph_id,
+            GraphMutation.version <= version,
+        ).delete(synchronize_session=False)
+        if commit:
+            db.commit()
@@ -1,18 +1,100 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from ..metrics import instrument_engine
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///db.sqlite3"
+SQLALCHEMY_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///db.sqlite3"
+
+# Milliseconds a connection waits for the write lock before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 30000))
+
+# Connections kept open for concurrent readers
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 8))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 8))
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets readers go on while a writer commits, instead of blocking on the database lock
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False},
+    pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
 )
+event.listen(engine, "connect", _configure_sqlite)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# SQLite has a single writer, so async writes queue on a one connection pool
+# instead of spinning on the busy timeout
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool,
+    pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+)
+async_write_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=AsyncAdaptedQueuePool, pool_size=1, max_overflow=0,
+)
+for _engine in (async_engine, async_write_engine):
+    event.listen(_engine.sync_engine, "connect", _configure_sqlite)
+for _engine in (engine, async_engine.sync_engine, async_write_engine.sync_engine):
+    instrument_engine(_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncWriteSessionLocal = async_sessionmaker(async_write_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_write_db():
+    async with AsyncWriteSessionLocal() as db:
+        yield db
+
+
+def migrate(bind=engine):
+    """
+    Add the model columns and indexes that are missing from tables created by an older version.
+
+    create_all only creates missing tables, so columns added to a model later
+    are appended here with ALTER TABLE, using their server default if any,
+    then filled with the SQL expression in their `backfill` info if any.
+
+    Parameters:
+    - bind: The engine to migrate (default is the application engine).
+    """
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(bind.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                connection.execute(text(ddl))
+                if "backfill" in column.info:
+                    connection.execute(text(f"UPDATE {table.name} SET {column.name} = {column.info['backfill']}"))
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
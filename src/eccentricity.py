@@ -0,0 +1,214 @@
+import math
+
+import networkx as nx
+import numpy as np
+
+
+def _distances(graph, source, weight=None, reverse=False):
+    """
+    Get the distances from (or, with reverse, to) a node: BFS if unweighted, Dijkstra otherwise.
+    """
+    if reverse:
+        graph = graph.reverse(copy=False)
+    if weight is None:
+        return nx.single_source_shortest_path_length(graph, source)
+    return nx.single_source_dijkstra_path_length(graph, source, weight=weight)
+
+
+def disconnected_error(graph):
+    if graph.is_directed():
+        return nx.NetworkXError("Found infinite path length because the digraph is not strongly connected")
+    return nx.NetworkXError("Found infinite path length because the graph is not connected")
+
+
+def extrema_bounding(graph, compute="eccentricities", weight=None, max_probes=None, progress=None, components=None):
+    """
+    Compute eccentricities, the diameter or the radius with eccentricity bounds.
+
+    Each probe runs one shortest path search from a node (plus one on the
+    reversed graph for directed graphs), which gives its exact eccentricity
+    and, by the triangle inequality, lower and upper bounds on the
+    eccentricity of every other node. Nodes whose bounds can no longer
+    change the result are dropped, so usually only a few probes are needed
+    instead of one per node (Takes and Kosters' BoundingDiameters).
+
+    Parameters:
+    - graph: The NetworkX graph or its SparseGraph. It must be connected (strongly, if directed).
+    - compute: "eccentricities", "diameter" or "radius".
+    - weight: The edge attribute used as distance, or None to count hops.
+    - max_probes: Stop after this many probes and return bounds (default is exact).
+    - progress: A function called after each probe with the fraction of
+      nodes whose eccentricity no longer matters (optional).
+    - components: A ComponentIndex of the graph, so a disconnected graph
+      fails before the first probe (optional).
+
+    Returns:
+    - lower: The lower bound of the eccentricity of each node.
+    - upper: The upper bound of the eccentricity of each node.
+    - probes: The number of probes run.
+    """
+    if graph.number_of_nodes() and components is not None and components.is_connected() is False:
+        raise disconnected_error(graph)
+    if not isinstance(graph, nx.Graph):
+        return _extrema_bounding_arrays(graph, compute, weight, max_probes, progress)
+    n = graph.number_of_nodes()
+    if n == 0:
+        raise nx.NetworkXError("Graph has no nodes.")
+    lower = dict.fromkeys(graph, 0)
+    upper = dict.fromkeys(graph, math.inf)
+    candidates = set(graph)
+    probes = 0
+    high = False
+
+    while candidates:
+        if max_probes is not None and probes >= max_probes:
+            break
+        # Alternate between the most promising node for each end of the range
+        if high:
+            current = max(candidates, key=lambda v: (upper[v], -lower[v]))
+        else:
+            current = min(candidates, key=lambda v: (lower[v], -upper[v]))
+        high = not high
+
+        forward = _distances(graph, current, weight)
+        if len(forward) != n:
+            raise disconnected_error(graph)
+        if graph.is_directed():
+            backward = _distances(graph, current, weight, reverse=True)
+            if len(backward) != n:
+                raise disconnected_error(graph)
+        else:
+            backward = forward
+        probes += 1
+
+        eccentricity = max(forward.values())
+        for v in candidates:
+            lower[v] = max(lower[v], backward[v], eccentricity - forward[v])
+            upper[v] = min(upper[v], backward[v] + eccentricity)
+        lower[current] = upper[current] = eccentricity
+
+        if compute == "diameter":
+            max_lower = max(lower.values())
+            candidates = {v for v in candidates if upper[v] > max_lower and lower[v] != upper[v]}
+        elif compute == "radius":
+            min_upper = min(upper.values())
+            candidates = {v for v in candidates if lower[v] < min_upper and lower[v] != upper[v]}
+        else:
+            candidates = {v for v in candidates if lower[v] != upper[v]}
+        if progress is not None:
+            progress(1 - len(candidates) / n)
+
+    return lower, upper, probes
+
+
+def _extrema_bounding_arrays(graph, compute, weight, max_probes, progress):
+    """
+    extrema_bounding on a SparseGraph, with the bounds in arrays and the
+    searches run by csgraph. Ties between candidates go to the lowest node
+    position, so bounded results (max_probes) can differ from the NetworkX
+    path; exact ones are the same.
+    """
+    n = graph.number_of_nodes()
+    if n == 0:
+        raise nx.NetworkXError("Graph has no nodes.")
+    lower = np.zeros(n)
+    upper = np.full(n, math.inf)
+    candidates = np.ones(n, dtype=bool)
+    probes = 0
+    high = False
+
+    while candidates.any():
+        if max_probes is not None and probes >= max_probes:
+            break
+        positions = np.flatnonzero(candidates)
+        if high:
+            current = positions[np.lexsort((lower[positions], -upper[positions]))[0]]
+        else:
+            current = positions[np.lexsort((-upper[positions], lower[positions]))[0]]
+        high = not high
+
+        forward = graph.distances(current, weight)
+        backward = graph.distances(current, weight, reverse=True) if graph.is_directed() else forward
+        if not (np.isfinite(forward).all() and np.isfinite(backward).all()):
+            raise disconnected_error(graph)
+        probes += 1
+
+        eccentricity = forward.max()
+        lower[candidates] = np.maximum.reduce([lower, backward, eccentricity - forward])[candidates]
+        upper[candidates] = np.minimum(upper, backward + eccentricity)[candidates]
+        lower[current] = upper[current] = eccentricity
+
+        if compute == "diameter":
+            candidates &= (upper > lower.max()) & (lower != upper)
+        elif compute == "radius":
+            candidates &= (lower < upper.min()) & (lower != upper)
+        else:
+            candidates &= lower != upper
+        if progress is not None:
+            progress(1 - np.count_nonzero(candidates) / n)
+
+    # NetworkX keeps the int 0 its bounds start from when no distance beats it
+    lower = dict(zip(graph.nodes, (graph.value(value, weight) if value else 0 for value in lower.tolist())))
+    upper = dict(zip(graph.nodes, (graph.value(value, weight) if value else 0 for value in upper.tolist())))
+    return lower, upper, probes
+
+
+def eccentricities(graph, weight=None, progress=None, components=None):
+    """
+    Get the exact eccentricity of every node of a graph.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - weight: The edge attribute used as distance, or None to count hops.
+    - progress: A progress callback, see extrema_bounding (optional).
+    - components: A ComponentIndex of the graph, see extrema_bounding (optional).
+
+    Returns:
+    - eccentricities: The eccentricity of each node.
+    """
+    lower, _, _ = extrema_bounding(graph, "eccentricities", weight, progress=progress, components=components)
+    return lower
+
+
+def diameter(graph, weight=None, max_probes=None, progress=None, components=None):
+    """
+    Get the diameter of a graph, exact or bounded.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - weight: The edge attribute used as distance, or None to count hops.
+    - max_probes: Stop after this many probes (default is exact).
+    - progress: A progress callback, see extrema_bounding (optional).
+    - components: A ComponentIndex of the graph, see extrema_bounding (optional).
+
+    Returns:
+    - diameter: The exact diameter, or, if max_probes stopped the search
+      first, a dict with the lower and upper bounds and the probes run.
+    """
+    lower, upper, probes = extrema_bounding(graph, "diameter", weight, max_probes, progress, components)
+    low, high = max(lower.values()), max(upper.values())
+    if low == high:
+        return low
+    return {"lower": low, "upper": high, "probes": probes}
+
+
+def radius(graph, weight=None, max_probes=None, progress=None, components=None):
+    """
+    Get the radius of a graph, exact or bounded.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - weight: The edge attribute used as distance, or None to count hops.
+    - max_probes: Stop after this many probes (default is exact).
+    - progress: A progress callback, see extrema_bounding (optional).
+    - components: A ComponentIndex of the graph, see extrema_bounding (optional).
+
+    Returns:
+    - radius: The exact radius, or, if max_probes stopped the search
+      first, a dict with the lower and upper bounds and the probes run.
+    """
+    lower, upper, probes = extrema_bounding(graph, "radius", weight, max_probes, progress, components)
+    low, high = min(lower.values()), min(upper.values())
+    if low == high:
+        return low
+    return {"lower": low, "upper": high, "probes": probes}
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import threading
+
+from fastapi.concurrency import run_in_threadpool
+
+from .dao.graphs import GraphRepository
+from .dao.mutations import MutationRepository
+from .db.database import SessionLocal
+
+# Seconds a change stream waits for a notification before checking the database again
+EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", 15))
+
+
+class ChangeFeed:
+    """
+    Wakes up the change streams of a graph when one of its mutations is committed.
+
+    Notifications only reach streams served by the same process, so streams
+    also poll the database every EVENTS_POLL_SECONDS.
+    """
+
+    def __init__(self):
+        self._waiters = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, id):
+        """
+        Register a stream of a graph. Must be called from the stream's event loop.
+
+        Parameters:
+        - id: The graph id.
+
+        Returns:
+        - event: The asyncio.Event set when the graph changes.
+        """
+        event = asyncio.Event()
+        with self._lock:
+            self._waiters.setdefault(id, set()).add((asyncio.get_running_loop(), event))
+        return event
+
+    def unsubscribe(self, id, event):
+        """
+        Unregister a stream of a graph.
+
+        Parameters:
+        - id: The graph id.
+        - event: The event returned by subscribe.
+        """
+        with self._lock:
+            waiters = self._waiters.get(id, set())
+            waiters.difference_update({waiter for waiter in waiters if waiter[1] is event})
+            if not waiters:
+                self._waiters.pop(id, None)
+
+    def publish(self, id):
+        """
+        Wake up the streams of a graph. Safe to call from any thread.
+
+        Parameters:
+        - id: The graph id.
+        """
+        with self._lock:
+            waiters = list(self._waiters.get(id, ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The loop of a stream that is going away is already closed
+                pass
+
+
+change_feed = ChangeFeed()
+
+
+def _serialize_mutation(mutation):
+    change = {"version": mutation.version, "operation": mutation.operation, "source": mutation.source}
+    if mutation.operation == "add_edge":
+        change["target"] = mutation.target
+        if mutation.weight is not None:
+            change["weight"] = mutation.weight
+    return change
+
+
+def find_changes(db, id, since):
+    """
+    Get the mutations of a graph after a version, from the mutation log.
+
+    The log does not cover versions written by a bulk batch, nor versions
+    older than the compaction retention window. A client that is that far
+    behind gets a reset and has to fetch the whole graph again.
+
+    Parameters:
+    - db: The database session.
+    - id: The graph id.
+    - since: The version the client has.
+
+    Returns:
+    - changes: The current version, whether the client must reset, and the
+      mutations in version order, or None if the graph does not exist.
+    """
+    graph = GraphRepository.find_by_id(db, id)
+    if graph is None:
+        return None
+    if since == graph.version:
+        return {"version": graph.version, "reset": False, "changes": []}
+    mutations = MutationRepository.find_range(db, id, since, graph.version)
+    if since > graph.version or len(mutations) != graph.version - since:
+        return {"version": graph.version, "reset": True, "changes": []}
+    return {"version": graph.version, "reset": False, "changes": [_serialize_mutation(mutation) for mutation in mutations]}
+
+
+def _read_changes(id, since):
+    db = SessionLocal()
+    try:
+        return find_changes(db, id, since)
+    finally:
+        db.close()
+
+
+async def watch_changes(id, since):
+    """
+    Follow the mutations of a graph as they are committed.
+
+    Parameters:
+    - id: The graph id.
+    - since: The version the client has.
+
+    Returns:
+    - events: An async generator of {"event": "mutation", ...change},
+      {"event": "reset", "version"} (fetch the graph again; later mutations
+      up to the fetched version can be skipped), {"event": "deleted"} (last
+      event), or None when nothing happened for EVENTS_POLL_SECONDS.
+    """
+    event = change_feed.subscribe(id)
+    try:
+        while True:
+            # Cleared before reading, so a commit made during the read wakes the next wait
+            event.clear()
+            changes = await run_in_threadpool(_read_changes, id, since)
+            if changes is None:
+                yield {"event": "deleted"}
+                return
+            if changes["reset"]:
+                yield {"event": "reset", "version": changes["version"]}
+            for change in changes["changes"]:
+                yield {"event": "mutation", **change}
+            since = changes["version"]
+            try:
+                await asyncio.wait_for(event.wait(), EVENTS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                yield None
+    finally:
+        change_feed.unsubscribe(id, event)
@@ -0,0 +1,191 @@
+import json
+from io import BytesIO
+
+import networkx as nx
+import numpy as np
+import scipy.sparse
+
+from .neighborhood import NeighborhoodIndex
+
+# Number of sparse entries encoded per streamed chunk
+STREAM_CHUNK_ROWS = 1024
+# Number of dense matrix cells materialized per streamed chunk
+STREAM_CHUNK_CELLS = 1024 * 1024
+
+
+def adjacency_matrix(graph):
+    """
+    Get the sparse adjacency matrix of a graph, rows and columns in node order.
+
+    Parameters:
+    - graph: The NetworkX graph or its NeighborhoodIndex.
+
+    Returns:
+    - matrix: The scipy.sparse CSR array, holding edge weights (1 if unweighted).
+    """
+    if not isinstance(graph, NeighborhoodIndex):
+        return nx.adjacency_matrix(graph)
+    csr = graph.to_csr()
+    n = csr.number_of_nodes()
+    weights = csr.weights if csr.weight_mask is None else np.where(csr.weight_mask, csr.weights, 1)
+    return scipy.sparse.csr_array((weights, csr.indices, csr.indptr), shape=(n, n))
+
+
+def incidence_matrix(graph):
+    """
+    Get the sparse incidence matrix of a graph, rows in node order and columns in edge order.
+
+    Directed graphs are oriented: -1 where an edge leaves a node, 1 where it enters it.
+
+    Parameters:
+    - graph: The NetworkX graph or its NeighborhoodIndex.
+
+    Returns:
+    - matrix: The scipy.sparse CSR array.
+    - edges: The edges, in column order.
+    """
+    if not isinstance(graph, NeighborhoodIndex):
+        edges = list(graph.edges())
+        matrix = nx.incidence_matrix(graph, edgelist=edges, oriented=graph.is_directed()).tocsr()
+        return matrix, edges
+    labels = graph.labels()
+    rows, cols, _ = graph.edge_list()
+    edges = [(labels[u], labels[v]) for u, v in zip(rows.tolist(), cols.tolist())]
+    # Self-loops get an empty column, like in NetworkX
+    columns = np.flatnonzero(rows != cols)
+    data = np.ones(2 * len(columns))
+    if graph.is_directed():
+        data[:len(columns)] = -1
+    matrix = scipy.sparse.csr_array((data, (np.concatenate((rows[columns], cols[columns])), np.tile(columns, 2))),
+                                    shape=(len(labels), len(edges)))
+    return matrix, edges
+
+
+def _dumps(value):
+    return json.dumps(value, default=str)
+
+
+def stream_dense(head, matrix, row_start=0, row_count=None):
+    """
+    Stream a range of rows of a sparse matrix as a dense JSON list of lists.
+
+    Only about STREAM_CHUNK_CELLS cells are densified at a time.
+
+    Parameters:
+    - head: The JSON members written before the matrix, as a dict.
+    - matrix: The scipy.sparse CSR array.
+    - row_start: The first row to write.
+    - row_count: The number of rows to write (default is up to the last one).
+
+    Returns:
+    - chunks: A generator of encoded JSON chunks.
+    """
+    row_stop = matrix.shape[0] if row_count is None else min(matrix.shape[0], row_start + row_count)
+    head = {**head, "row_start": row_start, "row_count": max(0, row_stop - row_start)}
+    yield (_dumps(head)[:-1] + ', "matrix": [').encode("utf-8")
+    chunk_rows = max(1, STREAM_CHUNK_CELLS // max(1, matrix.shape[1]))
+    for start in range(row_start, row_stop, chunk_rows):
+        stop = min(start + chunk_rows, row_stop)
+        rows = matrix[start:stop].toarray().tolist()
+        separator = "" if start == row_start else ", "
+        yield (separator + ", ".join(_dumps(row) for row in rows)).encode("utf-8")
+    yield b"]}"
+
+
+def stream_coo(head, matrix):
+    """
+    Stream the non-zero entries of a sparse matrix as JSON [row, column, value] triplets.
+
+    Parameters:
+    - head: The JSON members written before the entries, as a dict.
+    - matrix: The scipy.sparse array.
+
+    Returns:
+    - chunks: A generator of encoded JSON chunks.
+    """
+    coo = matrix.tocoo()
+    head = {**head, "shape": list(coo.shape), "nnz": int(coo.nnz)}
+    yield (_dumps(head)[:-1] + ', "entries": [').encode("utf-8")
+    for start in range(0, coo.nnz, STREAM_CHUNK_ROWS):
+        stop = start + STREAM_CHUNK_ROWS
+        triplets = zip(coo.row[start:stop].tolist(), coo.col[start:stop].tolist(), coo.data[start:stop].tolist())
+        separator = "" if start == 0 else ", "
+        yield (separator + ", ".join(_dumps(list(triplet)) for triplet in triplets)).encode("utf-8")
+    yield b"]}"
+
+
+def stream_csr(head, matrix):
+    """
+    Stream a sparse matrix as JSON CSR arrays (indptr, indices, data).
+
+    Parameters:
+    - head: The JSON members written before the arrays, as a dict.
+    - matrix: The scipy.sparse CSR array.
+
+    Returns:
+    - chunks: A generator of encoded JSON chunks.
+    """
+    head = {**head, "shape": list(matrix.shape), "nnz": int(matrix.nnz)}
+    yield (_dumps(head)[:-1]).encode("utf-8")
+    for name in ("indptr", "indices", "data"):
+        array = getattr(matrix, name)
+        yield (', "' + name + '": [').encode("utf-8")
+        for start in range(0, len(array), STREAM_CHUNK_ROWS * 16):
+            separator = "" if start == 0 else ", "
+            yield (separator + _dumps(array[start:start + STREAM_CHUNK_ROWS * 16].tolist())[1:-1]).encode("utf-8")
+        yield b"]"
+    yield b"}"
+
+
+def npz_bytes(matrix):
+    """
+    Serialize a sparse matrix in scipy's .npz format.
+
+    Parameters:
+    - matrix: The scipy.sparse array.
+
+    Returns:
+    - data: The .npz file content.
+    """
+    buffer = BytesIO()
+    scipy.sparse.save_npz(buffer, scipy.sparse.csr_matrix(matrix))
+    return buffer.getvalue()
+
+
+def stream_message(message, chunks):
+    """
+    Wrap a streamed JSON object as the "result" of a {"message", "result"} response.
+
+    Parameters:
+    - message: The response message.
+    - chunks: The encoded chunks of the result object.
+
+    Returns:
+    - chunks: A generator of encoded JSON chunks.
+    """
+    yield ('{"message": ' + _dumps(message) + ', "result": ').encode("utf-8")
+    yield from chunks
+    yield b"}"
+
+
+def stream_adjacency_list(graph, ndjson=False):
+    """
+    Stream the adjacency list of a graph, one node at a time.
+
+    Parameters:
+    - graph: The NetworkX graph or its NeighborhoodIndex.
+    - ndjson: True to write one {"node", "neighbors"} object per line
+      instead of a JSON list of them.
+
+    Returns:
+    - chunks: A generator of encoded JSON chunks.
+    """
+    if ndjson:
+        for node, neighbors in graph.adjacency():
+            yield (_dumps({"node": node, "neighbors": list(neighbors)}) + "\n").encode("utf-8")
+        return
+    yield b"["
+    for i, (node, neighbors) in enumerate(graph.adjacency()):
+        separator = "" if i == 0 else ", "
+        yield (separator + _dumps({"node": node, "neighbors": list(neighbors)})).encode("utf-8")
+    yield b"]"
@@ -1,24 +1,37 @@
 import networkx as nx
 from networkx.readwrite import json_graph
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import json
+import time
+import asyncio
 from io import StringIO
 
+from . import eccentricity, render
+from .metrics import timed
+from .neighborhood import NeighborhoodIndex
+from .sparse import SparseGraph
+from .storage import CSRGraph
 
+
+@timed("encode")
 def convert_graph_to_json(graph):
     """
     Convert a NetworkX graph to a JSON object.
 
     Parameters:
-    - graph: The NetworkX graph to be converted.
+    - graph: The NetworkX graph to be converted, or its NeighborhoodIndex.
 
     Returns:
     - json_graph: The JSON object representing the graph.
     """
+    if isinstance(graph, NeighborhoodIndex):
+        return graph.node_link_data()
     return json_graph.node_link_data(graph)
 
 
+@timed("decode")
 def convert_json_to_graph(json_g):
     """
     Convert a JSON object to a NetworkX graph.
@@ -32,34 +45,303 @@ def convert_json_to_graph(json_g):
     return json_graph.node_link_graph(json_g)
 
 
-async def read_graph_csv_by_file(file, directed=False):
-    # Leitura do conteúdo do arquivo CSV enviado
-    content = await file.read()
-    # Decodificação do conteúdo para string
-    csv_str = content.decode("utf-8")
-
-    # Utilizando pandas para ler o CSV a partir da string
-    df = pd.read_csv(StringIO(csv_str))
-
-    first_three_columns = df.columns[:3]
-    source_column = first_three_columns[0]
-    target_column = first_three_columns[1]
-    weight_column = first_three_columns[2] if len(
-        first_three_columns) == 3 else None
-
-    if weight_column is not None:
-        # trocar nome da coluna para 'weight'
-        df.rename(columns={weight_column: 'weight'}, inplace=True)
-        weight_column = 'weight'
-
-    if directed:
-        # Criação do grafo utilizando NetworkX
-        G = nx.from_pandas_edgelist(
-            df, source=source_column, target=target_column, edge_attr=weight_column, create_using=nx.DiGraph)
+# Number of CSV rows parsed at a time when building a graph from a CSV upload
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 100000))
+
+
+# How rows repeating an edge are merged: the last weight wins (as NetworkX
+# does), the smallest weight wins, or the weights are added up
+DUPLICATE_POLICIES = ("keep-last", "keep-min", "sum")
+
+# What to do with rows whose source and target are the same node
+SELF_LOOP_POLICIES = ("keep", "drop")
+
+
+def _merge_duplicates(rows, cols, weights, mask, n, directed, duplicates):
+    """
+    Collapse repeated edges with one sort over their keys. Undirected edges
+    are keyed by their (smaller, larger) endpoints, so both orientations merge.
+    Rows without a weight (False in mask) are left out of keep-min and sum,
+    and a merged edge has a weight if any of its rows has one.
+    """
+    if len(rows) == 0:
+        return rows, cols, weights, mask
+    low, high = (rows, cols) if directed else (np.minimum(rows, cols), np.maximum(rows, cols))
+    keys = low * n + high
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    if duplicates == "keep-last":
+        picked = order[np.r_[starts[1:], len(keys)] - 1]
+        return rows[picked], cols[picked], weights[picked], mask[picked] if mask is not None else None
+    picked = order[starts]
+    reduce = np.minimum if duplicates == "keep-min" else np.add
+    weights = weights[order]
+    if mask is not None:
+        mask = mask[order]
+        if duplicates == "keep-min":
+            largest = np.inf if weights.dtype.kind == "f" else np.iinfo(weights.dtype).max
+            weights = np.where(mask, weights, largest)
+        else:
+            weights = np.where(mask, weights, 0)
+        mask = np.logical_or.reduceat(mask, starts)
+        weights = np.where(mask, reduce.reduceat(weights, starts), 0).astype(weights.dtype)
+        return rows[picked], cols[picked], weights, mask
+    return rows[picked], cols[picked], reduce.reduceat(weights, starts), None
+
+
+def factorize_edge_labels(sources, targets):
+    """
+    Number the labels of a chunk of edges in order of first appearance.
+
+    Parameters:
+    - sources: The source labels.
+    - targets: The target labels.
+
+    Returns:
+    - codes: The label positions, interleaved as source, target, source, ...
+    - uniques: The distinct labels.
+    """
+    # Numeric labels are factorized as numbers, anything else as Python objects
+    dtype = sources.dtype if sources.dtype == targets.dtype and sources.dtype.kind in "iuf" else object
+    # Interleaved as source, target, source, ... so labels are numbered in insertion order
+    labels = np.empty(2 * len(sources), dtype=dtype)
+    labels[0::2] = sources
+    labels[1::2] = targets
+    return pd.factorize(labels, use_na_sentinel=False)
+
+
+def _infer_csv_column(values):
+    # Like read_csv does for a whole column: numbers if every value parses
+    # as one, booleans if every value is True or False, text otherwise
+    try:
+        return pd.to_numeric(values)
+    except (ValueError, TypeError):
+        pass
+    lowered = pd.Series(values, dtype=object).str.lower()
+    if len(values) and lowered.isin(("true", "false")).all():
+        return (lowered == "true").to_numpy()
+    return values
+
+
+def _csv_text_edge_chunks(buffer, chunk_rows):
+    # Labels are read as text and factorized per column, so the same text in
+    # the source and in the target column stays two labels until the type of
+    # each column is known
+    chunks = []
+    for df in pd.read_csv(buffer, chunksize=chunk_rows, dtype=str):
+        source_codes, source_uniques = pd.factorize(df.iloc[:, 0].to_numpy(dtype=object), use_na_sentinel=False)
+        target_codes, target_uniques = pd.factorize(df.iloc[:, 1].to_numpy(dtype=object), use_na_sentinel=False)
+        # Interleaved as source, target, source, ... so labels are numbered in insertion order
+        codes = np.empty(2 * len(df), dtype=np.int64)
+        codes[0::2] = source_codes
+        codes[1::2] = target_codes + len(source_uniques)
+        codes, order = pd.factorize(codes)
+        uniques = np.concatenate((source_uniques, target_uniques))[order]
+        weights = np.asarray(_infer_csv_column(df.iloc[:, 2].to_numpy(dtype=object))) if len(df.columns) >= 3 else None
+        chunks.append((codes, uniques, order >= len(source_uniques), weights))
+
+    columns = []
+    for column in (False, True):
+        labels = pd.unique(np.concatenate([uniques[targets == column] for _, uniques, targets, _ in chunks])) \
+            if chunks else np.empty(0, dtype=object)
+        columns.append((pd.Index(labels), np.asarray(_infer_csv_column(labels))))
+    # Numeric labels are kept as numbers, anything else as Python objects
+    dtypes = {values.dtype for _, values in columns}
+    dtype = dtypes.pop() if len(dtypes) == 1 and columns[0][1].dtype.kind in "iuf" else object
+    for codes, uniques, targets, weights in chunks:
+        labels = np.empty(len(uniques), dtype=dtype)
+        for column, (index, values) in zip((False, True), columns):
+            selected = targets == column
+            labels[selected] = values[index.get_indexer(uniques[selected])]
+        yield codes, labels, weights
+
+
+def _csv_edge_chunks(buffer, chunk_rows):
+    """
+    Parse a CSV edge list into chunks for build_csr_from_edge_chunks.
+
+    read_csv infers the type of a column per chunk. When a label column
+    gets the same type in every chunk, that is the type a single read_csv
+    infers for the whole file. Otherwise (say, numbers up to some row and
+    text after it) the file is read again with labels as text, and each
+    label column is typed once for the whole file, so the graph never
+    depends on the chunk size.
+    """
+    start = buffer.tell()
+    chunks = []
+    dtypes = set()
+    for df in pd.read_csv(buffer, chunksize=chunk_rows):
+        dtypes.add((df.dtypes.iloc[0], df.dtypes.iloc[1]))
+        codes, uniques = factorize_edge_labels(df.iloc[:, 0].to_numpy(), df.iloc[:, 1].to_numpy())
+        weights = pd.to_numeric(df.iloc[:, 2]).to_numpy() if len(df.columns) >= 3 else None
+        chunks.append((codes, uniques, weights))
+    if len(dtypes) <= 1:
+        return chunks
+    buffer.seek(start)
+    return _csv_text_edge_chunks(buffer, chunk_rows)
+
+
+def build_csr_from_edge_chunks(chunks, directed=False, duplicates="keep-last", self_loops="keep"):
+    """
+    Build the stored representation of a graph from chunks of an edge list, without NetworkX.
+
+    Each chunk holds its labels already factorized, see
+    factorize_edge_labels. The distinct labels of all chunks are
+    factorized once more into the node table, so no label is handled one
+    by one in Python. Nodes are numbered in order of first appearance, like
+    NetworkX inserts them. Nodes of dropped self-loops are kept.
+
+    Parameters:
+    - chunks: An iterable of (codes, uniques, weights) tuples; weights is None for unweighted edges,
+      or a masked array when only some edges have a weight.
+    - directed: True to build a directed graph (default is False).
+    - duplicates: How repeated edges are merged, see DUPLICATE_POLICIES (default is "keep-last").
+    - self_loops: "keep" or "drop" (default is "keep").
+
+    Returns:
+    - csr: The CSRGraph.
+    - stats: The number of rows and chunks read, the duplicate rows merged,
+      the self-loops dropped, the time spent and the rows per second.
+    """
+    if duplicates not in DUPLICATE_POLICIES:
+        raise ValueError("Unknown duplicate policy: " + str(duplicates))
+    if self_loops not in SELF_LOOP_POLICIES:
+        raise ValueError("Unknown self-loop policy: " + str(self_loops))
+    start = time.perf_counter()
+    chunk_codes, chunk_uniques, weight_chunks, mask_chunks = [], [], [], []
+    weighted = masked = False
+    rows = 0
+    for codes, uniques, weights in chunks:
+        chunk_codes.append(codes)
+        chunk_uniques.append(uniques)
+        if weights is not None:
+            weighted = True
+            # Masked entries are edges without a weight, like a null in an Arrow column
+            mask = ~np.ma.getmaskarray(weights)
+            masked = masked or not mask.all()
+            weights = np.ma.getdata(weights)
+            weight_chunks.append(weights.astype(np.int64) if weights.dtype == bool else weights)
+            mask_chunks.append(mask)
+        rows += len(codes) // 2
+
+    # The distinct labels of each chunk, in chunk order, are factorized again into the node table
+    if len({uniques.dtype for uniques in chunk_uniques}) > 1:
+        chunk_uniques = [uniques.astype(object) for uniques in chunk_uniques]
+    all_uniques = np.concatenate(chunk_uniques) if chunk_uniques else np.empty(0, dtype=object)
+    positions, nodes = pd.factorize(all_uniques, use_na_sentinel=False)
+    offsets = np.cumsum([0] + [len(uniques) for uniques in chunk_uniques])
+    edges = np.concatenate([positions[offset + codes] for offset, codes in zip(offsets, chunk_codes)]) \
+        if chunk_codes else np.empty(0, dtype=np.int64)
+    edge_rows, edge_cols = edges[0::2].astype(np.int64), edges[1::2].astype(np.int64)
+    nodes = nodes.tolist()
+    # Unweighted edges are stored with a weight mask, like CSRGraph.from_networkx does
+    if weighted:
+        weights = np.concatenate(weight_chunks)
+        weights = weights if weights.dtype.kind == "f" else weights.astype(np.int64)
+        weight_mask = np.concatenate(mask_chunks) if masked else None
     else:
-        # Criação do grafo utilizando NetworkX
-        G = nx.from_pandas_edgelist(
-            df, source=source_column, target=target_column, edge_attr=weight_column)
+        weights = np.zeros(len(edge_rows), dtype=np.int64)
+        weight_mask = np.zeros(len(edge_rows), dtype=bool)
+    self_loops_dropped = 0
+    if self_loops == "drop":
+        keep = edge_rows != edge_cols
+        self_loops_dropped = int(len(keep) - np.count_nonzero(keep))
+        edge_rows, edge_cols, weights = edge_rows[keep], edge_cols[keep], weights[keep]
+        weight_mask = weight_mask[keep] if weight_mask is not None else None
+    edge_count = len(edge_rows)
+    edge_rows, edge_cols, weights, weight_mask = _merge_duplicates(edge_rows, edge_cols, weights, weight_mask,
+                                                                   len(nodes), directed, duplicates)
+    csr = CSRGraph.from_edges(nodes, edge_rows, edge_cols, weights, weight_mask, directed)
+    seconds = time.perf_counter() - start
+    stats = {
+        "rows": rows,
+        "chunks": len(chunk_codes),
+        "duplicates": edge_count - len(edge_rows),
+        "self_loops_dropped": self_loops_dropped,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds > 0 else rows,
+    }
+    return csr, stats
+
+
+@timed("ingest")
+def build_csr_from_csv(buffer, directed=False, chunk_rows=CSV_CHUNK_ROWS, duplicates="keep-last", self_loops="keep"):
+    """
+    Build the stored representation of a graph from a CSV edge list, without NetworkX.
+
+    The first two columns are the source and target nodes, and the third
+    one, if any, is the edge weight. Each chunk of rows is factorized into
+    node positions with pandas, see build_csr_from_edge_chunks.
+
+    Parameters:
+    - buffer: The file-like object holding the CSV.
+    - directed: True to build a directed graph (default is False).
+    - chunk_rows: The number of rows parsed at a time.
+    - duplicates: How repeated edges are merged, see DUPLICATE_POLICIES (default is "keep-last").
+    - self_loops: "keep" or "drop" (default is "keep").
+
+    Returns:
+    - csr: The CSRGraph.
+    - stats: The ingest statistics, see build_csr_from_edge_chunks.
+    """
+    return build_csr_from_edge_chunks(_csv_edge_chunks(buffer, chunk_rows), directed, duplicates, self_loops)
+
+
+def build_graph_from_csv(buffer, directed=False, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    Build a NetworkX graph from a CSV edge list, see build_csr_from_csv.
+
+    Returns:
+    - graph: The NetworkX graph.
+    - stats: The ingest statistics, see build_csr_from_csv.
+    """
+    csr, stats = build_csr_from_csv(buffer, directed, chunk_rows)
+    return csr.to_networkx(), stats
+
+
+async def read_graph_csv_stream(file, directed=False, chunk_rows=CSV_CHUNK_ROWS, duplicates="keep-last", self_loops="keep"):
+    """
+    Read graph from an uploaded csv file, streaming it in chunks off the event loop.
+
+    Parameters:
+    - file: The UploadFile holding the CSV.
+    - directed: True to build a directed graph (default is False).
+    - chunk_rows: The number of rows parsed at a time.
+    - duplicates: How repeated edges are merged, see DUPLICATE_POLICIES.
+    - self_loops: "keep" or "drop".
+
+    Returns:
+    - csr: The CSRGraph.
+    - stats: The ingest statistics, see build_csr_from_csv.
+    """
+    await file.seek(0)
+    return await asyncio.to_thread(build_csr_from_csv, file.file, directed, chunk_rows, duplicates, self_loops)
+
+
+async def read_graph_csv_string(csv_str, directed=False, duplicates="keep-last", self_loops="keep"):
+    """
+    Read graph from a csv string off the event loop.
+
+    Parameters:
+    - csv_str: The CSV text.
+    - directed: True to build a directed graph (default is False).
+    - duplicates: How repeated edges are merged, see DUPLICATE_POLICIES.
+    - self_loops: "keep" or "drop".
+
+    Returns:
+    - csr: The CSRGraph.
+    - stats: The ingest statistics, see build_csr_from_csv.
+    """
+    return await asyncio.to_thread(build_csr_from_csv, StringIO(csv_str), directed, CSV_CHUNK_ROWS, duplicates, self_loops)
+
+
+async def read_graph_csv_by_file(file, directed=False):
+    """
+    Read graph from csv file
+    """
+    csr, _ = await read_graph_csv_stream(file, directed=directed)
+    G = csr.to_networkx()
     return G, convert_graph_to_json(G)
 
 
@@ -67,29 +349,76 @@ async def read_graph_csv_by_string(csv_str, directed=False):
     """
     Read graph from csv string
     """
-    # Utilizando pandas para ler o CSV a partir da string
-    df = pd.read_csv(StringIO(csv_str))
+    csr, _ = await read_graph_csv_string(csv_str, directed=directed)
+    G = csr.to_networkx()
+    return G, convert_graph_to_json(G)
 
-    first_three_columns = df.columns[:3]
-    source_column = first_three_columns[0]
-    target_column = first_three_columns[1]
-    weight_column = first_three_columns[2] if len(
-        first_three_columns) == 3 else None
 
-    if weight_column is not None:
-        # trocar nome da coluna para 'weight'
-        df.rename(columns={weight_column: 'weight'}, inplace=True)
-        weight_column = 'weight'
+def apply_mutation(graph, operation, source, target=None, weight=None):
+    """
+    Apply a logged mutation to a graph, in place.
 
-    if directed:
-        # Criação do grafo utilizando NetworkX
-        G = nx.from_pandas_edgelist(
-            df, source=source_column, target=target_column, edge_attr=weight_column, create_using=nx.DiGraph)
+    Parameters:
+    - graph: The NetworkX graph.
+    - operation: "add_edge" or "add_node".
+    - source: The node added, or the source node of the edge.
+    - target: The target node of the edge.
+    - weight: The weight of the edge (optional).
+
+    Returns:
+    - graph: The mutated graph.
+    """
+    if operation == "add_edge":
+        if weight is not None:
+            graph.add_edge(source, target, weight=weight)
+        else:
+            graph.add_edge(source, target)
+    elif operation == "add_node":
+        graph.add_node(source)
     else:
-        # Criação do grafo utilizando NetworkX
-        G = nx.from_pandas_edgelist(
-            df, source=source_column, target=target_column, edge_attr=weight_column)
-    return G, convert_graph_to_json(G)
+        raise ValueError("Unknown mutation: " + str(operation))
+    return graph
+
+
+@timed("parse")
+def parse_edge_batch(content, format="csv"):
+    """
+    Parse a batch of edges and nodes to add to a graph.
+
+    CSV batches use the same columns as create-graph (source, target and an
+    optional weight). JSON arrays and NDJSON lines hold either objects with
+    "source", "target" and an optional "weight", objects with a single
+    "node", or [source, target, weight?] lists.
+
+    Parameters:
+    - content: The batch as a string.
+    - format: "csv", "json" or "ndjson" (default is "csv").
+
+    Returns:
+    - mutations: The list of (operation, source, target, weight) tuples.
+    """
+    if format == "csv":
+        df = pd.read_csv(StringIO(content))
+        weights = df.iloc[:, 2].tolist() if len(df.columns) >= 3 else [None] * len(df)
+        return [("add_edge", source, target, weight)
+                for source, target, weight in zip(df.iloc[:, 0].tolist(), df.iloc[:, 1].tolist(), weights)]
+
+    if format == "json":
+        items = json.loads(content)
+    elif format == "ndjson":
+        items = [json.loads(line) for line in content.splitlines() if line.strip()]
+    else:
+        raise ValueError("Unknown batch format: " + str(format))
+
+    mutations = []
+    for item in items:
+        if isinstance(item, dict) and "node" in item:
+            mutations.append(("add_node", item["node"], None, None))
+        elif isinstance(item, dict):
+            mutations.append(("add_edge", item["source"], item["target"], item.get("weight")))
+        else:
+            mutations.append(("add_edge", item[0], item[1], item[2] if len(item) > 2 else None))
+    return mutations
 
 
 def exists_edge(graph, source, target):
@@ -112,7 +441,7 @@ def exists_node(graph, node):
     Check if a node exists in a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its NeighborhoodIndex.
     - node: The node to be checked.
 
     Returns:
@@ -126,7 +455,7 @@ def get_incoming_edges(graph, node):
     Get the incoming edges of a node in a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its NeighborhoodIndex.
     - node: The node to get the incoming edges.
 
     Returns:
@@ -140,7 +469,7 @@ def get_outgoing_edges(graph, node):
     Get the outgoing edges of a node in a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its NeighborhoodIndex.
     - node: The node to get the outgoing edges.
 
     Returns:
@@ -149,12 +478,13 @@ def get_outgoing_edges(graph, node):
     return list(graph.out_edges(node, data=True))
 
 
+@timed("algorithm")
 def get_adjacent_edges(graph, node, directed=False):
     """
     Get the adjacent edges of a node in a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its NeighborhoodIndex.
     - node: The node to get the adjacent edges.
 
     Returns:
@@ -172,12 +502,13 @@ def get_adjacent_edges(graph, node, directed=False):
     }
 
 
+@timed("algorithm")
 def get_adjacent_degree(graph, node, directed=False):
     """
     Get the adjacent degree of a node in a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its NeighborhoodIndex.
     - node: The node to get the adjacent degree.
 
     Returns:
@@ -195,12 +526,13 @@ def get_adjacent_degree(graph, node, directed=False):
     }
 
 
+@timed("algorithm")
 def get_has_edge(graph, source, target):
     """
     Get the weight of an edge in a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its NeighborhoodIndex.
     - source: The source node.
     - target: The target node.
 
@@ -210,14 +542,38 @@ def get_has_edge(graph, source, target):
     return graph.has_edge(source, target)
 
 
-def get_shortest_path(graph, source, target):
+def get_path_length(graph, path, weight='weight'):
     """
-    Get the shortest path between two nodes in a graph.
+    Get the total weight of a path, counting 1 for edges without weight.
 
     Parameters:
     - graph: The NetworkX graph.
+    - path: The list of nodes of the path.
+    - weight: The edge attribute used as distance.
+
+    Returns:
+    - length: The length of the path.
+    """
+    return sum(graph[u][v].get(weight, 1) for u, v in zip(path, path[1:]))
+
+
+@timed("algorithm")
+def get_shortest_path(graph, source, target, landmarks=None, components=None):
+    """
+    Get the shortest path between two nodes in a graph.
+
+    The path and its length come from a single bidirectional Dijkstra
+    search, or from an A* search bounded by a landmark index if given. On a
+    SparseGraph, they come from a csgraph Dijkstra search and landmarks are
+    not used.
+
+    Parameters:
+    - graph: The NetworkX graph or its SparseGraph.
     - source: The source node.
     - target: The target node.
+    - landmarks: A LandmarkIndex of the graph (optional).
+    - components: A ComponentIndex of the graph, so nodes in different
+      components are reported without a search (optional).
 
     Returns:
     - path: The shortest path between the nodes.
@@ -228,60 +584,206 @@ def get_shortest_path(graph, source, target):
         "message": "No path found!"
     }
     try:
-        result['path'] = nx.shortest_path(
-            graph, source, target, weight='weight')
-        result['shortest_path_length'] = nx.shortest_path_length(
-            graph, source=source, target=target, weight='weight')
+        if components is not None and not components.same_component(source, target):
+            # The messages of the searches below
+            if landmarks is not None and not isinstance(graph, SparseGraph):
+                raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        if isinstance(graph, SparseGraph):
+            result['shortest_path_length'], result['path'] = graph.shortest_path(source, target)
+        elif landmarks is not None:
+            result['path'] = nx.astar_path(
+                graph, source, target, heuristic=landmarks.heuristic(target), weight='weight')
+            result['shortest_path_length'] = get_path_length(graph, result['path'])
+        else:
+            result['shortest_path_length'], result['path'] = nx.bidirectional_dijkstra(
+                graph, source, target, weight='weight')
         result['message'] = "Shortest path found successfully!"
     except nx.exception.NetworkXNoPath as e:
         result['message'] = "No path found! Error: " + str(e)
     return result
 
 
-def get_eccentricity_node(graph, node):
+# Below this number of distinct sources, many-pairs queries run in-process
+PARALLEL_MIN_SOURCES = int(os.getenv("PARALLEL_MIN_SOURCES", 8))
+
+
+def get_shortest_paths_from(graph, source, targets, paths=True):
     """
-    Get the eccentricity of a node in a graph.
+    Get the shortest paths from one node to several targets with a single Dijkstra search.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - source: The source node.
+    - targets: The target nodes.
+    - paths: True to return the paths, False for the lengths only.
+
+    Returns:
+    - results: For each target, a (length, path) tuple, (None, None) if unreachable.
+    """
+    if paths:
+        predecessors, distances = nx.dijkstra_predecessor_and_distance(graph, source, weight='weight')
+    else:
+        predecessors, distances = None, nx.single_source_dijkstra_path_length(graph, source, weight='weight')
+    results = {}
+    for target in targets:
+        if target not in distances:
+            results[target] = (None, None)
+            continue
+        path = None
+        if paths:
+            path = [target]
+            while path[-1] != source:
+                path.append(predecessors[path[-1]][0])
+            path.reverse()
+        results[target] = (distances[target], path)
+    return results
+
+
+def _get_shortest_paths_chunk(graph, groups, paths):
+    return [(source, get_shortest_paths_from(graph, source, targets, paths)) for source, targets in groups]
+
+
+def _get_shared_shortest_paths_chunk(shared, groups, paths):
+    return _get_shortest_paths_chunk(shared.load(), groups, paths)
+
+
+@timed("algorithm")
+def get_many_shortest_paths(graph, pairs, paths=True, pool=None, workers=1, shared=None):
+    """
+    Get the shortest paths of many (source, target) pairs.
+
+    Pairs are grouped by source, so each source needs a single Dijkstra
+    search. With a process pool and enough sources, the groups are split
+    across its workers.
 
     Parameters:
     - graph: The NetworkX graph.
+    - pairs: The list of (source, target) pairs.
+    - paths: True to return the paths, False for the lengths only.
+    - pool: A concurrent.futures executor (optional).
+    - workers: The number of chunks the groups are split into for the pool.
+    - shared: A SharedGraph of the graph, so workers load it once per
+      version instead of receiving it with every task (optional).
+
+    Returns:
+    - results: For each (source, target) pair, a (length, path) tuple.
+    """
+    groups = {}
+    for source, target in pairs:
+        groups.setdefault(source, []).append(target)
+    groups = list(groups.items())
+
+    if pool is None or len(groups) < PARALLEL_MIN_SOURCES:
+        chunks_results = [_get_shortest_paths_chunk(graph, groups, paths)]
+    else:
+        chunks = [chunk for chunk in (groups[i::workers] for i in range(workers)) if chunk]
+        chunks_results = None
+        if shared is not None:
+            futures = [pool.submit(_get_shared_shortest_paths_chunk, shared, chunk, paths) for chunk in chunks]
+            try:
+                chunks_results = [future.result() for future in futures]
+            except LookupError:
+                # A newer snapshot replaced the segment meanwhile, so the graph is sent along
+                chunks_results = None
+        if chunks_results is None:
+            futures = [pool.submit(_get_shortest_paths_chunk, graph, chunk, paths) for chunk in chunks]
+            chunks_results = [future.result() for future in futures]
+
+    results = {}
+    for chunk_results in chunks_results:
+        for source, targets in chunk_results:
+            for target, result in targets.items():
+                results[(source, target)] = result
+    return results
+
+
+@timed("algorithm")
+def get_eccentricity_node(graph, node, weight=None, components=None):
+    """
+    Get the eccentricity of a node in a graph.
+
+    A single search from the node, so in a directed graph a node that
+    reaches every other one has an eccentricity even if the graph is not
+    strongly connected, like in NetworkX.
+
+    Parameters:
+    - graph: The NetworkX graph or its SparseGraph.
     - node: The node to get the eccentricity.
+    - weight: The edge attribute used as distance (default is None, counting hops).
+    - components: A ComponentIndex of the graph, so a disconnected graph fails without a search (optional).
 
     Returns:
     - eccentricity: The eccentricity of the node.
     """
     try:
-        result = nx.eccentricity(graph, v=node)
+        # A node cannot reach other components, whatever the edge directions
+        if components is not None and components.is_connected(strong=False) is False:
+            raise eccentricity.disconnected_error(graph)
+        if isinstance(graph, SparseGraph):
+            result = graph.eccentricity(node, weight)
+        else:
+            result = nx.eccentricity(graph, v=node, weight=weight)
+    except nx.exception.NetworkXError as e:
+        result = "Error in Graph: " + str(e)
+
+    return result
+
+
+@timed("algorithm")
+def get_eccentricities(graph, weight=None, progress=None, components=None):
+    """
+    Get the eccentricity of every node in a graph.
+
+    Parameters:
+    - graph: The NetworkX graph or its SparseGraph.
+    - weight: The edge attribute used as distance (default is None, counting hops).
+    - progress: A function called with the fraction of the work done (optional).
+    - components: A ComponentIndex of the graph, so a disconnected graph fails fast (optional).
+
+    Returns:
+    - eccentricities: The eccentricity of each node.
+    """
+    try:
+        result = eccentricity.eccentricities(graph, weight=weight, progress=progress, components=components)
     except nx.exception.NetworkXError as e:
         result = "Error in Graph: " + str(e)
 
     return result
 
 
+@timed("algorithm")
 def is_eulerian(graph):
     """
     Check if a graph is Eulerian.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its SparseGraph.
 
     Returns:
     - is_eulerian: True if the graph is Eulerian, False otherwise.
     """
+    if isinstance(graph, SparseGraph):
+        return graph.is_eulerian()
     return nx.is_eulerian(graph)
 
 
+@timed("algorithm")
 def is_semi_eulerian(graph):
     """
     Check if a graph is semi-Eulerian.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its SparseGraph.
 
     Returns:
     - is_semi_eulerian: True if the graph is semi-Eulerian, False otherwise.
     """
+    if isinstance(graph, SparseGraph):
+        return graph.is_semi_eulerian()
     return nx.is_semieulerian(graph)
 
+@timed("algorithm")
 def get_size(graph):
     """
     Get the size of a graph.
@@ -294,47 +796,58 @@ def get_size(graph):
     """
     return graph.size()
 
-def get_radius(graph):
+@timed("algorithm")
+def get_radius(graph, weight=None, max_probes=None, progress=None, components=None):
     """
     Get the radius of a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its SparseGraph.
+    - weight: The edge attribute used as distance (default is None, counting hops).
+    - max_probes: Return bounds after this many searches (default is exact).
+    - progress: A function called with the fraction of the work done (optional).
+    - components: A ComponentIndex of the graph, so a disconnected graph fails fast (optional).
 
     Returns:
     - radius: The radius of the graph.
     """
     try:
-        result = nx.radius(graph)
+        result = eccentricity.radius(graph, weight=weight, max_probes=max_probes, progress=progress, components=components)
     except nx.exception.NetworkXError as e:
         result = "Error in Graph: " + str(e)
 
     return result
 
 
-def get_diameter(graph):
+@timed("algorithm")
+def get_diameter(graph, weight=None, max_probes=None, progress=None, components=None):
     """
     Get the diameter of a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its SparseGraph.
+    - weight: The edge attribute used as distance (default is None, counting hops).
+    - max_probes: Return bounds after this many searches (default is exact).
+    - progress: A function called with the fraction of the work done (optional).
+    - components: A ComponentIndex of the graph, so a disconnected graph fails fast (optional).
 
     Returns:
     - diameter: The diameter of the graph.
     """
     try:
-        result = nx.diameter(graph)
+        result = eccentricity.diameter(graph, weight=weight, max_probes=max_probes, progress=progress, components=components)
     except nx.exception.NetworkXError as e:
         result = "Error in Graph: " + str(e)
 
     return result
 
+@timed("algorithm")
 def get_pendent_node(graph, node):
     """
     Get the pendent nodes of a node in a graph.
 
     Parameters:
-    - graph: The NetworkX graph.
+    - graph: The NetworkX graph or its NeighborhoodIndex.
     - node: The node to get the pendent nodes.
 
     Returns:
@@ -357,55 +870,10 @@ def generate_image_from_graph(graph, directed, filename='graph.png'):
     Returns:
     - abs_path: The absolute path of the saved image file.
     """
-    plt.figure(figsize=(12, 8))
-    pos = nx.spring_layout(graph)
-    if directed:
-        options = {
-            'width': 3,
-            'arrowstyle': '-|>',
-            'arrowsize': 25,
-            'arrows': True,
-        }
-        nx.draw_networkx_nodes(graph, pos)
-        nx.draw_networkx_labels(graph, pos)
-        nx.draw_networkx_edges(graph, pos, edge_color='gray',
-                               **options)
-        nx.draw_networkx_edge_labels(
-            graph, pos, edge_labels=nx.get_edge_attributes(graph, 'weight'))
-    else:
-        options = {
-            'width': 3,
-        }
-        nx.draw_networkx_nodes(graph, pos)
-        nx.draw_networkx_labels(graph, pos)
-        nx.draw_networkx_edges(graph, pos, edge_color='gray',
-                               **options)
-        nx.draw_networkx_edge_labels(
-            graph, pos, edge_labels=nx.get_edge_attributes(graph, 'weight'))
-
-    plt.savefig(filename, format='png')
-    plt.close()  # Fecha a figura para liberar memória
+    image = render.draw_graph(graph, directed, render.compute_layout(graph), render.DEFAULT_RENDER_OPTIONS)
+    with open(filename, 'wb') as file:
+        file.write(image)
 
     # Obter o caminho absoluto do arquivo salvo
     abs_path = os.path.abspath(filename)
     return abs_path
-
-
-def generate_adjacency_matrix(graph):
-    """
-    Generate the adjacency matrix of a graph.
-
-    Parameters:
-    - graph: The NetworkX graph.
-
-    Returns:
-    - matrix: The adjacency matrix of the graph.
-    """
-    print(graph.nodes)
-    print(nx.adjacency_matrix(graph))
-    adjacency_matrix = nx.adjacency_matrix(graph).todense().tolist()
-    dict_matrix = {
-        "nodes": list(graph.nodes),
-        "matrix": adjacency_matrix
-    }
-    return dict_matrix
@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+import time
+
+from . import export, functions, render
+from .cache import load_versioned_graph
+from .dao.jobs import JobRepository
+from .db.database import SessionLocal
+from .models.jobs import GraphJob
+from .workers import get_process_pool
+
+# Seconds between two progress writes (and cancellation checks) of a running job
+JOB_PROGRESS_INTERVAL = float(os.getenv("JOB_PROGRESS_INTERVAL", 1))
+
+
+def _boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as file:
+            return file.read().strip()
+    except OSError:
+        return ""
+
+
+def _start_time(pid):
+    # Start time of a process, in clock ticks since boot; pids are reused, start times are not
+    try:
+        with open(f"/proc/{pid}/stat") as file:
+            return file.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ""
+
+
+def process_owner(pid=None):
+    """
+    Get the identity of a server process, as stored in the owner of the jobs it submits.
+
+    Parameters:
+    - pid: The process id (default is the current process).
+
+    Returns:
+    - owner: The boot id, process id and process start time, joined by ":".
+    """
+    pid = os.getpid() if pid is None else pid
+    return f"{_boot_id()}:{pid}:{_start_time(pid)}"
+
+
+def owner_alive(owner):
+    """
+    Check if the server process that owns a job still exists.
+
+    Parameters:
+    - owner: The owner, see process_owner.
+
+    Returns:
+    - alive: True if the process is running.
+    """
+    boot_id, _, pid = owner.partition(":")
+    pid = pid.partition(":")[0]
+    if boot_id != _boot_id() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return process_owner(int(pid)) == owner
+
+
+class JobCancelled(Exception):
+    """
+    Raised in a worker when the job it runs was cancelled.
+    """
+
+
+class _Progress:
+    """
+    Progress callback of a running job: writes the progress at most every
+    JOB_PROGRESS_INTERVAL seconds, and stops the job once it is cancelled.
+    """
+
+    def __init__(self, db, id):
+        self.db = db
+        self.id = id
+        self.last = time.monotonic()
+
+    def __call__(self, fraction):
+        now = time.monotonic()
+        if now - self.last < JOB_PROGRESS_INTERVAL:
+            return
+        self.last = now
+        if JobRepository.find_status(self.db, self.id) != "running":
+            raise JobCancelled()
+        JobRepository.save_progress(self.db, self.id, round(fraction, 4))
+
+
+def _weight(params):
+    return "weight" if params.get("weighted") else None
+
+
+def _diameter(graph, directed, params, progress):
+    return {"diameter": functions.get_diameter(graph, _weight(params), params.get("max_probes"), progress)}
+
+
+def _radius(graph, directed, params, progress):
+    return {"radius": functions.get_radius(graph, _weight(params), params.get("max_probes"), progress)}
+
+
+def _eccentricities(graph, directed, params, progress):
+    eccentricities = functions.get_eccentricities(graph, _weight(params), progress)
+    if not isinstance(eccentricities, dict):
+        return {"eccentricities": eccentricities}
+    # A list keeps node labels that are not strings
+    return {"eccentricities": [{"node": node, "eccentricity": value} for node, value in eccentricities.items()]}
+
+
+def _adjacency_matrix(graph, directed, params, progress):
+    matrix = export.adjacency_matrix(graph).tocoo()
+    return {
+        "nodes": list(graph.nodes),
+        "shape": list(matrix.shape),
+        "entries": [list(entry) for entry in zip(matrix.row.tolist(), matrix.col.tolist(), matrix.data.tolist())],
+    }
+
+
+def _image(graph, directed, params, progress):
+    options = {**render.DEFAULT_RENDER_OPTIONS, **{key: params[key] for key in render.DEFAULT_RENDER_OPTIONS if key in params}}
+    pos = render.compute_layout(graph, params.get("seed"))
+    progress(0.5)
+    key = render.image_key(params["graph_id"], params["version"], {**options, "seed": params.get("seed")})
+    render.write_image(params["graph_id"], key, render.draw_graph(graph, directed, pos, options))
+    return {"image": f"/images/{key}"}
+
+
+# Analyses that can run as jobs, with the parameters each one accepts
+JOB_OPERATIONS = {
+    "diameter": (_diameter, {"weighted", "max_probes"}),
+    "radius": (_radius, {"weighted", "max_probes"}),
+    "eccentricities": (_eccentricities, {"weighted"}),
+    "adjacency-matrix": (_adjacency_matrix, set()),
+    "image": (_image, {"width", "height", "dpi", "labels", "edge_labels", "seed"}),
+}
+
+
+def run_job(id, operation, graph, directed, params):
+    """
+    Run a job in a worker process and store its outcome.
+
+    Parameters:
+    - id: The job id.
+    - operation: The operation, one of JOB_OPERATIONS.
+    - graph: The NetworkX graph.
+    - directed: True if the graph is directed.
+    - params: The job parameters, with the graph id and version added.
+    """
+    db = SessionLocal()
+    try:
+        if not JobRepository.start(db, id):
+            return
+        try:
+            result = JOB_OPERATIONS[operation][0](graph, directed, params, _Progress(db, id))
+            # A round trip through JSON stores exactly what will be served later
+            result = json.loads(json.dumps(result, default=str))
+        except JobCancelled:
+            return
+        except Exception as e:
+            JobRepository.finish(db, id, "failed", error=f"{type(e).__name__}: {e}")
+            return
+        JobRepository.finish(db, id, "done", result=result)
+    finally:
+        db.close()
+
+
+# Futures of the jobs submitted by this process, to cancel the queued ones
+_futures = {}
+_futures_lock = threading.Lock()
+
+
+def _forget(id):
+    with _futures_lock:
+        _futures.pop(id, None)
+
+
+def submit_job(db, graph, operation, params):
+    """
+    Submit an analysis of the current version of a graph, or reuse a job that already ran or is running it.
+
+    Parameters:
+    - db: The database session.
+    - graph: The Graph model instance.
+    - operation: The operation, one of JOB_OPERATIONS.
+    - params: The operation parameters, as a dict.
+
+    Returns:
+    - job: The GraphJob.
+    - reused: True if an equal job was found instead of submitting a new one.
+    """
+    if operation not in JOB_OPERATIONS:
+        raise ValueError("Unknown operation: " + str(operation) + ". Use one of " + ", ".join(JOB_OPERATIONS))
+    unknown = set(params) - JOB_OPERATIONS[operation][1]
+    if unknown:
+        raise ValueError("Unknown parameters for " + operation + ": " + ", ".join(sorted(unknown)))
+    version, graph_object = load_versioned_graph(graph)
+    params_key = json.dumps(params, sort_keys=True)
+    job = JobRepository.find_reusable(db, graph.id, version, operation, params_key)
+    if job is not None:
+        return job, True
+    job = JobRepository.save(db, GraphJob(graph_id=graph.id, version=version, operation=operation,
+                                          params=params, params_key=params_key, owner=process_owner()))
+    future = get_process_pool().submit(run_job, job.id, operation, graph_object, graph.directed,
+                                       {**params, "graph_id": graph.id, "version": version})
+    with _futures_lock:
+        _futures[job.id] = future
+    future.add_done_callback(lambda _: _forget(job.id))
+    return job, False
+
+
+def cancel_job(db, job):
+    """
+    Cancel a queued or running job.
+
+    A queued job never starts. A running one stops at its next progress
+    check; operations without progress checks run to the end, but their
+    result is discarded.
+
+    Parameters:
+    - db: The database session.
+    - job: The GraphJob.
+
+    Returns:
+    - cancelled: True if the job was still active.
+    """
+    with _futures_lock:
+        future = _futures.get(job.id)
+    if future is not None:
+        future.cancel()
+    cancelled = JobRepository.finish(db, job.id, "cancelled")
+    db.refresh(job)
+    return cancelled
+
+
+def serialize_job(job, result=False):
+    """
+    Get the JSON representation of a job.
+
+    Parameters:
+    - job: The GraphJob.
+    - result: True to include the result.
+
+    Returns:
+    - job: The job fields.
+    """
+    data = {
+        "id": job.id,
+        "graph_id": job.graph_id,
+        "version": job.version,
+        "operation": job.operation,
+        "params": job.params,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if result:
+        data["result"] = job.result
+    return data
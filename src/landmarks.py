@@ -0,0 +1,73 @@
+import networkx as nx
+import numpy as np
+
+
+def _distance_column(graph, source, index, weight):
+    column = np.full(len(index), np.inf)
+    for node, distance in nx.single_source_dijkstra_path_length(graph, source, weight=weight).items():
+        column[index[node]] = distance
+    return column
+
+
+class LandmarkIndex:
+    """
+    Distances from and to k landmark nodes, used as A* lower bounds (ALT).
+
+    By the triangle inequality, for every landmark L:
+    d(u, t) >= d(L, t) - d(L, u) and d(u, t) >= d(u, L) - d(t, L).
+    Landmarks are picked farthest-first, starting from the highest degree
+    node, so they sit on the periphery where these bounds are tightest.
+    """
+
+    def __init__(self, graph, k=16, weight="weight"):
+        self.weight = weight
+        self.nodes = list(graph)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        k = min(k, len(self.nodes))
+        self.landmarks = []
+        self.from_landmarks = np.empty((len(self.nodes), k))
+        reverse = graph.reverse(copy=False) if graph.is_directed() else None
+        self.to_landmarks = np.empty((len(self.nodes), k)) if reverse is not None else self.from_landmarks
+
+        closest = np.full(len(self.nodes), np.inf)
+        landmark = max(graph.degree, key=lambda item: item[1])[0] if k else None
+        for j in range(k):
+            self.landmarks.append(landmark)
+            self.from_landmarks[:, j] = _distance_column(graph, landmark, self.index, weight)
+            if reverse is not None:
+                self.to_landmarks[:, j] = _distance_column(reverse, landmark, self.index, weight)
+            closest = np.minimum(closest, self.from_landmarks[:, j])
+            # Unreachable nodes come first, so every component gets a landmark
+            landmark = self.nodes[int(np.argmax(closest))]
+
+    def nbytes(self):
+        """
+        Memory used by the distance arrays, in bytes.
+        """
+        if self.to_landmarks is self.from_landmarks:
+            return self.from_landmarks.nbytes
+        return self.from_landmarks.nbytes + self.to_landmarks.nbytes
+
+    def heuristic(self, target):
+        """
+        Get the A* heuristic towards a target node.
+
+        Parameters:
+        - target: The target node.
+
+        Returns:
+        - heuristic: A function (node, target) returning a lower bound of their distance.
+        """
+        from_target = self.from_landmarks[self.index[target]]
+        to_target = self.to_landmarks[self.index[target]]
+
+        def bound(node, _):
+            i = self.index[node]
+            with np.errstate(invalid="ignore"):
+                # fmax skips the NaN of inf - inf, where a landmark tells nothing
+                return float(np.fmax.reduce(
+                    np.concatenate([from_target - self.from_landmarks[i], self.to_landmarks[i] - to_target]),
+                    initial=0.0,
+                ))
+
+        return bound
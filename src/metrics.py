@@ -0,0 +1,427 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Upper bounds of the graph size histogram buckets, in nodes or edges
+GRAPH_SIZE_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Requests slower than this many seconds dump a sampled profile (unset to disable profiling)
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS")) if os.getenv("PROFILE_SLOW_SECONDS") else None
+
+# Directory of the dumped profiles
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# Seconds between two stack samples of the profiler
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+
+# Seconds of stack samples kept per thread by the profiler
+PROFILE_WINDOW_SECONDS = float(os.getenv("PROFILE_WINDOW_SECONDS", 120))
+
+# Timings of the request being served, see start_request
+_request = ContextVar("request_timings", default=None)
+# Open phases of the current task or thread, innermost last, as [name, start, seconds spent in nested phases]
+_open_phases = ContextVar("open_phases", default=())
+
+
+class Histogram:
+    """
+    Cumulative histogram of observed values, in the Prometheus sense.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Histograms and counters of the process, rendered in the Prometheus text format.
+
+    The hit, miss and eviction counters of registered caches are read from
+    the caches themselves when rendering.
+    """
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._help = {}
+        self._caches = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS, help=""):
+        """
+        Add a value to a histogram.
+
+        Parameters:
+        - name: The metric name.
+        - labels: The label values, as a dict.
+        - value: The observed value.
+        - buckets: The bucket upper bounds, used when the histogram is new.
+        - help: The metric description.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+                self._help.setdefault(name, help)
+            histogram.observe(value)
+
+    def increment(self, name, labels, value=1, help=""):
+        """
+        Add to a counter.
+
+        Parameters:
+        - name: The metric name.
+        - labels: The label values, as a dict.
+        - value: The amount added (default is 1).
+        - help: The metric description.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._help.setdefault(name, help)
+
+    def register_cache(self, name, cache):
+        """
+        Export the counters of a GraphCache.
+
+        Parameters:
+        - name: The cache label.
+        - cache: The GraphCache.
+        """
+        self._caches[name] = cache
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+        - text: The metrics.
+        """
+        with self._lock:
+            histograms = [(key, list(h.buckets), list(h.counts), h.sum, h.count)
+                          for key, h in sorted(self._histograms.items())]
+            counters = sorted(self._counters.items())
+            helps = dict(self._help)
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# HELP {name} {helps.get(name, '')}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), buckets, counts, total, count in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        caches = sorted((name, cache.stats()) for name, cache in self._caches.items())
+        for metric, kind in (("hits", "counter"), ("misses", "counter"), ("evictions", "counter"), ("bytes", "gauge")):
+            name = f"cache_{metric}" if kind == "gauge" else f"cache_{metric}_total"
+            helps[name] = f"Cache {metric}, per cache."
+            declare(name, kind)
+            for cache_name, stats in caches:
+                lines.append(f"{name}{_format_labels((('cache', cache_name),))} {stats[metric]}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+
+registry = Registry()
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread at a fixed interval.
+
+    The samples of the last PROFILE_WINDOW_SECONDS are kept per thread, so
+    once a request turns out to be slow its samples can still be dumped. A
+    request is sampled on the threads it ran on; async endpoints share the
+    event loop thread, so their profiles also hold the other requests it
+    served meanwhile.
+    """
+
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL, window=PROFILE_WINDOW_SECONDS):
+        self.interval = interval
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """
+        Start the sampling thread, if it is not running yet.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own:
+                        continue
+                    samples = self._samples.setdefault(ident, deque())
+                    samples.append((now, _fold(frame)))
+                    while samples and samples[0][0] < now - self.window:
+                        samples.popleft()
+                for ident in set(self._samples) - set(frames):
+                    del self._samples[ident]
+            time.sleep(self.interval)
+
+    def collect(self, threads, start, end):
+        """
+        Count the stacks sampled on some threads during a time range.
+
+        Parameters:
+        - threads: The thread identifiers.
+        - start: The start of the range, in time.perf_counter seconds.
+        - end: The end of the range.
+
+        Returns:
+        - stacks: The number of samples of each folded stack.
+        """
+        stacks = Counter()
+        with self._lock:
+            for ident in threads:
+                for sampled_at, stack in self._samples.get(ident, ()):
+                    if start <= sampled_at <= end:
+                        stacks[stack] += 1
+        return stacks
+
+
+def _fold(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+profiler = SamplingProfiler()
+
+
+def start_request():
+    """
+    Start timing a request in the current context.
+
+    Returns:
+    - timings: The timings of the request, filled in by the phases run for it.
+    """
+    timings = {"start": time.perf_counter(), "phases": {}, "db_queries": 0,
+               "threads": {threading.get_ident()}, "nodes": None, "edges": None}
+    _request.set(timings)
+    if PROFILE_SLOW_SECONDS is not None:
+        profiler.start()
+    return timings
+
+
+def _add_phase(name, seconds, elapsed):
+    """
+    Credit the exclusive time of a phase to the request, and its elapsed time to the enclosing phase.
+    """
+    timings = _request.get()
+    if timings is not None:
+        timings["phases"][name] = timings["phases"].get(name, 0.0) + seconds
+        timings["threads"].add(threading.get_ident())
+    stack = _open_phases.get()
+    if stack:
+        stack[-1][2] += elapsed
+
+
+@contextmanager
+def phase(name):
+    """
+    Time a phase of the current request.
+
+    Nested phases are only counted in the innermost one, so the phases of a
+    request never add up to more than its total time.
+
+    Parameters:
+    - name: The phase name, e.g. "decode" or "algorithm".
+    """
+    frame = [name, time.perf_counter(), 0.0]
+    token = _open_phases.set(_open_phases.get() + (frame,))
+    try:
+        yield
+    finally:
+        _open_phases.reset(token)
+        elapsed = time.perf_counter() - frame[1]
+        _add_phase(name, elapsed - frame[2], elapsed)
+
+
+def timed(name):
+    """
+    Decorate a function so its calls are timed as a phase of the current request.
+
+    Parameters:
+    - name: The phase name.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_query(seconds):
+    """
+    Count a database query of the current request.
+
+    Parameters:
+    - seconds: The time the query took.
+    """
+    timings = _request.get()
+    if timings is not None:
+        timings["db_queries"] += 1
+    _add_phase("db", seconds, seconds)
+
+
+def record_graph(graph):
+    """
+    Record the size of the graph a request works on.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    """
+    timings = _request.get()
+    if timings is not None:
+        timings["nodes"] = graph.number_of_nodes()
+        timings["edges"] = graph.number_of_edges()
+
+
+def instrument_engine(engine):
+    """
+    Time every query run through a SQLAlchemy engine as the "db" phase.
+
+    Parameters:
+    - engine: The engine (the sync_engine of an async engine).
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        record_query(time.perf_counter() - conn.info["query_start"].pop())
+
+
+def server_timing(timings, total):
+    """
+    Format the timings of a request as a Server-Timing header value.
+
+    Parameters:
+    - timings: The timings returned by start_request.
+    - total: The total time of the request, in seconds.
+
+    Returns:
+    - header: The header value, durations in milliseconds.
+    """
+    entries = []
+    for name, seconds in timings["phases"].items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == "db":
+            entry += f';desc="{timings["db_queries"]} queries"'
+        entries.append(entry)
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def finish_request(timings, route, method, status):
+    """
+    Record the timings of a request in the registry, and dump its profile if it was slow.
+
+    Parameters:
+    - timings: The timings returned by start_request.
+    - route: The route path template.
+    - method: The HTTP method.
+    - status: The response status code.
+
+    Returns:
+    - total: The total time of the request, in seconds.
+    """
+    end = time.perf_counter()
+    total = end - timings["start"]
+    labels = {"route": route, "method": method}
+    registry.observe("http_request_duration_seconds", {**labels, "status": status}, total,
+                     help="Request latency, per route.")
+    for name, seconds in timings["phases"].items():
+        registry.observe("http_request_phase_seconds", {**labels, "phase": name}, seconds,
+                         help="Time spent in each phase of a request, per route.")
+    registry.increment("db_queries_total", labels, timings["db_queries"],
+                       help="Database queries run, per route.")
+    if timings["nodes"] is not None:
+        registry.observe("graph_nodes", labels, timings["nodes"], GRAPH_SIZE_BUCKETS,
+                         help="Nodes of the graph a request worked on, per route.")
+        registry.observe("graph_edges", labels, timings["edges"], GRAPH_SIZE_BUCKETS,
+                         help="Edges of the graph a request worked on, per route.")
+    if PROFILE_SLOW_SECONDS is not None and total >= PROFILE_SLOW_SECONDS:
+        dump_profile(timings, route, method, total, end)
+    return total
+
+
+def dump_profile(timings, route, method, total, end):
+    """
+    Write the stacks sampled during a request in the folded format read by flame graph tools.
+
+    Parameters:
+    - timings: The timings returned by start_request.
+    - route: The route path template.
+    - method: The HTTP method.
+    - total: The total time of the request, in seconds.
+    - end: The end of the request, in time.perf_counter seconds.
+
+    Returns:
+    - path: The path of the profile, or None if no stack was sampled.
+    """
+    stacks = profiler.collect(timings["threads"], timings["start"], end)
+    if not stacks:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%dT%H%M%S')}-{method}-{name}-{round(total * 1000)}ms.folded")
+    with open(path, "w") as file:
+        for stack, count in stacks.most_common():
+            file.write(f"{stack} {count}\n")
+    return path
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+
+from ..db.database import Base
+
+class GraphDegree(Base):
+    __tablename__ = "graph_degrees"
+    __table_args__ = (UniqueConstraint("graph_id", "node"),)
+
+    id: int = Column(Integer, primary_key=True, index=True)
+    graph_id: int = Column(Integer, ForeignKey("graphs.id"), nullable=False, index=True)
+    # Insertion order of the node in the graph
+    position: int = Column(Integer, nullable=False)
+    # JSON-encoded node label, so 1 and "1" stay distinct nodes
+    node: str = Column(String, nullable=False)
+    degree: int = Column(Integer, nullable=False, default=0)
+    # Only set for directed graphs
+    in_degree: int = Column(Integer, nullable=True)
+    out_degree: int = Column(Integer, nullable=True)
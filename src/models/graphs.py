@@ -1,10 +1,45 @@
-from sqlalchemy import Column, Integer, JSON, Boolean
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, JSON, Boolean, LargeBinary, DateTime, Index
 
 from ..db.database import Base
 
+
+def utcnow():
+    """
+    Get the current UTC time as a naive datetime, as stored in DateTime columns.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Graph(Base):
     __tablename__ = "graphs"
+    # (column, id) indexes for the keyset pagination of the graph listing
+    __table_args__ = (
+        Index("ix_graphs_updated_at_id", "updated_at", "id"),
+        Index("ix_graphs_node_count_id", "node_count", "id"),
+        Index("ix_graphs_edge_count_id", "edge_count", "id"),
+        Index("ix_graphs_byte_size_id", "byte_size", "id"),
+    )
 
     id: int = Column(Integer, primary_key=True, index=True)
+    # Legacy node_link JSON payload, migrated to `data` on first load
     graph: str = Column(JSON, nullable=True)
-    directed: bool = Column(Boolean, nullable=False, default=False)
\ No newline at end of file
+    # Binary CSR payload, see src/storage.py
+    data: bytes = Column(LargeBinary, nullable=True)
+    directed: bool = Column(Boolean, nullable=False, default=False)
+    # Head version, bumped by every mutation
+    version: int = Column(Integer, nullable=False, default=0, server_default="0")
+    # Version the stored payload reflects; later mutations live in graph_mutations
+    snapshot_version: int = Column(Integer, nullable=False, default=0, server_default="0")
+    # Order, size and degree counters, see src/summary.py
+    summary: dict = Column(JSON, nullable=True)
+    # Listing metadata, so graphs can be listed without reading their payload.
+    # `backfill` fills the column when migrate adds it to an older table.
+    node_count: int = Column(Integer, nullable=True, info={"backfill": "json_extract(summary, '$.order')"})
+    edge_count: int = Column(Integer, nullable=True, info={"backfill": "json_extract(summary, '$.size')"})
+    byte_size: int = Column(Integer, nullable=True, info={"backfill": "length(coalesce(data, graph))"})
+    # Time of the last change of the content, set by bump_version. Written by
+    # the application, so it has the format SQLAlchemy compares it with.
+    updated_at = Column(DateTime, nullable=True, default=utcnow,
+                        info={"backfill": "strftime('%Y-%m-%d %H:%M:%f000', 'now')"})
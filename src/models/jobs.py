@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, JSON, String, Float, Text, DateTime, ForeignKey, Index
+
+from ..db.database import Base
+from .graphs import utcnow
+
+
+class GraphJob(Base):
+    __tablename__ = "graph_jobs"
+    # Finished results are looked up by graph version, operation and parameters
+    __table_args__ = (
+        Index("ix_graph_jobs_lookup", "graph_id", "version", "operation", "params_key"),
+    )
+
+    id: int = Column(Integer, primary_key=True, index=True)
+    graph_id: int = Column(Integer, ForeignKey("graphs.id"), nullable=False)
+    # Graph version the job runs on
+    version: int = Column(Integer, nullable=False)
+    # One of src.jobs.JOB_OPERATIONS
+    operation: str = Column(String, nullable=False)
+    params = Column(JSON, nullable=False)
+    # The parameters as canonical JSON, so equal requests compare equal
+    params_key: str = Column(String, nullable=False)
+    # "queued", "running", "done", "failed" or "cancelled"
+    status: str = Column(String, nullable=False, default="queued")
+    # Fraction of the work done, from 0 to 1
+    progress: float = Column(Float, nullable=False, default=0.0)
+    result = Column(JSON, nullable=True)
+    error: str = Column(Text, nullable=True)
+    # Server process that submitted the job, see src.jobs.process_owner
+    owner: str = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
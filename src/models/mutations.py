@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, JSON, String, ForeignKey, UniqueConstraint, Index
+
+from ..db.database import Base
+
+class GraphMutation(Base):
+    __tablename__ = "graph_mutations"
+    __table_args__ = (
+        UniqueConstraint("graph_id", "version"),
+        Index("ix_graph_mutations_edge", "graph_id", "source", "target"),
+    )
+
+    id: int = Column(Integer, primary_key=True, index=True)
+    graph_id: int = Column(Integer, ForeignKey("graphs.id"), nullable=False, index=True)
+    # Graph version produced by this mutation
+    version: int = Column(Integer, nullable=False)
+    # "add_edge" or "add_node"
+    operation: str = Column(String, nullable=False)
+    source: str = Column(String, nullable=False)
+    target: str = Column(String, nullable=True)
+    weight = Column(JSON, nullable=True)
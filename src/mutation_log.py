@@ -0,0 +1,164 @@
+import os
+
+from . import functions, storage, summary
+from .cache import advance_components, graph_cache, load_versioned_graph
+from .dao.degrees import DegreeRepository
+from .dao.graphs import GraphRepository
+from .dao.mutations import MutationRepository
+from .db.database import SessionLocal
+from .events import change_feed
+
+# Number of logged mutations after which a graph is folded into a new snapshot
+MUTATION_LOG_MAX_LENGTH = int(os.getenv("MUTATION_LOG_MAX_LENGTH", 1000))
+
+# Number of times a batch is recomputed when another writer commits first, before it takes the write lock up front
+BATCH_OPTIMISTIC_ATTEMPTS = int(os.getenv("BATCH_OPTIMISTIC_ATTEMPTS", 3))
+
+# Number of versions still logged after compaction, so change feeds can catch up without a reset
+MUTATION_LOG_RETENTION = int(os.getenv("MUTATION_LOG_RETENTION", 1000))
+
+
+def append_mutation(db, graph, operation, source, target=None, weight=None):
+    """
+    Log a mutation of a graph and update its summary, in a single transaction.
+
+    Parameters:
+    - db: The database session.
+    - graph: The Graph model instance.
+    - operation: "add_edge" or "add_node".
+    - source: The node added, or the source node of the edge.
+    - target: The target node of the edge.
+    - weight: The weight of the edge (optional).
+
+    Returns:
+    - version: The version produced by the mutation.
+    """
+    try:
+        # Bumping the version first takes the write lock, so concurrent
+        # writers get distinct versions and none of them is lost
+        version = GraphRepository.bump_version(db, graph.id)
+        summary.update_summary(db, graph, version, operation, source, target)
+        MutationRepository.add(db, graph.id, version, operation, source, target, weight)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    advance_components(graph.id, version - 1, version, [(operation, source, target, weight)])
+    change_feed.publish(graph.id)
+    return version
+
+
+def needs_compaction(graph):
+    """
+    Check if the mutation log of a graph has grown past the compaction threshold.
+
+    Parameters:
+    - graph: The Graph model instance.
+
+    Returns:
+    - needs_compaction: True if the graph should be compacted, False otherwise.
+    """
+    return graph.version - graph.snapshot_version >= MUTATION_LOG_MAX_LENGTH
+
+
+def compact_graph(id):
+    """
+    Fold the mutation log of a graph into a new stored snapshot.
+
+    Runs as a background task with its own session. Mutations logged while
+    the snapshot is being written have a higher version and are kept.
+
+    Parameters:
+    - id: The graph id.
+    """
+    db = SessionLocal()
+    try:
+        graph = GraphRepository.find_by_id(db, id)
+        if graph is None or graph.version == graph.snapshot_version:
+            return
+        version, graph_object = load_versioned_graph(graph)
+        data = storage.encode_graph(graph_object)
+        # End the read transaction, so the write below waits for the lock instead of failing
+        db.commit()
+        if GraphRepository.save_snapshot(db, id, data, version):
+            # Snapshot replays start after the snapshot version, so retained rows are only read by change feeds
+            MutationRepository.delete_until(db, id, version - MUTATION_LOG_RETENTION)
+    finally:
+        db.close()
+
+
+def _apply_mutations(graph_object, mutations):
+    result = {"edges_added": 0, "duplicates_merged": 0, "new_nodes": 0}
+    graph_object = graph_object.copy()
+    touched = set()
+    for operation, source, target, weight in mutations:
+        nodes = [source] if operation == "add_node" else [source, target]
+        touched.update(nodes)
+        result["new_nodes"] += sum(1 for node in set(nodes) if not graph_object.has_node(node))
+        if operation == "add_edge":
+            if graph_object.has_edge(source, target):
+                result["duplicates_merged"] += 1
+            else:
+                result["edges_added"] += 1
+        functions.apply_mutation(graph_object, operation, source, target, weight)
+    return result, graph_object, touched
+
+
+def apply_batch(db, graph, mutations):
+    """
+    Apply a batch of mutations to a graph in a single transaction.
+
+    The batch is applied to one decoded copy of the graph, which is stored
+    as a new snapshot with a single version bump, instead of logging every
+    mutation.
+
+    The new snapshot and summary are computed before taking the write lock,
+    so other writers only wait for the rows to be written. If another
+    mutation was committed meanwhile, the batch starts over from it; after
+    BATCH_OPTIMISTIC_ATTEMPTS tries it takes the lock first instead.
+
+    Parameters:
+    - db: The database session.
+    - graph: The Graph model instance.
+    - mutations: The list of (operation, source, target, weight) tuples.
+
+    Returns:
+    - result: The new version and the counts of edges added, duplicate edges merged and new nodes.
+    """
+    for attempt in range(BATCH_OPTIMISTIC_ATTEMPTS + 1):
+        locked = attempt == BATCH_OPTIMISTIC_ATTEMPTS
+        try:
+            if locked:
+                # Takes the write lock, so the graph cannot change until the commit
+                version = GraphRepository.bump_version(db, graph.id)
+                base_version, graph_object = load_versioned_graph(graph, version - 1, commit=False)
+            else:
+                base_version, graph_object = load_versioned_graph(graph)
+            result, graph_object, touched = _apply_mutations(graph_object, mutations)
+            data = storage.encode_graph(graph_object)
+            graph_summary, degrees = summary.compute_summary(graph_object)
+            touched = {summary.encode_node(node) for node in touched}
+            if not locked:
+                version = GraphRepository.bump_version(db, graph.id)
+                if version != base_version + 1:
+                    # Rolling back also expires graph, so the next attempt reads its new version
+                    db.rollback()
+                    continue
+            GraphRepository.save_snapshot(db, graph.id, data, version, commit=False)
+            MutationRepository.delete_until(db, graph.id, version, commit=False)
+            if GraphRepository.find_summary(db, graph.id) is None:
+                DegreeRepository.replace_all(db, graph.id, degrees)
+            else:
+                # Only the degrees of the nodes in the batch changed
+                DegreeRepository.upsert_all(db, graph.id, [row for row in degrees if row["node"] in touched])
+            GraphRepository.save_summary(db, graph.id, graph_summary)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        break
+    graph_cache.put(graph.id, version, graph_object)
+    advance_components(graph.id, base_version, version, mutations)
+    change_feed.publish(graph.id)
+    result["version"] = version
+    return result
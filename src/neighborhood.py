@@ -0,0 +1,513 @@
+import json
+
+import numpy as np
+
+from .storage import CSRGraph, weight_arrays
+
+# Number of nodes or edges encoded per streamed chunk
+STREAM_CHUNK_ITEMS = 1024
+
+
+class NeighborhoodIndex:
+    """
+    Adjacency of a graph for k-hop neighborhood queries, on the CSR arrays of its snapshot.
+
+    The snapshot arrays are shared, never copied. Edges logged after the
+    snapshot are kept in small overlay dicts of node position to
+    {neighbor position: weight}; an overlay edge that repeats a snapshot
+    edge replaces it, and the snapshot slot is masked out. Directed graphs
+    also get the reverse (incoming) adjacency, as slot numbers into the
+    snapshot arrays sorted by target.
+
+    Frontiers are expanded a whole hop at a time with numpy, so no node
+    label is touched until the result is written. The index also answers
+    NetworkX's read methods (edges, degree, has_edge, adjacency), so reads
+    never need the decoded graph. Edges come in the order of the graph
+    decoded from the snapshot: each row by neighbor position (nodes are
+    numbered in order of first appearance), then the edges added since, in
+    the order they were added. That is not the order the snapshot edges
+    were first inserted in.
+    """
+
+    def __init__(self, csr):
+        self.nodes = csr.nodes
+        self.index = csr.index
+        self.directed = csr.directed
+        self.n = len(csr.nodes)
+        self.indptr = csr.indptr
+        self.indices = csr.indices
+        self.weights = csr.weights
+        self.weight_mask = csr.weight_mask
+        self.integral = bool(np.issubdtype(csr.weights.dtype, np.integer))
+        weights = csr.weights if csr.weight_mask is None else csr.weights[csr.weight_mask]
+        self.negative = bool(weights.min(initial=0) < 0)
+        self.added = {}
+        self.added_nodes = []
+        self.out_overlay = {}
+        self.in_overlay = {}
+        self.overridden = set()
+        self._overridden = None
+        self.reverse_indptr = self.reverse_indices = self.reverse_slots = None
+        # Shared segments carry the reverse adjacency, so it is not built again
+        self.shared_reverse = "reverse_slots" in getattr(csr, "derived", {})
+        if self.directed:
+            # Incoming edges of node i are the slots reverse_slots[reverse_indptr[i]:reverse_indptr[i + 1]]
+            self.reverse_indptr, self.reverse_indices, self.reverse_slots = csr.reverse_index()
+
+    def copy(self):
+        index = object.__new__(NeighborhoodIndex)
+        index.__dict__.update(self.__dict__)
+        index.added = dict(self.added)
+        index.added_nodes = list(self.added_nodes)
+        index.out_overlay = {position: dict(neighbors) for position, neighbors in self.out_overlay.items()}
+        index.in_overlay = {position: dict(neighbors) for position, neighbors in self.in_overlay.items()}
+        index.overridden = set(self.overridden)
+        return index
+
+    def nbytes(self):
+        """
+        Memory used by the arrays of the index itself, in bytes; the snapshot arrays are not counted.
+        """
+        if self.shared_reverse:
+            return 0
+        arrays = [self.reverse_indptr, self.reverse_indices, self.reverse_slots]
+        return sum(array.nbytes for array in arrays if array is not None)
+
+    def number_of_nodes(self):
+        return self.n + len(self.added_nodes)
+
+    def is_directed(self):
+        return self.directed
+
+    def labels(self):
+        """
+        Get the node labels, in NetworkX's node order.
+        """
+        return list(self.nodes) + self.added_nodes
+
+    def _position(self, node):
+        position = self.index.get(node)
+        return position if position is not None else self.added.get(node)
+
+    def has_node(self, node):
+        return self._position(node) is not None
+
+    def _label(self, position):
+        return self.nodes[position] if position < self.n else self.added_nodes[position - self.n]
+
+    def _slot(self, u, v):
+        # Rows of the snapshot are sorted, so an edge is found by bisection
+        if u >= self.n or v >= self.n:
+            return None
+        start, stop = self.indptr[u], self.indptr[u + 1]
+        slot = start + np.searchsorted(self.indices[start:stop], v)
+        return int(slot) if slot < stop and self.indices[slot] == v else None
+
+    def _weight(self, u, v):
+        # The weight of an existing edge, and whether the edge exists
+        if v in self.out_overlay.get(u, ()):
+            return self.out_overlay[u][v], True
+        slot = self._slot(u, v)
+        if slot is None:
+            return None, False
+        if self.weight_mask is not None and not self.weight_mask[slot]:
+            return None, True
+        return self.weights[slot].item(), True
+
+    def add_node(self, node):
+        """
+        Add a node, if it is not in the index yet.
+
+        Returns:
+        - position: The position of the node.
+        """
+        position = self._position(node)
+        if position is None:
+            position = self.n + len(self.added_nodes)
+            self.added[node] = position
+            self.added_nodes.append(node)
+        return position
+
+    def add_edge(self, source, target, weight=None):
+        """
+        Add an edge, or update the weight of an existing one, like NetworkX does.
+        """
+        u, v = self.add_node(source), self.add_node(target)
+        if weight is None:
+            weight, _ = self._weight(u, v)
+        if weight is not None:
+            self.integral = self.integral and isinstance(weight, int)
+            self.negative = self.negative or weight < 0
+        pairs = [(u, v)] if self.directed or u == v else [(u, v), (v, u)]
+        for a, b in pairs:
+            self.out_overlay.setdefault(a, {})[b] = weight
+            slot = self._slot(a, b)
+            if slot is not None:
+                self.overridden.add(slot)
+                self._overridden = None
+        if self.directed:
+            self.in_overlay.setdefault(v, {})[u] = weight
+
+    def apply_mutation(self, operation, source, target=None, weight=None):
+        """
+        Apply a logged mutation, like functions.apply_mutation does to the graph.
+        """
+        if operation == "add_node":
+            self.add_node(source)
+        elif operation == "add_edge":
+            self.add_edge(source, target, weight)
+        else:
+            raise ValueError("Unknown mutation: " + str(operation))
+
+    def _row(self, position, reverse=False):
+        # Neighbor position to weight (None without one), in the decoded graph's
+        # adjacency order: the snapshot row by position, then the neighbors added since
+        row = {}
+        if position < self.n:
+            if reverse:
+                start, stop = self.reverse_indptr[position], self.reverse_indptr[position + 1]
+                neighbors, slots = self.reverse_indices[start:stop], self.reverse_slots[start:stop]
+            else:
+                start, stop = self.indptr[position], self.indptr[position + 1]
+                neighbors, slots = self.indices[start:stop], slice(start, stop)
+            weights = self.weights[slots].tolist()
+            if self.weight_mask is not None:
+                weights = [w if m else None for w, m in zip(weights, self.weight_mask[slots].tolist())]
+            row = dict(zip(neighbors.tolist(), weights))
+        row.update((self.in_overlay if reverse else self.out_overlay).get(position, {}))
+        return row
+
+    def _edge(self, u, v, w, data):
+        if not data:
+            return self._label(u), self._label(v)
+        return self._label(u), self._label(v), {} if w is None else {"weight": w}
+
+    def edges(self, node=None, data=False):
+        """
+        Get the edges of the graph, or those leaving a node, like NetworkX's graph.edges.
+
+        Parameters:
+        - node: The node label (default is None, every edge).
+        - data: True to add the {"weight": weight} attributes of each edge.
+
+        Returns:
+        - edges: The (source, target) or (source, target, attributes) tuples, in the decoded graph's order.
+        """
+        if node is None:
+            labels = self.labels()
+            rows, cols, weights = self.edge_list()
+            if not data:
+                return [(labels[u], labels[v]) for u, v in zip(rows.tolist(), cols.tolist())]
+            return [(labels[u], labels[v], {} if w is None else {"weight": w})
+                    for u, v, w in zip(rows.tolist(), cols.tolist(), weights)]
+        u = self._position(node)
+        return [self._edge(u, v, w, data) for v, w in self._row(u).items()]
+
+    def out_edges(self, node, data=False):
+        return self.edges(node, data)
+
+    def in_edges(self, node, data=False):
+        """
+        Get the edges entering a node of a directed graph, like NetworkX's graph.in_edges.
+        """
+        v = self._position(node)
+        return [self._edge(u, v, w, data) for u, w in self._row(v, reverse=True).items()]
+
+    def degree(self, node):
+        """
+        Get the degree of a node, like NetworkX: a self-loop counts twice, and
+        in a directed graph the degree is the in-degree plus the out-degree.
+        """
+        u = self._position(node)
+        row = self._row(u)
+        if self.directed:
+            return len(row) + len(self._row(u, reverse=True))
+        return len(row) + (u in row)
+
+    def has_edge(self, source, target):
+        u, v = self._position(source), self._position(target)
+        return u is not None and v is not None and self._weight(u, v)[1]
+
+    def _adjacency_arrays(self):
+        # Every stored edge, undirected ones both ways, in the decoded graph's adjacency order
+        rows = np.repeat(np.arange(self.n), np.diff(self.indptr))
+        cols = np.asarray(self.indices, dtype=np.int64)
+        weights = np.empty(len(cols), dtype=object)
+        weights[:] = self.weights.tolist()
+        if self.weight_mask is not None:
+            weights[~self.weight_mask] = None
+        # Overlay edges that repeat a snapshot edge keep its place, the others follow the snapshot row
+        extra = []
+        for u, neighbors in self.out_overlay.items():
+            for v, w in neighbors.items():
+                slot = self._slot(u, v)
+                if slot is None:
+                    extra.append((u, v, w))
+                else:
+                    weights[slot] = w
+        if extra:
+            u, v, w = zip(*extra)
+            added = np.empty(len(w), dtype=object)
+            added[:] = w
+            rows, cols = np.concatenate((rows, u)), np.concatenate((cols, v))
+            weights = np.concatenate((weights, added))
+            order = np.argsort(rows, kind="stable")
+            rows, cols, weights = rows[order], cols[order], weights[order]
+        return rows, cols, weights
+
+    def edge_list(self):
+        """
+        Get every edge in the order of the graph decoded from the snapshot, each undirected edge once.
+
+        Returns:
+        - rows: The source node positions.
+        - cols: The target node positions.
+        - weights: The edge weights, None where an edge has no weight.
+        """
+        rows, cols, weights = self._adjacency_arrays()
+        if not self.directed:
+            # NetworkX skips the neighbors it has already been through, which come before in node order
+            keep = cols >= rows
+            rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        return rows, cols, weights.tolist()
+
+    def adjacency(self):
+        """
+        Iterate over the nodes and their neighbors, like NetworkX's graph.adjacency.
+
+        Returns:
+        - adjacency: A generator of (node, {neighbor: attributes}) pairs.
+        """
+        labels = self.labels()
+        rows, cols, weights = self._adjacency_arrays()
+        bounds = np.searchsorted(rows, np.arange(len(labels) + 1)).tolist()
+        cols, weights = cols.tolist(), weights.tolist()
+        for u, node in enumerate(labels):
+            start, stop = bounds[u], bounds[u + 1]
+            yield node, {labels[v]: {} if w is None else {"weight": w} for v, w in zip(cols[start:stop], weights[start:stop])}
+
+    def node_link_data(self):
+        """
+        Get the graph as node-link JSON, like networkx.node_link_data.
+        """
+        labels = self.labels()
+        rows, cols, weights = self.edge_list()
+        links = [{"source": labels[u], "target": labels[v]} if w is None else {"weight": w, "source": labels[u], "target": labels[v]}
+                 for u, v, w in zip(rows.tolist(), cols.tolist(), weights)]
+        return {"directed": self.directed, "multigraph": False, "graph": {}, "nodes": [{"id": node} for node in labels], "links": links}
+
+    def to_csr(self):
+        """
+        Get the CSR arrays of the graph, the edges added since the snapshot included.
+
+        Returns:
+        - csr: The CSRGraph.
+        """
+        rows, cols, values = self.edge_list()
+        weights, weight_mask = weight_arrays(values)
+        return CSRGraph.from_edges(self.labels(), rows, cols, weights, weight_mask, self.directed)
+
+    def _gather(self, positions, reverse=False):
+        """
+        Get the edges leaving (or, with reverse, entering) a set of nodes.
+
+        Parameters:
+        - positions: The node positions.
+        - reverse: True for the incoming edges of a directed graph.
+
+        Returns:
+        - sources: The positions of the given nodes, one per edge.
+        - targets: The positions of their neighbors.
+        - weights: The edge weights, NaN where an edge has no weight.
+        """
+        if reverse:
+            indptr, neighbors, slots, overlay = self.reverse_indptr, self.reverse_indices, self.reverse_slots, self.in_overlay
+        else:
+            indptr, neighbors, slots, overlay = self.indptr, self.indices, None, self.out_overlay
+        inside = positions[positions < self.n]
+        starts = indptr[inside]
+        counts = indptr[inside + 1] - starts
+        # The slot ranges of all the nodes, concatenated
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        sources = np.repeat(inside, counts)
+        targets = neighbors[offsets]
+        offsets = offsets if slots is None else slots[offsets]
+        if self.overridden:
+            if self._overridden is None:
+                self._overridden = np.fromiter(self.overridden, dtype=np.int64, count=len(self.overridden))
+            keep = ~np.isin(offsets, self._overridden)
+            sources, targets, offsets = sources[keep], targets[keep], offsets[keep]
+        weights = self.weights[offsets].astype(np.float64)
+        if self.weight_mask is not None:
+            weights[~self.weight_mask[offsets]] = np.nan
+        if overlay:
+            keys = np.fromiter(overlay, dtype=np.int64, count=len(overlay))
+            extra = [(u, v, w) for u in keys[np.isin(keys, positions)].tolist() for v, w in overlay[u].items()]
+            if extra:
+                u, v, w = zip(*extra)
+                sources = np.concatenate((sources, u))
+                targets = np.concatenate((targets, v))
+                weights = np.concatenate((weights, np.array(w, dtype=np.float64)))
+        return sources, targets, weights
+
+    def _step(self, positions, direction):
+        if not self.directed or direction == "out":
+            return self._gather(positions)
+        if direction == "in":
+            return self._gather(positions, reverse=True)
+        outgoing, incoming = self._gather(positions), self._gather(positions, reverse=True)
+        return tuple(np.concatenate(pair) for pair in zip(outgoing, incoming))
+
+    def _expand_hops(self, start, max_hops, direction, max_nodes):
+        # Breadth-first, a hop at a time; stops as soon as max_nodes nodes are reached
+        levels = [np.array([start])]
+        seen = levels[0]
+        count, truncated = 1, False
+        while max_hops is None or len(levels) <= max_hops:
+            _, targets, _ = self._step(levels[-1], direction)
+            new = np.setdiff1d(targets, seen)
+            if max_nodes is not None and len(new) > max_nodes - count:
+                new, truncated = new[:max_nodes - count], True
+            if not len(new):
+                break
+            levels.append(new)
+            seen = np.union1d(seen, new)
+            count += len(new)
+        positions = np.concatenate(levels)
+        hops = np.repeat(np.arange(len(levels)), [len(level) for level in levels])
+        return positions, hops, None, truncated
+
+    def _expand_cost(self, start, max_hops, max_cost, direction, max_nodes):
+        # Relaxes the whole frontier a hop at a time, so costs are the
+        # cheapest within the hop limit, and hops those of the cheapest path
+        positions, costs, hops = np.array([start]), np.array([0.0]), np.array([0])
+        frontier, frontier_costs = positions, costs
+        rounds = 0
+        while len(frontier) and (max_hops is None or rounds < max_hops):
+            rounds += 1
+            sources, targets, weights = self._step(frontier, direction)
+            # Edges without a weight count 1
+            candidates = frontier_costs[np.searchsorted(frontier, sources)] + np.where(np.isnan(weights), 1, weights)
+            keep = candidates <= max_cost
+            targets, candidates = targets[keep], candidates[keep]
+            order = np.lexsort((candidates, targets))
+            targets, candidates = targets[order], candidates[order]
+            first = np.ones(len(targets), dtype=bool)
+            first[1:] = targets[1:] != targets[:-1]
+            targets, candidates = targets[first], candidates[first]
+            found = np.searchsorted(positions, targets)
+            known = found < len(positions)
+            known[known] = positions[found[known]] == targets[known]
+            improved = ~known
+            improved[known] = candidates[known] < costs[found[known]]
+            targets, candidates, found, known = targets[improved], candidates[improved], found[improved], known[improved]
+            costs[found[known]] = candidates[known]
+            hops[found[known]] = rounds
+            if (~known).any():
+                positions = np.concatenate((positions, targets[~known]))
+                costs = np.concatenate((costs, candidates[~known]))
+                hops = np.concatenate((hops, np.full((~known).sum(), rounds)))
+                order = np.argsort(positions, kind="stable")
+                positions, costs, hops = positions[order], costs[order], hops[order]
+            frontier, frontier_costs = targets, candidates
+        order = np.lexsort((positions, hops, costs))
+        truncated = max_nodes is not None and len(order) > max_nodes
+        order = order[:max_nodes]
+        return positions[order], hops[order], costs[order], truncated
+
+    def _value(self, weight):
+        if np.isnan(weight):
+            return None
+        return int(weight) if self.integral else float(weight)
+
+    def neighborhood(self, node, max_hops=1, max_cost=None, direction="both", max_nodes=None, max_edges=None, edges=True):
+        """
+        Get the nodes within a number of hops and a path cost of a node, and the edges between them.
+
+        Without a cost limit the nodes are found breadth-first, nearest
+        hops first. With one, edge weights are path costs (edges without a
+        weight count 1) and the cheapest path of at most max_hops edges
+        decides, like nx.ego_graph with a distance.
+
+        Parameters:
+        - node: The center node label.
+        - max_hops: The maximum number of edges from the center (default is 1; None for no limit).
+        - max_cost: The maximum path cost from the center (default is None, no limit).
+        - direction: For directed graphs, follow "out" edges, "in" edges or "both" (default is "both").
+        - max_nodes: The maximum number of nodes returned, the center included; the nearest are kept.
+        - max_edges: The maximum number of edges returned.
+        - edges: True to return the edges between the nodes (the ego-subgraph).
+
+        Returns:
+        - neighborhood: The center, the nodes with their hops (and costs), the
+          edges between them, and whether nodes or edges were left out.
+        """
+        start = self._position(node)
+        if max_cost is not None and max_hops is None and self.negative:
+            raise ValueError("A cost limit on a graph with negative weights needs a hop limit")
+        if max_cost is None:
+            positions, hops, costs, nodes_truncated = self._expand_hops(start, max_hops, direction, max_nodes)
+        else:
+            positions, hops, costs, nodes_truncated = self._expand_cost(start, max_hops, max_cost, direction, max_nodes)
+        nodes = []
+        for i, position in enumerate(positions.tolist()):
+            entry = {"node": self._label(position), "hops": int(hops[i])}
+            if costs is not None:
+                entry["cost"] = self._value(costs[i])
+            nodes.append(entry)
+        result = {"center": node, "nodes": nodes, "edges": [], "truncated": {"nodes": bool(nodes_truncated), "edges": False}}
+        if edges:
+            selected = np.sort(positions)
+            sources, targets, weights = self._gather(selected)
+            keep = np.isin(targets, selected)
+            if not self.directed:
+                # Undirected edges are stored both ways, so each is kept once
+                keep &= sources <= targets
+            sources, targets, weights = sources[keep], targets[keep], weights[keep]
+            if max_edges is not None and len(sources) > max_edges:
+                sources, targets, weights = sources[:max_edges], targets[:max_edges], weights[:max_edges]
+                result["truncated"]["edges"] = True
+            for u, v, w in zip(sources.tolist(), targets.tolist(), weights):
+                edge = {"source": self._label(u), "target": self._label(v)}
+                weight = self._value(w)
+                if weight is not None:
+                    edge["weight"] = weight
+                result["edges"].append(edge)
+        return result
+
+
+def _dumps(value):
+    return json.dumps(value, default=str)
+
+
+def _stream_items(items):
+    for start in range(0, len(items), STREAM_CHUNK_ITEMS):
+        separator = "" if start == 0 else ", "
+        yield (separator + ", ".join(_dumps(item) for item in items[start:start + STREAM_CHUNK_ITEMS])).encode("utf-8")
+
+
+def stream_neighborhood(neighborhood, ndjson=False):
+    """
+    Stream a neighborhood, see NeighborhoodIndex.neighborhood.
+
+    Parameters:
+    - neighborhood: The neighborhood.
+    - ndjson: True to write a {"center", "truncated"} line, then one line
+      per node and one per edge, instead of a JSON object.
+
+    Returns:
+    - chunks: A generator of encoded JSON chunks.
+    """
+    head = {"center": neighborhood["center"], "truncated": neighborhood["truncated"]}
+    if ndjson:
+        yield (_dumps(head) + "\n").encode("utf-8")
+        for key in ("nodes", "edges"):
+            items = neighborhood[key]
+            for start in range(0, len(items), STREAM_CHUNK_ITEMS):
+                yield "".join(_dumps(item) + "\n" for item in items[start:start + STREAM_CHUNK_ITEMS]).encode("utf-8")
+        return
+    yield (_dumps(head)[:-1] + ', "nodes": [').encode("utf-8")
+    yield from _stream_items(neighborhood["nodes"])
+    yield b'], "edges": ['
+    yield from _stream_items(neighborhood["edges"])
+    yield b"]}"
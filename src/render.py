@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import tempfile
+from io import BytesIO
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+
+from .viewport import detect_communities
+
+# Directory of the rendered image cache
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "renders")
+
+# Largest graph laid out with a single spring layout
+LAYOUT_SPRING_MAX_NODES = int(os.getenv("LAYOUT_SPRING_MAX_NODES", 200))
+
+# Spring layout iterations run when refining the layout of a previous version
+LAYOUT_REFINE_ITERATIONS = int(os.getenv("LAYOUT_REFINE_ITERATIONS", 10))
+
+DEFAULT_RENDER_OPTIONS = {
+    "width": 12,
+    "height": 8,
+    "dpi": 100,
+    "labels": True,
+    "edge_labels": True,
+}
+
+
+def _spring_layout(graph, seed=None):
+    pos = nx.spring_layout(graph, seed=seed)
+    return {node: position.tolist() for node, position in pos.items()}
+
+
+def _multilevel_layout(graph, seed=None):
+    """
+    Lay out the communities of a graph, then the nodes of each community around its position.
+
+    NetworkX's spring layout is quadratic in the number of nodes, so it only
+    runs on graphs of up to LAYOUT_SPRING_MAX_NODES nodes; bigger communities
+    are split again.
+    """
+    undirected = graph.to_undirected(as_view=True) if graph.is_directed() else graph
+    groups = detect_communities(graph, seed)
+    if len(groups) == 1 or len(groups) > graph.number_of_nodes() // 2:
+        # No useful partition, split the nodes in insertion order so every level shrinks
+        nodes = list(graph)
+        groups = [set(nodes[i:i + LAYOUT_SPRING_MAX_NODES]) for i in range(0, len(nodes), LAYOUT_SPRING_MAX_NODES)]
+    community = {node: c for c, group in enumerate(groups) for node in group}
+    quotient = nx.Graph()
+    quotient.add_nodes_from(range(len(groups)))
+    for u, v in undirected.edges():
+        a, b = community[u], community[v]
+        if a != b:
+            quotient.add_edge(a, b, weight=quotient.get_edge_data(a, b, {"weight": 0})["weight"] + 1)
+    top = _layout(quotient, seed)
+    pos = {}
+    for c, group in enumerate(groups):
+        radius = 0.5 * (len(group) / graph.number_of_nodes()) ** 0.5
+        for node, (x, y) in _layout(graph.subgraph(group), seed).items():
+            pos[node] = [top[c][0] + radius * x, top[c][1] + radius * y]
+    return {node: pos[node] for node in graph}
+
+
+def _layout(graph, seed=None):
+    if graph.number_of_nodes() <= LAYOUT_SPRING_MAX_NODES:
+        return _spring_layout(graph, seed)
+    return _multilevel_layout(graph, seed)
+
+
+def _place_new_nodes(graph, initial, seed=None):
+    """
+    Keep the positions of a previous layout and put each new node next to its placed neighbors.
+    """
+    rng = np.random.default_rng(seed)
+    pos = {node: list(initial[node]) for node in graph if node in initial}
+    for node in graph:
+        if node not in pos:
+            placed = [pos[neighbor] for neighbor in nx.all_neighbors(graph, node) if neighbor in pos]
+            center = np.mean(placed, axis=0) if placed else rng.uniform(-1, 1, 2)
+            pos[node] = (center + rng.normal(0, 0.01, 2)).tolist()
+    return pos
+
+
+def compute_layout(graph, seed=None, initial=None):
+    """
+    Compute the layout of a graph: a spring layout, or a multilevel one for
+    graphs with more than LAYOUT_SPRING_MAX_NODES nodes.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - seed: The random seed of the layout (default is None).
+    - initial: The positions of a previous layout to refine, so nodes keep
+      their place across versions (default is a new layout).
+
+    Returns:
+    - pos: The position of each node, as a [x, y] list.
+    """
+    if not initial:
+        return _layout(graph, seed)
+    if graph.number_of_nodes() > LAYOUT_SPRING_MAX_NODES:
+        return _place_new_nodes(graph, initial, seed)
+    initial = {node: position for node, position in initial.items() if node in graph}
+    pos = nx.spring_layout(graph, pos=initial or None, iterations=LAYOUT_REFINE_ITERATIONS, seed=seed)
+    return {node: position.tolist() for node, position in pos.items()}
+
+
+def draw_graph(graph, directed, pos, options):
+    """
+    Draw a graph with precomputed positions and return the PNG image.
+
+    Runs in a worker process, so concurrent renders never share a figure or a file.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - directed: True to draw arrows.
+    - pos: The position of each node.
+    - options: The render options, see DEFAULT_RENDER_OPTIONS.
+
+    Returns:
+    - image: The PNG image bytes.
+    """
+    figure = plt.figure(figsize=(options["width"], options["height"]))
+    edge_options = {'width': 3}
+    if directed:
+        edge_options.update({
+            'arrowstyle': '-|>',
+            'arrowsize': 25,
+            'arrows': True,
+        })
+    nx.draw_networkx_nodes(graph, pos)
+    if options["labels"]:
+        nx.draw_networkx_labels(graph, pos)
+    nx.draw_networkx_edges(graph, pos, edge_color='gray', **edge_options)
+    if options["edge_labels"]:
+        nx.draw_networkx_edge_labels(
+            graph, pos, edge_labels=nx.get_edge_attributes(graph, 'weight'))
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', dpi=options["dpi"])
+    plt.close(figure)
+    return buffer.getvalue()
+
+
+def image_key(id, version, options):
+    """
+    Get the cache key of a rendered image.
+
+    Parameters:
+    - id: The graph id.
+    - version: The graph version.
+    - options: The render options.
+
+    Returns:
+    - key: The key, also the file name in RENDER_CACHE_DIR.
+    """
+    digest = hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return f"{id}-{version}-{digest}.png"
+
+
+def image_path(key):
+    """
+    Get the path of a cached image, or None if the key is not a valid image key.
+    """
+    if os.path.basename(key) != key or not key.endswith(".png"):
+        return None
+    return os.path.join(RENDER_CACHE_DIR, key)
+
+
+def read_image(key):
+    """
+    Read a cached image.
+
+    Parameters:
+    - key: The image key.
+
+    Returns:
+    - image: The PNG image bytes, or None if it is not cached.
+    """
+    path = image_path(key)
+    if path is None or not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def write_image(id, key, image):
+    """
+    Store a rendered image, dropping the cached images of older versions of the graph.
+
+    The file is written under a temporary name and renamed, so readers never
+    see a partial image.
+
+    Parameters:
+    - id: The graph id.
+    - key: The image key.
+    - image: The PNG image bytes.
+    """
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    version = int(key.split("-")[1])
+    for name in os.listdir(RENDER_CACHE_DIR):
+        parts = name.split("-")
+        if len(parts) == 3 and parts[0] == str(id) and parts[1].isdigit() and int(parts[1]) < version:
+            try:
+                os.remove(os.path.join(RENDER_CACHE_DIR, name))
+            except FileNotFoundError:
+                pass
+    with tempfile.NamedTemporaryFile(dir=RENDER_CACHE_DIR, prefix=".", suffix=".tmp", delete=False) as file:
+        file.write(image)
+    os.replace(file.name, image_path(key))
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from .db.database import engine
+from .functions import apply_mutation
+from .storage import CSRGraph
+
+# Number of graphs a pool worker keeps decoded, see SharedGraph
+WORKER_GRAPH_CACHE_SIZE = int(os.getenv("WORKER_GRAPH_CACHE_SIZE", 4))
+
+# Directory of the graph segments shared by the server processes; tmpfs keeps
+# them in memory. Empty disables sharing, so every process decodes its own copy.
+SHARED_GRAPH_DIR = os.getenv("SHARED_GRAPH_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir())
+
+_MAGIC = b"GRAPHSEG"
+_HEADER = struct.Struct("<8sQ")
+# Arrays start on cache line boundaries
+_ALIGN = 64
+_ARRAYS = ("indptr", "indices", "weights", "weight_mask")
+# Arrays derived from the CSR ones, shared too so no process builds its own copy
+_DERIVED = ("distances", "reverse_indptr", "reverse_sources", "reverse_slots")
+
+
+class SharedCSRGraph(CSRGraph):
+    """
+    CSR graph whose arrays are read-only views of a memory-mapped segment.
+
+    The pages are shared by every process that attached the segment. The
+    mapping is released when the arrays are garbage collected. The float64
+    distances and the incoming adjacency are views of the segment too.
+    """
+
+    def __init__(self, path, nodes, indptr, indices, weights, weight_mask=None, directed=False, derived=None):
+        super().__init__(nodes, indptr, indices, weights, weight_mask, directed)
+        self.path = path
+        self.derived = derived or {}
+
+    def distances(self):
+        if "distances" in self.derived:
+            return self.derived["distances"]
+        return super().distances()
+
+    def reverse_index(self):
+        if "reverse_slots" in self.derived:
+            return self.derived["reverse_indptr"], self.derived["reverse_sources"], self.derived["reverse_slots"]
+        return super().reverse_index()
+
+
+def _derived_arrays(csr):
+    arrays = {}
+    distances = csr.distances()
+    if distances is not csr.weights:
+        arrays["distances"] = distances
+    if csr.directed:
+        arrays["reverse_indptr"], arrays["reverse_sources"], arrays["reverse_slots"] = csr.reverse_index()
+    return arrays
+
+
+def _align(offset):
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _namespace(database):
+    # A database file recreated at the same path gets a new inode, and so a new namespace
+    return "graph-management-" + hashlib.sha1(f"{database}:{os.stat(database).st_ino}".encode("utf-8")).hexdigest()[:16]
+
+
+def _directory():
+    # One directory per database, so servers run from different directories never share ids
+    database = os.path.abspath(engine.url.database)
+    directory = os.path.join(SHARED_GRAPH_DIR, _namespace(database))
+    if not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "database"), "w") as file:
+            file.write(database)
+    return directory
+
+
+def _segment_path(directory, id, version):
+    return os.path.join(directory, f"{id}-{version}.seg")
+
+
+def _segment_versions(directory, id):
+    versions = []
+    for name in os.listdir(directory):
+        graph_id, _, rest = name.partition("-")
+        if graph_id == str(id) and rest.endswith(".seg"):
+            versions.append(int(rest[:-len(".seg")]))
+    return versions
+
+
+def publish_csr(id, version, csr):
+    """
+    Write the snapshot of a graph version as a shared segment, and unlink the older ones.
+
+    The segment is renamed into place, so readers never see a partial one.
+    Unlinked segments stay readable by the processes that attached them,
+    and their memory is freed once the last of them lets go.
+
+    Parameters:
+    - id: The graph id.
+    - version: The snapshot version.
+    - csr: The CSRGraph of the snapshot.
+    """
+    if not SHARED_GRAPH_DIR:
+        return
+    directory = _directory()
+    nodes = json.dumps(csr.nodes).encode("utf-8")
+    arrays = {name: getattr(csr, name) for name in _ARRAYS if getattr(csr, name) is not None}
+    arrays.update(_derived_arrays(csr))
+    layout = {"id": id, "version": version, "directed": csr.directed, "nodes": len(nodes), "arrays": {}}
+    offset = len(nodes)
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout["arrays"][name] = [array.dtype.str, len(array), offset]
+        offset += array.nbytes
+    header = json.dumps(layout).encode("utf-8")
+    start = _align(_HEADER.size + len(header))
+
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(_HEADER.pack(_MAGIC, len(header)) + header)
+            file.seek(start)
+            file.write(nodes)
+            for name, array in arrays.items():
+                file.seek(start + layout["arrays"][name][2])
+                file.write(np.ascontiguousarray(array).tobytes())
+        os.replace(temporary, _segment_path(directory, id, version))
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    for old in _segment_versions(directory, id):
+        if old < version:
+            try:
+                os.unlink(_segment_path(directory, id, old))
+            except FileNotFoundError:
+                pass
+
+
+def attach_csr(id, version):
+    """
+    Map the shared segment of a graph snapshot version.
+
+    Parameters:
+    - id: The graph id.
+    - version: The snapshot version.
+
+    Returns:
+    - csr: The SharedCSRGraph, or None if no process published that version.
+    """
+    if not SHARED_GRAPH_DIR:
+        return None
+    path = _segment_path(_directory(), id, version)
+    try:
+        with open(path, "rb") as file:
+            segment = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+    magic, length = _HEADER.unpack_from(segment)
+    if magic != _MAGIC:
+        return None
+    layout = json.loads(segment[_HEADER.size:_HEADER.size + length])
+    if layout["id"] != id or layout["version"] != version:
+        return None
+    start = _align(_HEADER.size + length)
+    arrays = {
+        name: np.frombuffer(segment, dtype=np.dtype(dtype), count=count, offset=start + offset) if count else np.empty(0, dtype)
+        for name, (dtype, count, offset) in layout["arrays"].items()
+    }
+    # Labels are Python objects, so each process keeps its own table
+    nodes = json.loads(segment[start:start + layout["nodes"]])
+    return SharedCSRGraph(path, nodes, arrays["indptr"], arrays["indices"], arrays["weights"],
+                          arrays.get("weight_mask"), layout["directed"],
+                          {name: arrays[name] for name in _DERIVED if name in arrays})
+
+
+class SharedGraph:
+    """
+    Reference to a graph version, passed to process pool tasks instead of the graph.
+
+    It holds the snapshot version and the mutations logged since, so it is
+    cheap to pickle. A worker decodes the graph from the shared segment of
+    the snapshot the first time a task needs that version, and keeps it for
+    the next tasks.
+    """
+
+    def __init__(self, id, version, snapshot_version, mutations):
+        self.id = id
+        self.version = version
+        self.snapshot_version = snapshot_version
+        self.mutations = mutations
+
+    def load(self):
+        """
+        Get the NetworkX graph, in a worker process.
+
+        Returns:
+        - graph: The NetworkX graph, shared with the other tasks of the worker.
+        """
+        key = (self.id, self.version)
+        graph = _worker_graphs.get(key)
+        if graph is not None:
+            _worker_graphs.move_to_end(key)
+            return graph
+        csr = attach_csr(self.id, self.snapshot_version)
+        if csr is None:
+            raise LookupError(f"Graph {self.id} has no shared segment for version {self.snapshot_version}")
+        graph = csr.to_networkx()
+        for operation, source, target, weight in self.mutations:
+            apply_mutation(graph, operation, source, target, weight)
+        _worker_graphs[key] = graph
+        while len(_worker_graphs) > WORKER_GRAPH_CACHE_SIZE:
+            _worker_graphs.popitem(last=False)
+        return graph
+
+
+# Graphs decoded by this process for pool tasks, keyed by graph id and version
+_worker_graphs = OrderedDict()
+
+
+def remove_orphan_segments():
+    """
+    Remove the segment directories of databases that no longer exist, or were recreated.
+    """
+    if not SHARED_GRAPH_DIR or not os.path.isdir(SHARED_GRAPH_DIR):
+        return
+    for name in os.listdir(SHARED_GRAPH_DIR):
+        directory = os.path.join(SHARED_GRAPH_DIR, name)
+        if not name.startswith("graph-management-"):
+            continue
+        try:
+            with open(os.path.join(directory, "database")) as file:
+                database = file.read()
+        except OSError:
+            continue
+        if not os.path.exists(database) or _namespace(database) != name:
+            shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,166 @@
+import networkx as nx
+import numpy as np
+from scipy.sparse import csgraph, csr_matrix
+
+from .eccentricity import disconnected_error
+
+
+class SparseGraph:
+    """
+    Integer-indexed scipy.sparse adjacency of a graph, for the csgraph backend.
+
+    Built once per graph version from its CSRGraph. Edges without a weight
+    count 1, like in NetworkX's shortest path functions. Distances are
+    returned as ints when every weight is an int, so results match the
+    NetworkX path exactly.
+    """
+
+    def __init__(self, csr):
+        self.nodes = csr.nodes
+        self.index = csr.index
+        self.directed = csr.directed
+        self.csr = csr
+        n = len(self.nodes)
+        # csgraph keeps explicit zeros of a sparse matrix as edges. The arrays
+        # are used as they are, views of the shared segment if csr is attached
+        distances = csr.distances()
+        self.integral = bool(np.issubdtype(csr.weights.dtype, np.integer) or csr.weights.dtype == bool)
+        self.negative = bool(len(distances) and distances.min() < 0)
+        self.matrix = csr_matrix((distances, csr.indices, csr.indptr), shape=(n, n))
+        self._reverse = None
+
+    def nbytes(self):
+        """
+        Memory used by the matrices, in bytes, not counting the arrays they share with the CSR graph.
+        """
+        arrays = [self.matrix.data, self.matrix.indices, self.matrix.indptr]
+        if self._reverse is not None:
+            arrays += [self._reverse.data, self._reverse.indices, self._reverse.indptr]
+        csr = [self.csr.weights, self.csr.indices, self.csr.indptr, *getattr(self.csr, "derived", {}).values()]
+        return sum(array.nbytes for array in arrays if not any(np.shares_memory(array, other) for other in csr))
+
+    def is_directed(self):
+        return self.directed
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def has_node(self, node):
+        return node in self.index
+
+    def _matrix(self, weight, reverse=False):
+        # Hop counts use the same matrix, csgraph ignores its data when unweighted
+        if not reverse or not self.directed:
+            return self.matrix
+        if self._reverse is None:
+            indptr, sources, slots = self.csr.reverse_index()
+            n = len(self.nodes)
+            self._reverse = csr_matrix((self.matrix.data[slots], sources, indptr), shape=(n, n))
+        return self._reverse
+
+    def value(self, distance, weight="weight"):
+        """
+        Convert a csgraph distance to the type NetworkX returns for it.
+        """
+        if (weight is None or self.integral) and np.isfinite(distance):
+            return int(distance)
+        return float(distance)
+
+    def distances(self, source, weight=None, reverse=False):
+        """
+        Get the distances from (or, with reverse, to) a node: BFS if unweighted, Dijkstra otherwise.
+
+        Parameters:
+        - source: The node position.
+        - weight: "weight" to use the edge weights, or None to count hops.
+        - reverse: True for the distances to the node.
+
+        Returns:
+        - distances: The distance of each node, inf if unreachable.
+        """
+        return csgraph.dijkstra(self._matrix(weight, reverse), directed=True, indices=source, unweighted=weight is None)
+
+    def shortest_path(self, source, target):
+        """
+        Get the weighted shortest path between two nodes with a single Dijkstra search.
+
+        When several paths are equally short, the one returned may differ
+        from the one NetworkX returns; the length is the same.
+
+        Parameters:
+        - source: The source node label.
+        - target: The target node label.
+
+        Returns:
+        - length: The length of the path.
+        - path: The node labels of the path.
+        """
+        if source == target:
+            return 0, [source]
+        u, v = self.index[source], self.index[target]
+        distances, predecessors = csgraph.dijkstra(self.matrix, directed=True, indices=u, return_predecessors=True)
+        if not np.isfinite(distances[v]):
+            raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+        path = [v]
+        while path[-1] != u:
+            path.append(int(predecessors[path[-1]]))
+        return self.value(distances[v]), [self.nodes[i] for i in reversed(path)]
+
+    def eccentricity(self, node, weight=None):
+        """
+        Get the eccentricity of a node, from a single search.
+
+        Parameters:
+        - node: The node label.
+        - weight: "weight" to use the edge weights, or None to count hops.
+
+        Returns:
+        - eccentricity: The eccentricity of the node.
+        """
+        distances = self.distances(self.index[node], weight)
+        if not np.isfinite(distances).all():
+            raise disconnected_error(self)
+        return self.value(distances.max(), weight)
+
+    def degrees(self):
+        """
+        Get the in and out degree of every node; for undirected graphs both
+        are the degree, with self-loops counted twice.
+        """
+        n = len(self.nodes)
+        out_degrees = np.diff(self.matrix.indptr)
+        if self.directed:
+            return np.bincount(self.matrix.indices, minlength=n), out_degrees
+        rows = np.repeat(np.arange(n), out_degrees)
+        degrees = out_degrees + np.bincount(rows[rows == self.matrix.indices], minlength=n)
+        return degrees, degrees
+
+    def is_connected(self, strong=True):
+        """
+        Check if the graph is connected (strongly or weakly, if directed).
+        """
+        if len(self.nodes) == 0:
+            raise nx.NetworkXPointlessConcept("Connectivity is undefined for the null graph.")
+        count = csgraph.connected_components(self.matrix, directed=self.directed,
+                                             connection="strong" if strong else "weak", return_labels=False)
+        return count == 1
+
+    def is_eulerian(self):
+        in_degrees, out_degrees = self.degrees()
+        if self.directed:
+            return bool((in_degrees == out_degrees).all()) and self.is_connected()
+        return bool((out_degrees % 2 == 0).all()) and self.is_connected()
+
+    def has_eulerian_path(self):
+        if self.is_eulerian():
+            return True
+        in_degrees, out_degrees = self.degrees()
+        if self.directed:
+            balance = out_degrees - in_degrees
+            if np.abs(balance).max() > 1:
+                return False
+            return bool((balance == 1).sum() <= 1 and (balance == -1).sum() <= 1 and self.is_connected(strong=False))
+        return bool((out_degrees % 2 == 1).sum() == 2 and self.is_connected())
+
+    def is_semi_eulerian(self):
+        return self.has_eulerian_path() and not self.is_eulerian()
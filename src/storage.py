@@ -0,0 +1,295 @@
+import json
+from io import BytesIO
+
+import networkx as nx
+import numpy as np
+
+
+def weight_arrays(values):
+    """
+    Convert edge weights to a weights array and its mask.
+
+    Parameters:
+    - values: The edge weights, None for an edge without one.
+
+    Returns:
+    - weights: int64 if every weight is an int, float64 otherwise.
+    - weight_mask: Which edges have a weight, or None if all of them do.
+    """
+    weight_mask = None
+    if any(w is None for w in values):
+        weight_mask = np.array([w is not None for w in values], dtype=bool)
+        values = [0 if w is None else w for w in values]
+    if all(isinstance(w, (int, np.integer)) for w in values):
+        return np.array(values, dtype=np.int64), weight_mask
+    return np.array(values, dtype=np.float64), weight_mask
+
+
+class CSRGraph:
+    """
+    Compact array representation of a stored graph.
+
+    Nodes are interned in a label table and referenced by their position in
+    it. The adjacency is kept in CSR form: the targets of node i are
+    indices[indptr[i]:indptr[i + 1]], sorted, with their weights at the same
+    positions. Undirected graphs are stored symmetrically (each edge in both
+    rows, self-loops once). weight_mask is only present when some edges have
+    no weight, and marks the ones that do.
+    """
+
+    def __init__(self, nodes, indptr, indices, weights, weight_mask=None, directed=False):
+        self.nodes = nodes
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.weight_mask = weight_mask
+        self.directed = directed
+        self._index = None
+
+    @property
+    def index(self):
+        """
+        Mapping of node label to its position in the node table.
+        """
+        if self._index is None:
+            self._index = {node: i for i, node in enumerate(self.nodes)}
+        return self._index
+
+    @property
+    def weighted(self):
+        """
+        True if at least one edge has a weight.
+        """
+        if self.weight_mask is not None:
+            return bool(self.weight_mask.any())
+        return len(self.weights) > 0
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        if self.directed:
+            return len(self.indices)
+        rows = np.repeat(np.arange(len(self.nodes)), np.diff(self.indptr))
+        return int(np.count_nonzero(rows <= self.indices))
+
+    def has_edge(self, source, target):
+        """
+        Check if an edge exists, with a binary search in the source row.
+
+        Parameters:
+        - source: The source node label.
+        - target: The target node label.
+
+        Returns:
+        - exists: True if the edge exists, False otherwise.
+        """
+        u = self.index.get(source)
+        v = self.index.get(target)
+        if u is None or v is None:
+            return False
+        row = self.indices[self.indptr[u]:self.indptr[u + 1]]
+        position = np.searchsorted(row, v)
+        return bool(position < len(row) and row[position] == v)
+
+    def distances(self):
+        """
+        Get the edge weights as float64 path lengths, as csgraph takes them;
+        edges without a weight count 1.
+
+        Returns:
+        - distances: The lengths, at the positions of indices. The weights
+          array itself when it already is float64 and every edge has a weight.
+        """
+        if self.weight_mask is not None:
+            return np.where(self.weight_mask, self.weights, 1).astype(np.float64, copy=False)
+        return self.weights.astype(np.float64, copy=False)
+
+    def reverse_index(self):
+        """
+        Get the incoming adjacency: the sources of node i are
+        sources[indptr[i]:indptr[i + 1]], in increasing order, and slots
+        holds the positions of those edges in indices and weights.
+
+        Returns:
+        - indptr: The row pointers of the incoming adjacency.
+        - sources: The source node positions.
+        - slots: The edge positions.
+        """
+        index_dtype = np.int32 if len(self.indices) < 2 ** 31 else np.int64
+        slots = np.argsort(self.indices, kind="stable").astype(index_dtype)
+        rows = np.repeat(np.arange(len(self.nodes), dtype=index_dtype), np.diff(self.indptr))
+        indptr = np.zeros(len(self.nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=len(self.nodes)), out=indptr[1:])
+        return indptr, rows[slots], slots
+
+    def edge_arrays(self):
+        """
+        Get the stored edges as parallel arrays, each undirected edge once.
+
+        Returns:
+        - rows: The source node positions.
+        - cols: The target node positions.
+        - weights: The edge weights.
+        - mask: The weight mask, or None if every edge has a weight.
+        """
+        rows = np.repeat(np.arange(len(self.nodes)), np.diff(self.indptr))
+        cols = self.indices
+        weights = self.weights
+        mask = self.weight_mask
+        if not self.directed:
+            keep = rows <= cols
+            rows, cols, weights = rows[keep], cols[keep], weights[keep]
+            if mask is not None:
+                mask = mask[keep]
+        return rows, cols, weights, mask
+
+    @classmethod
+    def from_edges(cls, nodes, rows, cols, weights, weight_mask=None, directed=False):
+        """
+        Build a CSR graph from parallel edge arrays over an interned node table.
+
+        Parameters:
+        - nodes: The node labels.
+        - rows: The source node positions.
+        - cols: The target node positions.
+        - weights: The edge weights.
+        - weight_mask: Which edges have a weight (default is all of them).
+        - directed: True if the graph is directed.
+
+        Returns:
+        - csr: The CSR graph.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if not directed:
+            mirror = rows != cols
+            rows, cols = np.concatenate([rows, cols[mirror]]), np.concatenate([cols, rows[mirror]])
+            weights = np.concatenate([weights, weights[mirror]])
+            if weight_mask is not None:
+                weight_mask = np.concatenate([weight_mask, weight_mask[mirror]])
+        # One sort on a combined key is much faster than a lexsort on both columns
+        order = np.argsort(rows * len(nodes) + cols, kind="stable")
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(nodes)), out=indptr[1:])
+        index_dtype = np.int32 if len(nodes) < 2 ** 31 else np.int64
+        return cls(
+            nodes,
+            indptr,
+            cols[order].astype(index_dtype),
+            weights[order],
+            weight_mask[order] if weight_mask is not None else None,
+            directed,
+        )
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """
+        Convert a NetworkX graph to its CSR representation.
+
+        Parameters:
+        - graph: The NetworkX graph.
+
+        Returns:
+        - csr: The CSR graph.
+        """
+        nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = list(graph.edges(data="weight"))
+        rows = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        cols = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        weights, weight_mask = weight_arrays([w for _, _, w in edges])
+        return cls.from_edges(nodes, rows, cols, weights, weight_mask, graph.is_directed())
+
+    def to_networkx(self):
+        """
+        Convert the CSR representation to a NetworkX graph.
+
+        Returns:
+        - graph: The NetworkX graph.
+        """
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        graph.add_nodes_from(self.nodes)
+        rows, cols, weights, mask = self.edge_arrays()
+        labels = np.empty(len(self.nodes), dtype=object)
+        labels[:] = self.nodes
+        sources = labels[rows].tolist()
+        targets = labels[cols].tolist()
+        weights = weights.tolist()
+        if mask is None:
+            graph.add_weighted_edges_from(zip(sources, targets, weights))
+        else:
+            for source, target, weight, has_weight in zip(sources, targets, weights, mask.tolist()):
+                if has_weight:
+                    graph.add_edge(source, target, weight=weight)
+                else:
+                    graph.add_edge(source, target)
+        return graph
+
+    def to_bytes(self):
+        """
+        Serialize the CSR graph as an uncompressed NumPy .npz blob.
+
+        Returns:
+        - data: The binary blob.
+        """
+        arrays = {
+            "nodes": np.frombuffer(json.dumps(self.nodes).encode("utf-8"), dtype=np.uint8),
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "weights": self.weights,
+        }
+        if self.weight_mask is not None:
+            arrays["weight_mask"] = self.weight_mask
+        buffer = BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data, directed=False):
+        """
+        Load a CSR graph from a blob written by to_bytes.
+
+        Parameters:
+        - data: The binary blob.
+        - directed: True if the graph is directed.
+
+        Returns:
+        - csr: The CSR graph.
+        """
+        with np.load(BytesIO(data), allow_pickle=False) as arrays:
+            return cls(
+                json.loads(arrays["nodes"].tobytes().decode("utf-8")),
+                arrays["indptr"],
+                arrays["indices"],
+                arrays["weights"],
+                arrays["weight_mask"] if "weight_mask" in arrays else None,
+                directed,
+            )
+
+
+def encode_graph(graph):
+    """
+    Encode a NetworkX graph in the binary CSR storage format.
+
+    Parameters:
+    - graph: The NetworkX graph.
+
+    Returns:
+    - data: The binary blob.
+    """
+    return CSRGraph.from_networkx(graph).to_bytes()
+
+
+def decode_graph(data, directed=False):
+    """
+    Decode a binary CSR blob into a NetworkX graph.
+
+    Parameters:
+    - data: The binary blob.
+    - directed: True if the graph is directed.
+
+    Returns:
+    - graph: The NetworkX graph.
+    """
+    return CSRGraph.from_bytes(data, directed).to_networkx()
@@ -0,0 +1,277 @@
+import json
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+
+from .cache import load_snapshot_csr, load_versioned_graph
+from .dao.degrees import AsyncDegreeRepository, DegreeRepository
+from .dao.graphs import AsyncGraphRepository, GraphRepository
+from .db.database import SessionLocal
+from .dao.mutations import MutationRepository
+from .models.degrees import GraphDegree
+from .storage import CSRGraph
+
+
+def encode_node(node):
+    """
+    Encode a node label as stored in graph_degrees.node.
+    """
+    return json.dumps(node)
+
+
+def decode_node(node):
+    """
+    Decode a node label stored in graph_degrees.node.
+    """
+    return json.loads(node)
+
+
+def _tally(summary, degree, in_degree, out_degree, sign):
+    """
+    Add (sign=1) or remove (sign=-1) the contribution of one node to the degree counters.
+    """
+    if degree % 2 == 1:
+        summary["odd_degree_count"] += sign
+    if in_degree is not None:
+        if in_degree != out_degree:
+            summary["unbalanced_count"] += sign
+        if out_degree - in_degree == 1:
+            summary["out_surplus_count"] += sign
+        elif in_degree - out_degree == 1:
+            summary["in_surplus_count"] += sign
+
+
+def _new_summary(directed):
+    summary = {"order": 0, "size": 0, "odd_degree_count": 0}
+    if directed:
+        summary.update(unbalanced_count=0, out_surplus_count=0, in_surplus_count=0)
+    return summary
+
+
+def compute_summary(graph):
+    """
+    Compute the summary of a graph from scratch.
+
+    Parameters:
+    - graph: The NetworkX graph or its CSRGraph.
+
+    Returns:
+    - summary: The order, size, odd degree count and, for directed graphs,
+      the counts of unbalanced nodes and of nodes with one extra outgoing or
+      incoming edge.
+    - degrees: The degree rows of the nodes, in insertion order.
+    """
+    if isinstance(graph, CSRGraph):
+        return _compute_summary_csr(graph)
+    directed = graph.is_directed()
+    summary = _new_summary(directed)
+    summary["order"] = graph.order()
+    summary["size"] = graph.size()
+    degrees = []
+    for position, (node, degree) in enumerate(graph.degree):
+        in_degree = graph.in_degree(node) if directed else None
+        out_degree = graph.out_degree(node) if directed else None
+        _tally(summary, degree, in_degree, out_degree, 1)
+        degrees.append({"position": position, "node": encode_node(node), "degree": degree,
+                        "in_degree": in_degree, "out_degree": out_degree})
+    return summary, degrees
+
+
+def _compute_summary_csr(csr):
+    """
+    Compute the summary of a graph from its CSR arrays, counting degrees like NetworkX does.
+    """
+    n = csr.number_of_nodes()
+    summary = _new_summary(csr.directed)
+    summary["order"] = n
+    summary["size"] = csr.number_of_edges()
+    row_lengths = np.diff(csr.indptr)
+    if csr.directed:
+        out_degrees = row_lengths
+        in_degrees = np.bincount(csr.indices, minlength=n)
+        degrees = in_degrees + out_degrees
+        summary["unbalanced_count"] = int(np.count_nonzero(in_degrees != out_degrees))
+        summary["out_surplus_count"] = int(np.count_nonzero(out_degrees - in_degrees == 1))
+        summary["in_surplus_count"] = int(np.count_nonzero(in_degrees - out_degrees == 1))
+        in_degrees, out_degrees = in_degrees.tolist(), out_degrees.tolist()
+    else:
+        # A self-loop is stored once but adds 2 to the degree
+        rows = np.repeat(np.arange(n), row_lengths)
+        degrees = row_lengths + np.bincount(rows[rows == csr.indices], minlength=n)
+        in_degrees = out_degrees = [None] * n
+    summary["odd_degree_count"] = int(np.count_nonzero(degrees % 2))
+    degrees = [{"position": position, "node": encode_node(node), "degree": degree,
+                "in_degree": in_degree, "out_degree": out_degree}
+               for position, (node, degree, in_degree, out_degree)
+               in enumerate(zip(csr.nodes, degrees.tolist(), in_degrees, out_degrees))]
+    return summary, degrees
+
+
+def save_summary(db, id, graph):
+    """
+    Recompute and store the summary of a graph, without committing.
+
+    Parameters:
+    - db: The database session.
+    - id: The graph id.
+    - graph: The NetworkX graph.
+
+    Returns:
+    - summary: The stored summary.
+    """
+    summary, degrees = compute_summary(graph)
+    GraphRepository.save_summary(db, id, summary)
+    DegreeRepository.replace_all(db, id, degrees)
+    return summary
+
+
+async def save_summary_async(db, id, graph):
+    """
+    Recompute and store the summary of a graph through an async session, without committing.
+
+    Parameters:
+    - db: The async database session.
+    - id: The graph id.
+    - graph: The NetworkX graph or its CSRGraph.
+
+    Returns:
+    - summary: The stored summary.
+    """
+    summary, degrees = await run_in_threadpool(compute_summary, graph)
+    await AsyncGraphRepository.save_summary(db, id, summary)
+    await AsyncDegreeRepository.replace_all(db, id, degrees)
+    return summary
+
+
+def load_summary(id):
+    """
+    Get the summary of a graph in a session of its own, computing it first if needed.
+
+    Lets async endpoints backfill summaries from a worker thread.
+
+    Parameters:
+    - id: The graph id.
+
+    Returns:
+    - summary: The summary of the graph.
+    """
+    db = SessionLocal()
+    try:
+        return ensure_summary(db, GraphRepository.find_by_id(db, id))
+    finally:
+        db.close()
+
+
+def ensure_summary(db, graph):
+    """
+    Get the summary of a graph, computing it first for graphs stored before summaries existed.
+
+    Parameters:
+    - db: The database session.
+    - graph: The Graph model instance.
+
+    Returns:
+    - summary: The summary of the graph.
+    """
+    if graph.summary is None:
+        _, graph_object = load_versioned_graph(graph)
+        save_summary(db, graph.id, graph_object)
+        db.commit()
+    return graph.summary
+
+
+def _edge_exists(db, graph, source, target):
+    """
+    Check if an edge exists in the stored snapshot or in the mutation log.
+    """
+    if load_snapshot_csr(db, graph.id, commit=False).has_edge(source, target):
+        return True
+    return MutationRepository.exists_edge(db, graph.id, source, target, graph.directed)
+
+
+def update_summary(db, graph, version, operation, source, target=None):
+    """
+    Update the summary of a graph for one mutation, without committing.
+
+    Must run in the transaction that bumped the graph to `version`, before
+    the mutation is logged, so the previous state is the one checked.
+
+    Parameters:
+    - db: The database session.
+    - graph: The Graph model instance.
+    - version: The version produced by the mutation.
+    - operation: "add_edge" or "add_node".
+    - source: The node added, or the source node of the edge.
+    - target: The target node of the edge.
+    """
+    summary = GraphRepository.find_summary(db, graph.id)
+    if summary is None:
+        _, graph_object = load_versioned_graph(graph, version - 1, commit=False)
+        summary = save_summary(db, graph.id, graph_object)
+    summary = dict(summary)
+    nodes = [source] if operation == "add_node" or source == target else [source, target]
+    rows = {row.node: row for row in DegreeRepository.find_nodes(db, graph.id, [encode_node(node) for node in nodes])}
+    new_nodes = False
+    for node in nodes:
+        if encode_node(node) not in rows:
+            new_nodes = True
+            row = GraphDegree(graph_id=graph.id, position=summary["order"], node=encode_node(node), degree=0,
+                              in_degree=0 if graph.directed else None,
+                              out_degree=0 if graph.directed else None)
+            db.add(row)
+            rows[row.node] = row
+            summary["order"] += 1
+
+    # An edge between a new node and any other one cannot exist yet
+    if operation == "add_edge" and (new_nodes or not _edge_exists(db, graph, source, target)):
+        summary["size"] += 1
+        source_row = rows[encode_node(source)]
+        target_row = rows[encode_node(target)]
+        for row in {id(source_row): source_row, id(target_row): target_row}.values():
+            _tally(summary, row.degree, row.in_degree, row.out_degree, -1)
+        source_row.degree += 1
+        target_row.degree += 1
+        if graph.directed:
+            source_row.out_degree += 1
+            target_row.in_degree += 1
+        for row in {id(source_row): source_row, id(target_row): target_row}.values():
+            _tally(summary, row.degree, row.in_degree, row.out_degree, 1)
+
+    GraphRepository.save_summary(db, graph.id, summary)
+
+
+def is_eulerian_from_summary(summary, directed):
+    """
+    Rule out an Eulerian circuit from the degree counters alone.
+
+    Parameters:
+    - summary: The summary of the graph.
+    - directed: True if the graph is directed.
+
+    Returns:
+    - is_eulerian: False if the degrees rule it out, None if connectivity still has to be checked.
+    """
+    if directed:
+        return False if summary["unbalanced_count"] else None
+    return False if summary["odd_degree_count"] else None
+
+
+def is_semi_eulerian_from_summary(summary, directed):
+    """
+    Rule out an Eulerian path without circuit from the degree counters alone.
+
+    Parameters:
+    - summary: The summary of the graph.
+    - directed: True if the graph is directed.
+
+    Returns:
+    - is_semi_eulerian: False if the degrees rule it out, None if connectivity still has to be checked.
+    """
+    if directed:
+        surplus = summary["out_surplus_count"] + summary["in_surplus_count"]
+        if summary["unbalanced_count"] == 0 or summary["unbalanced_count"] != surplus:
+            return False
+        if summary["out_surplus_count"] > 1 or summary["in_surplus_count"] > 1:
+            return False
+        return None
+    return False if summary["odd_degree_count"] != 2 else None
@@ -0,0 +1,170 @@
+import os
+
+import networkx as nx
+import numpy as np
+
+# Largest graph, in edges, partitioned with the Louvain method
+COMMUNITY_LOUVAIN_MAX_EDGES = int(os.getenv("COMMUNITY_LOUVAIN_MAX_EDGES", 20000))
+
+
+def detect_communities(graph, seed=None):
+    """
+    Partition the nodes of a graph into communities, ignoring edge directions and weights.
+
+    Uses the Louvain method on graphs of up to COMMUNITY_LOUVAIN_MAX_EDGES
+    edges, and the much faster label propagation on bigger ones.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - seed: The random seed (default is None).
+
+    Returns:
+    - communities: The communities as sets of nodes, largest first.
+    """
+    if graph.number_of_nodes() == 0:
+        return []
+    undirected = graph.to_undirected(as_view=True) if graph.is_directed() else graph
+    if undirected.number_of_edges() <= COMMUNITY_LOUVAIN_MAX_EDGES:
+        communities = nx.community.louvain_communities(undirected, weight=None, seed=seed)
+    else:
+        communities = nx.community.fast_label_propagation_communities(undirected, seed=seed)
+    # Largest communities first, so their ids are stable across small changes
+    return sorted(communities, key=len, reverse=True)
+
+
+def aggregate_communities(graph, nodes, seed=None):
+    """
+    Group the nodes of a graph into communities and count the edges between them.
+
+    Runs in a worker process.
+
+    Parameters:
+    - graph: The NetworkX graph.
+    - nodes: The nodes, in index order.
+    - seed: The random seed of the Louvain method (default is None).
+
+    Returns:
+    - community: The community of each node, in index order.
+    - edges: The number of edges between each pair of distinct communities.
+    """
+    index = {node: i for i, node in enumerate(nodes)}
+    community = np.zeros(len(nodes), dtype=np.int64)
+    for c, group in enumerate(detect_communities(graph, seed)):
+        community[[index[node] for node in group if node in index]] = c
+    edges = {}
+    for u, v in graph.edges():
+        if u not in index or v not in index:
+            continue
+        a, b = int(community[index[u]]), int(community[index[v]])
+        if a != b:
+            if not graph.is_directed() and a > b:
+                a, b = b, a
+            edges[(a, b)] = edges.get((a, b), 0) + 1
+    return community, edges
+
+
+class ViewportIndex:
+    """
+    Node positions of a graph version as arrays, for level-of-detail viewport queries.
+
+    Zoomed in, a viewport gets the nodes it contains and the edges between
+    them. Zoomed out, when it contains more nodes than requested, it gets
+    one supernode per community instead, placed at the centroid of its
+    members, with the number of edges between communities. Either way the
+    response size is bounded by max_nodes and max_edges.
+    """
+
+    def __init__(self, graph, pos, community, edges):
+        self.nodes = list(pos)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.coordinates = np.array([pos[node] for node in self.nodes], dtype=np.float64).reshape(-1, 2)
+        self.degree = np.array([graph.degree(node) for node in self.nodes], dtype=np.int64)
+        self.community = community
+        self.community_edges = edges
+        count = int(community.max()) + 1 if len(community) else 0
+        self.community_size = np.bincount(community, minlength=count)
+        self.centroids = np.empty((count, 2))
+        for axis in range(2):
+            self.centroids[:, axis] = np.bincount(community, weights=self.coordinates[:, axis], minlength=count)
+        self.centroids /= np.maximum(self.community_size, 1)[:, None]
+
+    def nbytes(self):
+        """
+        Approximate memory used by the index, in bytes.
+        """
+        arrays = [self.coordinates, self.degree, self.community, self.community_size, self.centroids]
+        return sum(array.nbytes for array in arrays) + 200 * (len(self.nodes) + len(self.community_edges))
+
+    def bounds(self):
+        """
+        Get the bounding box of the layout, as [x_min, y_min, x_max, y_max].
+        """
+        if not len(self.nodes):
+            return [0.0, 0.0, 0.0, 0.0]
+        return [*self.coordinates.min(axis=0).tolist(), *self.coordinates.max(axis=0).tolist()]
+
+    def _inside(self, points, bounds):
+        x_min, y_min, x_max, y_max = bounds
+        return np.flatnonzero((points[:, 0] >= x_min) & (points[:, 0] <= x_max)
+                              & (points[:, 1] >= y_min) & (points[:, 1] <= y_max))
+
+    def query(self, graph, bounds=None, max_nodes=500, max_edges=2000, level="auto"):
+        """
+        Get the part of the layout shown in a viewport.
+
+        Parameters:
+        - graph: The NetworkX graph the index was built from.
+        - bounds: The viewport, as [x_min, y_min, x_max, y_max] (default is the whole layout).
+        - max_nodes: The maximum number of nodes or communities returned.
+        - max_edges: The maximum number of edges returned.
+        - level: "nodes", "communities", or "auto" to return nodes when they fit in max_nodes.
+
+        Returns:
+        - view: The level, the nodes or communities with their positions,
+          the edges between them, and whether anything was left out.
+        """
+        if bounds is None:
+            bounds = self.bounds()
+        visible = self._inside(self.coordinates, bounds)
+        if level == "nodes" or (level == "auto" and len(visible) <= max_nodes):
+            return self._query_nodes(graph, visible, max_nodes, max_edges)
+        return self._query_communities(bounds, max_nodes, max_edges)
+
+    def _query_nodes(self, graph, visible, max_nodes, max_edges):
+        truncated = len(visible) > max_nodes
+        if truncated:
+            # Keep the best connected nodes
+            visible = visible[np.argsort(-self.degree[visible], kind="stable")[:max_nodes]]
+            visible.sort()
+        selected = set(visible.tolist())
+        nodes = [{"id": self.nodes[i], "x": float(self.coordinates[i, 0]), "y": float(self.coordinates[i, 1]),
+                  "community": int(self.community[i])} for i in visible.tolist()]
+        edges = []
+        for i in visible.tolist():
+            for neighbor, data in graph.adj[self.nodes[i]].items():
+                j = self.index.get(neighbor)
+                if j not in selected or (not graph.is_directed() and j < i):
+                    continue
+                if len(edges) == max_edges:
+                    return {"level": "nodes", "nodes": nodes, "edges": edges, "truncated": True}
+                edge = {"source": self.nodes[i], "target": neighbor}
+                if "weight" in data:
+                    edge["weight"] = data["weight"]
+                edges.append(edge)
+        return {"level": "nodes", "nodes": nodes, "edges": edges, "truncated": truncated}
+
+    def _query_communities(self, bounds, max_nodes, max_edges):
+        visible = self._inside(self.centroids, bounds)
+        truncated = len(visible) > max_nodes
+        if truncated:
+            visible = visible[np.argsort(-self.community_size[visible], kind="stable")[:max_nodes]]
+            visible.sort()
+        selected = set(visible.tolist())
+        nodes = [{"community": c, "x": float(self.centroids[c, 0]), "y": float(self.centroids[c, 1]),
+                  "size": int(self.community_size[c])} for c in visible.tolist()]
+        edges = [(count, a, b) for (a, b), count in self.community_edges.items() if a in selected and b in selected]
+        if len(edges) > max_edges:
+            truncated = True
+            edges = sorted(edges, key=lambda edge: -edge[0])[:max_edges]
+        edges = [{"source": a, "target": b, "count": count} for count, a, b in edges]
+        return {"level": "communities", "nodes": nodes, "edges": edges, "truncated": truncated}
@@ -0,0 +1,59 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The app opens db.sqlite3 in the working directory as soon as main is
+# imported, so the tests run in a directory of their own
+_directory = tempfile.mkdtemp(prefix="graph-management-tests-")
+os.chdir(_directory)
+
+
+@atexit.register
+def _remove_directory():
+    from src import shared
+    os.chdir(ROOT)
+    shutil.rmtree(_directory, ignore_errors=True)
+    # The segments of the test database, now that it is gone
+    shared.remove_orphan_segments()
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    from src.db.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def create_graph(client, edges, directed=False):
+    """
+    Create a stored graph from (source, target[, weight]) tuples through the API.
+
+    Returns:
+    - id: The graph id.
+    """
+    weighted = any(len(edge) == 3 for edge in edges)
+    header = "source,target,weight" if weighted else "source,target"
+    lines = [",".join(str(value) for value in edge) for edge in edges]
+    response = client.post("/create-graph/", data={"csv_str": "\n".join([header, *lines]) + "\n",
+                                                   "directed": str(directed).lower()})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
@@ -0,0 +1,128 @@
+import threading
+import time
+
+from conftest import create_graph
+
+from src import cache
+from src.cache import GraphCache, cached_result, graph_cache, load_versioned_graph
+from src.dao.graphs import GraphRepository
+
+
+def test_get_only_hits_the_cached_version():
+    cache = GraphCache(100, sizeof=lambda graph: 10)
+    cache.put(1, 3, "v3")
+    assert cache.get(1, 3) == "v3"
+    assert cache.get(1, 4) is None
+    assert cache.get(2, 3) is None
+    # The stale entry is still there to replay the log onto
+    assert cache.get_latest(1) == (3, "v3")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_older_version_never_replaces_a_newer_one():
+    cache = GraphCache(100, sizeof=lambda graph: 10)
+    cache.put(1, 5, "v5")
+    cache.put(1, 4, "v4")
+    assert cache.get_latest(1) == (5, "v5")
+    cache.put(1, 6, "v6")
+    assert cache.get_latest(1) == (6, "v6")
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 10
+    cache.invalidate(1)
+    assert cache.get_latest(1) == (None, None)
+    assert cache.stats()["bytes"] == 0
+
+
+def test_least_recently_used_graphs_are_evicted():
+    cache = GraphCache(30, sizeof=len)
+    cache.put(1, 0, "a" * 10)
+    cache.put(2, 0, "b" * 10)
+    cache.put(3, 0, "c" * 10)
+    cache.get(1, 0)
+    cache.put(4, 0, "d" * 10)
+    assert cache.get_latest(2) == (None, None)
+    assert [cache.get_latest(id)[0] for id in (1, 3, 4)] == [0, 0, 0]
+    # Bigger than the whole budget, so not cached at all
+    cache.put(5, 0, "e" * 31)
+    assert cache.get_latest(5) == (None, None)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_reads_follow_the_version_after_a_write(client, db):
+    id = create_graph(client, [("a", "b")])
+    version, graph = load_versioned_graph(GraphRepository.find_by_id(db, id))
+    assert graph_cache.get(id, version) is graph
+    client.put("/add-edge/", params={"id": id}, data={"source": "b", "target": "c"})
+    db.expire_all()
+    new_version, new_graph = load_versioned_graph(GraphRepository.find_by_id(db, id))
+    assert new_version == version + 1
+    assert new_graph.has_edge("b", "c") and not graph.has_edge("b", "c")
+    assert graph_cache.get(id, version) is None
+    assert graph_cache.get(id, new_version) is new_graph
+
+
+class Counter:
+    def __init__(self, value=None, delay=0):
+        self.calls = 0
+        self.value = value
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.value if self.value is not None else self.calls
+
+
+# Graph ids no stored graph has, so the results never mix with the API's
+RESULT_ID = 10 ** 9
+
+
+def test_results_expire_after_the_ttl(monkeypatch):
+    monkeypatch.setattr(cache, "RESULT_CACHE_TTL_SECONDS", 0.2)
+    compute = Counter()
+    assert cached_result(RESULT_ID, 1, ("radius", None), compute) == 1
+    assert cached_result(RESULT_ID, 1, ("radius", None), compute) == 1
+    # Another key, or another version, is another result
+    assert cached_result(RESULT_ID, 1, ("radius", "weight"), compute) == 2
+    assert cached_result(RESULT_ID, 2, ("radius", "weight"), compute) == 3
+    time.sleep(0.25)
+    assert cached_result(RESULT_ID, 2, ("radius", "weight"), compute) == 4
+
+
+def test_concurrent_misses_share_one_computation():
+    compute = Counter("result", delay=0.2)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def request():
+        barrier.wait()
+        results.append(cached_result(RESULT_ID + 1, 1, ("diameter",), compute))
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["result"] * 8
+    assert compute.calls == 1
+
+
+def test_failed_computation_is_shared_but_not_cached():
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("no result")
+
+    def request():
+        barrier.wait()
+        try:
+            cached_result(RESULT_ID + 2, 1, ("diameter",), fail)
+        except ValueError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 4 and len({id(error) for error in errors}) == 1
+    assert cached_result(RESULT_ID + 2, 1, ("diameter",), Counter("retried")) == "retried"
@@ -0,0 +1,99 @@
+import io
+import random
+
+import networkx as nx
+import pytest
+
+from src import columnar
+from src.storage import CSRGraph
+
+pa = pytest.importorskip("pyarrow")
+ipc = pytest.importorskip("pyarrow.ipc")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def edges_with_data(graph):
+    key = tuple if graph.is_directed() else frozenset
+    return {key((u, v)): data for u, v, data in graph.edges(data=True)}
+
+
+def random_graph(directed, seed, weights):
+    # Every node has an edge, since an edge list cannot hold isolated nodes
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    for _ in range(30):
+        u, v = f"n{rng.randrange(12)}", f"n{rng.randrange(12)}"
+        if weights == "none" or (weights == "some" and rng.random() < 0.3):
+            graph.add_edge(u, v)
+        else:
+            graph.add_edge(u, v, weight=rng.randint(1, 9) if weights != "float" else rng.uniform(0, 2))
+    return graph
+
+
+def read_table(data, format):
+    if format == "parquet":
+        return pq.read_table(io.BytesIO(data))
+    return ipc.open_stream(io.BytesIO(data)).read_all()
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("weights", ["int", "float", "some", "none"])
+def test_edge_table_round_trip(format, directed, weights):
+    graph = random_graph(directed, 1, weights)
+    # Small batches, so the file has several record batches (and row groups)
+    data = b"".join(columnar.stream_table(CSRGraph.from_networkx(graph), "edges", format, batch_rows=7))
+    csr, _ = columnar.build_csr_from_arrow(io.BytesIO(data), format, directed=directed, batch_rows=5)
+    decoded = csr.to_networkx()
+    assert set(decoded.nodes) == set(graph.nodes)
+    assert edges_with_data(decoded) == edges_with_data(graph)
+
+
+@pytest.mark.parametrize("duplicates, expected", [
+    ("keep-last", {("a", "b"): {}, ("b", "c"): {"weight": 4}, ("c", "d"): {}}),
+    ("keep-min", {("a", "b"): {"weight": 2}, ("b", "c"): {"weight": 3}, ("c", "d"): {}}),
+    ("sum", {("a", "b"): {"weight": 7}, ("b", "c"): {"weight": 7}, ("c", "d"): {}}),
+])
+def test_null_weights_in_duplicates(duplicates, expected):
+    # Rows with a null weight are left out of keep-min and sum
+    table = pa.table({"source": ["a", "a", "a", "b", "b", "c"], "target": ["b", "b", "b", "c", "c", "d"],
+                      "weight": [2, 5, None, 3, 4, None]})
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer)
+    csr, stats = columnar.build_csr_from_arrow(io.BytesIO(buffer.getvalue()), directed=True, duplicates=duplicates)
+    assert stats["duplicates"] == 3
+    assert edges_with_data(csr.to_networkx()) == expected
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+@pytest.mark.parametrize("directed", [False, True])
+def test_node_table_has_the_degrees(format, directed):
+    graph = random_graph(directed, 2, "int")
+    graph.add_node("isolated")
+    table = read_table(b"".join(columnar.stream_table(CSRGraph.from_networkx(graph), "nodes", format)), format).to_pydict()
+    assert table["node"] == list(graph.nodes)
+    if directed:
+        assert table["in_degree"] == [graph.in_degree(node) for node in graph]
+        assert table["out_degree"] == [graph.out_degree(node) for node in graph]
+    else:
+        assert table["degree"] == [graph.degree(node) for node in graph]
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_upload_and_export_through_the_api(client, format):
+    table = pa.table({"id": [1, 2, 3], "from": ["a", "b", "c"], "to": ["b", "c", "a"], "cost": [2, None, 5]})
+    buffer = io.BytesIO()
+    if format == "parquet":
+        pq.write_table(table, buffer)
+    else:
+        with ipc.new_stream(buffer, table.schema) as writer:
+            writer.write_table(table)
+    response = client.post("/create-graph/", data={"format": format, "directed": "true", "source_column": "from",
+                                                   "target_column": "to", "weight_column": "cost"},
+                           files={"file": ("edges", buffer.getvalue())}).json()
+    assert response["message"] == "Graph created successfully!"
+
+    exported = client.get("/export-graph/", params={"id": response["id"], "format": format})
+    assert exported.headers["content-type"] == columnar.MEDIA_TYPES[format]
+    edges = read_table(exported.content, format).to_pydict()
+    assert sorted(zip(edges["source"], edges["target"], edges["weight"])) == [("a", "b", 2), ("b", "c", None), ("c", "a", 5)]
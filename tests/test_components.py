@@ -0,0 +1,80 @@
+import random
+
+import networkx as nx
+import pytest
+from conftest import create_graph
+
+from src.cache import component_cache, load_components
+from src.components import ComponentIndex
+from src.dao.graphs import GraphRepository
+from src.storage import CSRGraph
+
+
+def check_components(components, graph):
+    assert components.number_of_nodes() == graph.number_of_nodes()
+    weak = list(nx.weakly_connected_components(graph) if graph.is_directed() else nx.connected_components(graph))
+    assert components.count == len(weak)
+    component = {node: i for i, nodes in enumerate(weak) for node in nodes}
+    nodes = list(graph)
+    for source in nodes:
+        for target in nodes:
+            assert components.same_component(source, target) == (component[source] == component[target])
+    if graph.number_of_nodes():
+        assert components.is_connected(strong=False) == (len(weak) == 1)
+        strong = components.is_connected()
+        if graph.is_directed() and len(weak) == 1:
+            # Unknown once an added edge dropped the strong labels
+            assert strong in (None, nx.is_strongly_connected(graph))
+        else:
+            assert strong == (len(weak) == 1)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_index_matches_networkx(directed, seed):
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    graph.add_nodes_from(range(6))
+    graph.add_edges_from((rng.randrange(6), rng.randrange(6)) for _ in range(3))
+    components = ComponentIndex(CSRGraph.from_networkx(graph))
+    check_components(components, graph)
+    for _ in range(12):
+        if rng.random() < 0.2:
+            node = rng.randrange(10)
+            components.add_node(node)
+            graph.add_node(node)
+        else:
+            source, target = rng.randrange(10), rng.randrange(10)
+            components.add_edge(source, target)
+            graph.add_edge(source, target)
+        check_components(components, graph)
+
+
+def load(db, id):
+    db.expire_all()
+    return load_components(GraphRepository.find_by_id(db, id))
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_index_follows_a_batch_snapshot(client, db, directed):
+    id = create_graph(client, [("a", "b"), ("c", "d"), ("e", "f")], directed=directed)
+    reference = nx.DiGraph() if directed else nx.Graph()
+    reference.add_edges_from([("a", "b"), ("c", "d"), ("e", "f")])
+    check_components(load(db, id), reference)
+    before, stale = component_cache.get_latest(id)
+
+    client.put("/add-edge/", params={"id": id}, data={"source": "b", "target": "c"})
+    client.put("/add-edges/", params={"id": id}, data={"edges": "source,target\nd,a\ng,h\n"})
+    reference.add_edges_from([("b", "c"), ("d", "a"), ("g", "h")])
+    # Both writes advanced the cached index, no replay needed
+    assert component_cache.get_latest(id)[0] == before + 2
+    check_components(load(db, id), reference)
+
+    # An index from before the batch cannot replay the mutations it folded
+    client.put("/add-edge/", params={"id": id}, data={"source": "h", "target": "e"})
+    reference.add_edge("h", "e")
+    component_cache.invalidate(id)
+    component_cache.put(id, before, stale)
+    components = load(db, id)
+    assert component_cache.get_latest(id)[0] == before + 3
+    check_components(components, reference)
@@ -0,0 +1,69 @@
+import asyncio
+
+from conftest import create_graph
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.dao.graphs import AsyncGraphRepository, GraphRepository
+from src.db import database
+from src.db.database import SessionLocal, engine
+from src.models.graphs import Graph
+
+
+def test_connections_use_wal(client):
+    with engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA busy_timeout")).scalar() == database.SQLITE_BUSY_TIMEOUT_MS
+
+
+def test_readers_are_not_blocked_by_a_writer(client):
+    id = create_graph(client, [("a", "b")])
+    writer, reader = SessionLocal(), SessionLocal()
+    try:
+        version = GraphRepository.bump_version(writer, id)
+        # The write lock is held until the commit, readers see the last committed version meanwhile
+        assert GraphRepository.find_by_id(reader, id).version == version - 1
+        writer.commit()
+        reader.rollback()
+        assert GraphRepository.find_by_id(reader, id).version == version
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_async_repository(tmp_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'db.sqlite3'}")
+    event.listen(async_engine.sync_engine, "connect", database._configure_sqlite)
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def run():
+        async with async_engine.begin() as connection:
+            await connection.run_sync(database.Base.metadata.create_all)
+        async with sessions() as db:
+            graph = await AsyncGraphRepository.save(db, Graph(data=b"payload", directed=True, byte_size=7))
+        async with sessions() as db:
+            found = await AsyncGraphRepository.find_by_id(db, graph.id)
+            journal_mode = (await db.execute(text("PRAGMA journal_mode"))).scalar()
+            return found.directed, await AsyncGraphRepository.exists_by_id(db, graph.id + 1), journal_mode
+    try:
+        assert asyncio.run(run()) == (True, False, "wal")
+    finally:
+        asyncio.run(async_engine.dispose())
+
+
+def test_migrate_adds_and_backfills_missing_columns(tmp_path):
+    old_engine = create_engine(f"sqlite:///{tmp_path / 'old.sqlite3'}")
+    with old_engine.begin() as connection:
+        # The graphs table as created before the listing metadata existed
+        connection.execute(text("CREATE TABLE graphs (id INTEGER PRIMARY KEY, graph JSON, data BLOB, "
+                                "directed BOOLEAN NOT NULL, version INTEGER NOT NULL DEFAULT 0, "
+                                "snapshot_version INTEGER NOT NULL DEFAULT 0, summary JSON)"))
+        connection.execute(text("INSERT INTO graphs (id, data, directed, summary) "
+                                "VALUES (1, x'0102', 0, '{\"order\": 3, \"size\": 2}')"))
+    database.migrate(old_engine)
+    columns = {column["name"] for column in inspect(old_engine).get_columns("graphs")}
+    assert {"node_count", "edge_count", "byte_size", "updated_at"} <= columns
+    with old_engine.connect() as connection:
+        row = connection.execute(text("SELECT node_count, edge_count, byte_size, updated_at FROM graphs")).one()
+    assert row[:3] == (3, 2, 2) and row[3] is not None
+    old_engine.dispose()
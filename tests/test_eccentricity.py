@@ -0,0 +1,140 @@
+import random
+
+import networkx as nx
+import pytest
+from conftest import create_graph
+
+from src import eccentricity, functions
+from src.components import ComponentIndex
+from src.sparse import SparseGraph
+from src.storage import CSRGraph
+
+
+def weighted(graph, seed, floats=False):
+    # Some edges are left without a weight, which then counts 1
+    rng = random.Random(seed)
+    for u, v in graph.edges:
+        if rng.random() < 0.8:
+            graph[u][v]["weight"] = rng.uniform(0.5, 4) if floats else rng.randint(1, 5)
+    return graph
+
+
+def connected_graph(directed, seed):
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    # A cycle keeps the graph (strongly) connected whatever else is added
+    nx.add_cycle(graph, range(12))
+    for _ in range(15):
+        graph.add_edge(rng.randrange(12), rng.randrange(12))
+    return graph
+
+
+def backend(graph, kind):
+    if kind == "sparse":
+        return SparseGraph(CSRGraph.from_networkx(graph))
+    return graph
+
+
+GRAPHS = [
+    pytest.param(lambda: connected_graph(False, 1), id="undirected"),
+    pytest.param(lambda: connected_graph(True, 2), id="directed"),
+    pytest.param(lambda: weighted(connected_graph(False, 3), 3), id="undirected-weighted"),
+    pytest.param(lambda: weighted(connected_graph(True, 4), 4), id="directed-weighted"),
+    pytest.param(lambda: nx.path_graph(["a", "b", "c", "d"]), id="path"),
+    pytest.param(lambda: nx.DiGraph([(0, 0), (0, 1), (1, 0)]), id="self-loop"),
+    pytest.param(lambda: nx.Graph([(0, 1)]), id="edge"),
+]
+
+
+@pytest.mark.parametrize("make_graph", GRAPHS)
+@pytest.mark.parametrize("kind", ["networkx", "sparse"])
+@pytest.mark.parametrize("weight", [None, "weight"])
+def test_matches_networkx(make_graph, kind, weight):
+    graph = make_graph()
+    expected = nx.eccentricity(graph, weight=weight)
+    assert eccentricity.eccentricities(backend(graph, kind), weight=weight) == expected
+    assert eccentricity.diameter(backend(graph, kind), weight=weight) == nx.diameter(graph, weight=weight)
+    assert eccentricity.radius(backend(graph, kind), weight=weight) == nx.radius(graph, weight=weight)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("kind", ["networkx", "sparse"])
+def test_float_weights_match_networkx(directed, kind):
+    graph = weighted(connected_graph(directed, 5), 5, floats=True)
+    expected = nx.eccentricity(graph, weight="weight")
+    assert eccentricity.eccentricities(backend(graph, kind), weight="weight") == pytest.approx(expected)
+    assert eccentricity.diameter(backend(graph, kind), weight="weight") == pytest.approx(nx.diameter(graph, weight="weight"))
+    assert eccentricity.radius(backend(graph, kind), weight="weight") == pytest.approx(nx.radius(graph, weight="weight"))
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("kind", ["networkx", "sparse"])
+def test_probe_limit_bounds_the_exact_values(directed, kind):
+    graph = connected_graph(directed, 6)
+    diameter = eccentricity.diameter(backend(graph, kind), max_probes=1)
+    radius = eccentricity.radius(backend(graph, kind), max_probes=1)
+    if isinstance(diameter, dict):
+        assert diameter["lower"] <= nx.diameter(graph) <= diameter["upper"]
+    else:
+        assert diameter == nx.diameter(graph)
+    if isinstance(radius, dict):
+        assert radius["lower"] <= nx.radius(graph) <= radius["upper"]
+    else:
+        assert radius == nx.radius(graph)
+
+
+DISCONNECTED = [
+    pytest.param(lambda: nx.Graph([(0, 1), (2, 3)]), id="undirected"),
+    pytest.param(lambda: nx.DiGraph([(0, 1), (1, 2)]), id="directed-weakly-connected"),
+    pytest.param(lambda: nx.DiGraph([(0, 1), (1, 0), (2, 3), (3, 2)]), id="directed"),
+    pytest.param(lambda: nx.empty_graph(2), id="isolated"),
+]
+
+
+@pytest.mark.parametrize("make_graph", DISCONNECTED)
+@pytest.mark.parametrize("kind", ["networkx", "sparse"])
+@pytest.mark.parametrize("indexed", [False, True])
+@pytest.mark.parametrize("compute", ["eccentricities", "diameter", "radius"])
+def test_disconnected_graph_fails_like_networkx(make_graph, kind, indexed, compute):
+    graph = make_graph()
+    with pytest.raises(nx.NetworkXError) as expected:
+        getattr(nx, "eccentricity" if compute == "eccentricities" else compute)(graph)
+    components = ComponentIndex(CSRGraph.from_networkx(graph)) if indexed else None
+    with pytest.raises(nx.NetworkXError) as error:
+        getattr(eccentricity, compute)(backend(graph, kind), components=components)
+    assert str(error.value) == str(expected.value)
+
+
+def node_eccentricity(graph, node, weight=None):
+    try:
+        return nx.eccentricity(graph, v=node, weight=weight)
+    except nx.NetworkXError as error:
+        return "Error in Graph: " + str(error)
+
+
+# Every node reaches "d", only "a" and "b" reach every node
+NOT_STRONGLY_CONNECTED = [("a", "b", 2), ("b", "a", 1), ("b", "c", 3), ("c", "d", 1), ("a", "d", 7)]
+
+
+@pytest.mark.parametrize("kind", ["networkx", "sparse"])
+@pytest.mark.parametrize("weight", [None, "weight"])
+@pytest.mark.parametrize("seed", range(4))
+def test_node_of_directed_graph_that_is_not_strongly_connected(kind, weight, seed):
+    graph = weighted(nx.gnp_random_graph(8, 0.25, seed=seed, directed=True), seed)
+    graph.add_weighted_edges_from(NOT_STRONGLY_CONNECTED)
+    assert not nx.is_strongly_connected(graph)
+    for node in graph:
+        assert functions.get_eccentricity_node(backend(graph, kind), node, weight) == node_eccentricity(graph, node, weight)
+
+
+@pytest.mark.parametrize("backend_name", ["networkx", "scipy"])
+@pytest.mark.parametrize("weighted_query", [False, True])
+def test_eccentricity_node_endpoint_on_directed_graph(client, backend_name, weighted_query):
+    id = create_graph(client, NOT_STRONGLY_CONNECTED, directed=True)
+    graph = nx.DiGraph()
+    graph.add_weighted_edges_from(NOT_STRONGLY_CONNECTED)
+    for node in graph:
+        response = client.request("GET", "/get-eccentricity-node/", data={"node": node},
+                                  params={"id": id, "backend": backend_name, "weighted": weighted_query})
+        expected = node_eccentricity(graph, node, "weight" if weighted_query else None)
+        assert response.json()["eccentricity"] == expected
@@ -0,0 +1,41 @@
+from conftest import create_graph
+
+
+def test_graph_etag_answers_not_modified(client):
+    id = create_graph(client, [("a", "b")])
+    response = client.get("/get-graph/", params={"id": id})
+    etag = response.headers["ETag"]
+    assert etag == f'"{id}-{response.json()["version"]}"'
+    for header in (etag, "W/" + etag, f'"other", {etag}', "*"):
+        response = client.get("/get-graph/", params={"id": id}, headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+    client.put("/add-edge/", params={"id": id}, data={"source": "b", "target": "c"})
+    response = client.get("/get-graph/", params={"id": id}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()["graph"]["links"]) == 2
+
+
+def test_change_feed_replays_the_log_and_resets_after_a_batch(client):
+    id = create_graph(client, [("a", "b")])
+    version = client.get("/get-graph/", params={"id": id}).json()["version"]
+    client.put("/add-edge/", params={"id": id}, data={"source": "b", "target": "c", "weight": 4})
+    client.put("/add-node/", params={"id": id}, data={"node": "d"})
+
+    changes = client.get("/get-graph-changes/", params={"id": id, "since": version}).json()
+    assert changes["version"] == version + 2 and not changes["reset"]
+    assert changes["changes"] == [
+        {"version": version + 1, "operation": "add_edge", "source": "b", "target": "c", "weight": 4},
+        {"version": version + 2, "operation": "add_node", "source": "d"},
+    ]
+    changes = client.get("/get-graph-changes/", params={"id": id, "since": version + 2}).json()
+    assert changes == {"message": "Changes found successfully!", "since": version + 2, "version": version + 2, "reset": False, "changes": []}
+    # A client ahead of the server has a graph the server does not know about
+    assert client.get("/get-graph-changes/", params={"id": id, "since": version + 5}).json()["reset"]
+
+    # A batch leaves no log to replay, so clients from before it fetch the graph again
+    client.put("/add-edges/", params={"id": id}, data={"edges": "source,target\nc,d\n"})
+    changes = client.get("/get-graph-changes/", params={"id": id, "since": version + 1}).json()
+    assert changes["version"] == version + 3 and changes["reset"] and changes["changes"] == []
+    assert client.get("/get-graph-changes/", params={"id": 10 ** 9, "since": 0}).json() == {"message": "Graph not found!"}
@@ -0,0 +1,71 @@
+from io import StringIO
+
+import networkx as nx
+import pandas as pd
+import pytest
+
+from src import functions
+
+MIXED_CSV = "s,t,w\n1,2,5\n3,4,6\na,1,7\n"
+
+
+def typed(nodes):
+    # NaN labels never compare equal, so they are compared by their position only
+    return [(type(node), node if node == node else None) for node in nodes]
+
+
+@pytest.mark.parametrize("csv", [
+    MIXED_CSV,
+    "s,t\n1,2\n2,3\n3,x\nx,1\n",
+    "s,t,w\n1,2.5,1\n2,3,2.5\n3,1,3\n",
+    "s,t,w\n1,2,1\n,3,2\n3,1,3\n",
+    "s,t,w\nTrue,False,1\nFalse,1,2\n",
+])
+@pytest.mark.parametrize("directed", [False, True])
+def test_graph_does_not_depend_on_chunk_size(csv, directed):
+    expected, _ = functions.build_csr_from_csv(StringIO(csv), directed, chunk_rows=1000)
+    for chunk_rows in (1, 2, 3):
+        csr, stats = functions.build_csr_from_csv(StringIO(csv), directed, chunk_rows=chunk_rows)
+        assert stats["rows"] == csv.count("\n") - 1
+        assert typed(csr.nodes) == typed(expected.nodes)
+        assert csr.indptr.tolist() == expected.indptr.tolist()
+        assert csr.indices.tolist() == expected.indices.tolist()
+        assert csr.weights.tolist() == expected.weights.tolist()
+
+
+def test_mixed_labels_are_typed_per_column():
+    csr, _ = functions.build_csr_from_csv(StringIO(MIXED_CSV), chunk_rows=1)
+    assert csr.nodes == ["1", 2, "3", 4, "a", 1]
+
+
+def networkx_ingest(csv, directed):
+    # The reference: the whole file read at once, as create-graph originally did
+    df = pd.read_csv(StringIO(csv))
+    weight = df.columns[2] if len(df.columns) >= 3 else None
+    return nx.from_pandas_edgelist(df, source=df.columns[0], target=df.columns[1], edge_attr=weight,
+                                   create_using=nx.DiGraph if directed else nx.Graph)
+
+
+def edge_set(graph):
+    edges = set()
+    for source, target, data in graph.edges(data=True):
+        ends = (source, target) if graph.is_directed() else frozenset((source, target))
+        edges.add((ends, tuple(data.values())))
+    return edges
+
+
+@pytest.mark.parametrize("csv", [
+    MIXED_CSV,
+    "s,t,w\n1,1,1\n1,a,2\n2,1,3\na,2,4\n1,2,5\n",
+    "s,t\nx,1\n1,x\n2,2\n",
+])
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("chunk_rows", [1, 2, 1000])
+def test_csr_build_matches_networkx_ingest(csv, directed, chunk_rows):
+    expected = networkx_ingest(csv, directed)
+    csr, _ = functions.build_csr_from_csv(StringIO(csv), directed, chunk_rows=chunk_rows)
+    graph, _ = functions.build_graph_from_csv(StringIO(csv), directed, chunk_rows=chunk_rows)
+    assert typed(csr.nodes) == typed(expected.nodes)
+    assert typed(graph.nodes) == typed(expected.nodes)
+    assert edge_set(csr.to_networkx()) == edge_set(expected)
+    assert edge_set(graph) == edge_set(expected)
@@ -0,0 +1,102 @@
+from concurrent.futures import Future
+
+import networkx as nx
+import pytest
+from conftest import create_graph
+
+from src import jobs
+from src.dao.jobs import JobRepository
+
+
+class QueuedPool:
+    """
+    Keeps submitted calls queued until the test runs them, in-process.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, function, *args):
+        future = Future()
+        self.calls.append((future, function, args))
+        return future
+
+    def run(self):
+        for future, function, args in self.calls:
+            if future.set_running_or_notify_cancel():
+                future.set_result(function(*args))
+        self.calls = []
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = QueuedPool()
+    monkeypatch.setattr(jobs, "get_process_pool", lambda: pool)
+    return pool
+
+
+def submit(client, id, operation="diameter", params=None):
+    data = {"operation": operation, **({"params": params} if params else {})}
+    return client.post("/submit-job/", params={"id": id}, data=data).json()
+
+
+EDGES = [("a", "b"), ("b", "c"), ("c", "d")]
+
+
+def test_finished_job_is_reused_until_the_version_changes(client, pool):
+    id = create_graph(client, EDGES)
+    response = submit(client, id)
+    assert response["message"] == "Job submitted successfully!"
+    job = response["job"]
+    assert job["status"] == "queued"
+    pool.run()
+    result = client.get("/get-job-result/", params={"id": job["id"]}).json()
+    assert result["job"]["status"] == "done"
+    assert result["job"]["result"] == {"diameter": nx.diameter(nx.Graph(EDGES))}
+
+    # The same analysis of the same version, parameters in any order
+    response = submit(client, id, params='{"weighted": false, "max_probes": 3}')
+    assert response["message"] == "Job submitted successfully!"
+    reused = submit(client, id, params='{"max_probes": 3, "weighted": false}')
+    assert reused["message"] == "Job found successfully!" and reused["job"]["id"] == response["job"]["id"]
+    assert submit(client, id)["job"]["id"] == job["id"]
+    client.put("/add-edge/", params={"id": id}, data={"source": "d", "target": "e"})
+    assert submit(client, id)["message"] == "Job submitted successfully!"
+
+
+def test_cancelled_job_never_runs_and_is_not_reused(client, pool):
+    id = create_graph(client, EDGES)
+    job = submit(client, id)["job"]
+    future = pool.calls[0][0]
+    response = client.put("/cancel-job/", params={"id": job["id"]}).json()
+    assert response["message"] == "Job cancelled successfully!"
+    assert response["job"]["status"] == "cancelled"
+    assert future.cancelled()
+    # A worker that picked the job up anyway does not start it
+    jobs.run_job(job["id"], "diameter", nx.Graph(EDGES), False, {})
+    assert client.get("/get-job/", params={"id": job["id"]}).json()["job"]["status"] == "cancelled"
+    assert client.put("/cancel-job/", params={"id": job["id"]}).json()["message"] == "Job already finished! Status: cancelled"
+
+    again = submit(client, id)
+    assert again["message"] == "Job submitted successfully!" and again["job"]["id"] != job["id"]
+
+
+def test_running_job_stops_at_its_next_progress_check(client, db, pool, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_PROGRESS_INTERVAL", 0)
+    id = create_graph(client, EDGES)
+    job = submit(client, id)["job"]
+    assert JobRepository.start(db, job["id"])
+    progress = jobs._Progress(db, job["id"])
+    progress(0.25)
+    assert JobRepository.find_status(db, job["id"]) == "running"
+    client.put("/cancel-job/", params={"id": job["id"]})
+    with pytest.raises(jobs.JobCancelled):
+        progress(0.5)
+
+
+def test_invalid_jobs_are_rejected(client, pool):
+    id = create_graph(client, EDGES)
+    assert submit(client, id, operation="pagerank")["message"].startswith("Job not submitted! Error: Unknown operation")
+    assert submit(client, id, params='{"colour": 1}')["message"].startswith("Job not submitted! Error: Unknown parameters")
+    assert submit(client, id, params="[1]")["message"] == "Job not submitted! Error: params must be a JSON object"
+    assert pool.calls == []
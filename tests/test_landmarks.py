@@ -0,0 +1,55 @@
+import random
+
+import networkx as nx
+import pytest
+
+from src import functions
+from src.components import ComponentIndex
+from src.landmarks import LandmarkIndex
+from src.storage import CSRGraph
+
+
+def random_graph(directed, seed, nodes=15, edges=30):
+    # Sparse enough that some pairs have no path; edges without a weight count 1
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    graph.add_nodes_from(range(nodes))
+    for _ in range(edges):
+        u, v = rng.randrange(nodes), rng.randrange(nodes)
+        if rng.random() < 0.2:
+            graph.add_edge(u, v)
+        else:
+            graph.add_edge(u, v, weight=rng.randint(0, 9))
+    return graph
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("k", [1, 4, 16])
+def test_astar_with_landmarks_matches_networkx(directed, seed, k):
+    graph = random_graph(directed, seed)
+    landmarks = LandmarkIndex(graph, k)
+    components = ComponentIndex(CSRGraph.from_networkx(graph))
+    for source in graph:
+        for target in graph:
+            result = functions.get_shortest_path(graph, source, target, landmarks=landmarks, components=components)
+            try:
+                expected = nx.shortest_path_length(graph, source, target, weight="weight")
+            except nx.NetworkXNoPath:
+                assert result["path"] is None
+                assert result["message"].startswith("No path found!")
+                continue
+            assert result["shortest_path_length"] == expected
+            assert result["path"][0] == source and result["path"][-1] == target
+            assert functions.get_path_length(graph, result["path"]) == expected
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_heuristic_never_overestimates(directed):
+    graph = random_graph(directed, 9)
+    landmarks = LandmarkIndex(graph, 4)
+    for target in graph:
+        heuristic = landmarks.heuristic(target)
+        distances = nx.single_source_dijkstra_path_length(graph.reverse() if directed else graph, target, weight="weight")
+        for node, distance in distances.items():
+            assert heuristic(node, target) <= distance
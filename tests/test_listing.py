@@ -0,0 +1,61 @@
+import pytest
+from conftest import create_graph
+from sqlalchemy import update
+
+from src.db.database import SessionLocal
+from src.models.graphs import Graph
+
+SORTS = ["id", "updated_at", "order", "size", "byte_size"]
+
+
+def list_graphs(client, **params):
+    response = client.get("/list-graphs/", params=params).json()
+    return response["graphs"], response["next_cursor"]
+
+
+def walk(client, limit, **params):
+    graphs, cursor = list_graphs(client, limit=limit, **params)
+    while cursor is not None:
+        page, cursor = list_graphs(client, limit=limit, cursor=cursor, **params)
+        assert len(page) <= limit
+        graphs += page
+    return graphs
+
+
+@pytest.fixture(scope="module")
+def listed(client):
+    # Ties on every sort column, and legacy rows whose counts are not known
+    ids = [create_graph(client, [("a", "b"), ("b", "c")]) for _ in range(4)]
+    ids += [create_graph(client, [("a", "b")], directed=True) for _ in range(3)]
+    db = SessionLocal()
+    try:
+        db.execute(update(Graph).where(Graph.id.in_(ids[-2:])).values(node_count=None, edge_count=None))
+        db.commit()
+    finally:
+        db.close()
+    return ids
+
+
+@pytest.mark.parametrize("sort", SORTS)
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 3])
+def test_pages_cover_the_listing_once_in_order(client, listed, sort, descending, limit):
+    everything, cursor = list_graphs(client, limit=1000, sort=sort, descending=descending)
+    assert cursor is None
+    assert set(listed) <= {graph["id"] for graph in everything}
+    # Unknown counts sort first, and last when descending; ids break ties
+    expected = sorted(everything, key=lambda graph: (graph[sort] is not None, graph[sort] or 0, graph["id"]), reverse=descending)
+    assert [graph["id"] for graph in everything] == [graph["id"] for graph in expected]
+    assert [graph["id"] for graph in walk(client, limit, sort=sort, descending=descending)] == [graph["id"] for graph in everything]
+
+
+def test_filters_apply_to_every_page(client, listed):
+    graphs = walk(client, 2, directed=True, min_order=2, max_size=1)
+    assert graphs and all(graph["directed"] and graph["order"] >= 2 and graph["size"] <= 1 for graph in graphs)
+    assert set(listed[4:5]) <= {graph["id"] for graph in graphs}
+
+
+def test_cursor_of_another_sort_is_rejected(client, listed):
+    _, cursor = list_graphs(client, limit=1, sort="size")
+    assert client.get("/list-graphs/", params={"cursor": cursor, "sort": "order"}).json()["message"].startswith("Invalid cursor!")
+    assert client.get("/list-graphs/", params={"cursor": "not a cursor"}).json()["message"].startswith("Invalid cursor!")
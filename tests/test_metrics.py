@@ -0,0 +1,47 @@
+import re
+import time
+
+from conftest import create_graph
+
+from src import metrics
+
+
+def test_nested_phases_are_counted_once():
+    timings = metrics.start_request()
+    with metrics.phase("outer"):
+        time.sleep(0.02)
+        with metrics.phase("inner"):
+            time.sleep(0.02)
+    total = time.perf_counter() - timings["start"]
+    assert set(timings["phases"]) == {"outer", "inner"}
+    assert timings["phases"]["inner"] >= 0.02
+    assert 0.02 <= timings["phases"]["outer"] < 0.02 + timings["phases"]["inner"]
+    assert sum(timings["phases"].values()) <= total
+    header = metrics.server_timing({**timings, "db_queries": 2, "phases": {**timings["phases"], "db": 0.001}}, total)
+    assert re.fullmatch(r'inner;dur=[\d.]+, outer;dur=[\d.]+, db;dur=1\.00;desc="2 queries", total;dur=[\d.]+', header)
+
+
+def test_histograms_render_cumulative_buckets():
+    registry = metrics.Registry()
+    for value in (0.5, 3, 3, 20):
+        registry.observe("latency", {"route": "/x"}, value, buckets=(1, 5, 10), help="Latency.")
+    registry.increment("queries_total", {"route": "/x"}, 3)
+    lines = registry.render().splitlines()
+    assert "# TYPE latency histogram" in lines
+    assert [line for line in lines if line.startswith("latency_bucket")] == [
+        'latency_bucket{route="/x",le="1"} 1', 'latency_bucket{route="/x",le="5"} 3',
+        'latency_bucket{route="/x",le="10"} 3', 'latency_bucket{route="/x",le="+Inf"} 4']
+    assert 'latency_sum{route="/x"} 26.5' in lines and 'latency_count{route="/x"} 4' in lines
+    assert 'queries_total{route="/x"} 3' in lines
+
+
+def test_requests_get_server_timing_and_metrics(client):
+    id = create_graph(client, [("a", "b"), ("b", "c")])
+    response = client.get("/get-graph/", params={"id": id})
+    header = response.headers["Server-Timing"]
+    assert re.search(r'db;dur=[\d.]+;desc="\d+ queries"', header)
+    assert re.search(r"total;dur=[\d.]+$", header)
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/get-graph/",status="200"}' in text
+    assert re.search(r'db_queries_total\{method="GET",route="/get-graph/"\} [1-9]', text)
+    assert 'cache_hits_total{cache="graph"}' in text
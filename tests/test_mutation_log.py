@@ -0,0 +1,163 @@
+import random
+
+import networkx as nx
+import pytest
+from conftest import create_graph
+
+from src import functions, mutation_log
+from src.cache import graph_cache, load_versioned_graph
+from src.dao.degrees import DegreeRepository
+from src.dao.graphs import GraphRepository
+from src.dao.mutations import MutationRepository
+from src.mutation_log import apply_batch, compact_graph
+
+
+def edge_set(graph):
+    return {frozenset(edge) for edge in graph.edges}
+
+
+def load(db, id):
+    # A fresh read, like the next request would make
+    db.expire_all()
+    return load_versioned_graph(GraphRepository.find_by_id(db, id))
+
+
+def edges_with_data(graph):
+    key = tuple if graph.is_directed() else frozenset
+    return {key((u, v)): data for u, v, data in graph.edges(data=True)}
+
+
+def rewrite(reference, operation, source, target=None, weight=None):
+    # What add-edge and add-node did before the log: decode, mutate and store the whole graph
+    graph = reference.copy()
+    if operation == "add_node":
+        graph.add_node(source)
+    elif weight:
+        graph.add_edge(source, target, weight=weight)
+    else:
+        graph.add_edge(source, target)
+    return graph
+
+
+def random_mutations(seed, count=40):
+    # Repeated edges, with and without a weight, self-loops and new nodes included
+    rng = random.Random(seed)
+    nodes = list("abcdefgh")
+    mutations = []
+    for _ in range(count):
+        if rng.random() < 0.15:
+            mutations.append(("add_node", rng.choice(nodes + ["x", "y"]), None, None))
+        else:
+            mutations.append(("add_edge", rng.choice(nodes), rng.choice(nodes), rng.choice([None, 1, 2, 5])))
+    return mutations
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_replayed_log_matches_a_full_rewrite(client, db, directed, seed):
+    edges = [("a", "b", 3), ("b", "c", 1), ("c", "a", 2)]
+    id = create_graph(client, edges, directed=directed)
+    reference = nx.DiGraph() if directed else nx.Graph()
+    reference.add_weighted_edges_from(edges)
+    snapshot_version = GraphRepository.find_by_id(db, id).snapshot_version
+    mutations = random_mutations(seed)
+    for operation, source, target, weight in mutations:
+        if operation == "add_node":
+            client.put("/add-node/", params={"id": id}, data={"node": source})
+        else:
+            client.put("/add-edge/", params={"id": id}, data={"source": source, "target": target, **({"weight": weight} if weight else {})})
+        reference = rewrite(reference, operation, source, target, weight)
+
+    # The snapshot was left as it was, every mutation is a logged row
+    version, graph = load(db, id)
+    assert GraphRepository.find_snapshot_version(db, id) == snapshot_version
+    assert len(MutationRepository.find_range(db, id, snapshot_version, version)) == len(mutations)
+    # Built up one mutation at a time by the requests, then replayed from the snapshot
+    for replayed in (False, True):
+        if replayed:
+            graph_cache.invalidate(id)
+            version, graph = load(db, id)
+        assert list(graph.nodes) == list(reference.nodes)
+        assert edges_with_data(graph) == edges_with_data(reference)
+
+    compact_graph(id)
+    graph_cache.invalidate(id)
+    compacted_version, graph = load(db, id)
+    assert compacted_version == version == GraphRepository.find_snapshot_version(db, id)
+    assert set(graph.nodes) == set(reference.nodes)
+    assert edges_with_data(graph) == edges_with_data(reference)
+
+
+def test_stale_cached_graph_is_not_replayed_across_a_batch(client, db):
+    id = create_graph(client, [("a", "b"), ("b", "c")])
+    old_version, old_graph = load(db, id)
+    response = client.put("/add-edges/", params={"id": id}, data={"edges": "source,target\nc,d\nd,e\n"})
+    assert response.json()["version"] == old_version + 1
+    client.put("/add-edge/", params={"id": id}, data={"source": "e", "target": "f"})
+    # Another server process still holds the graph from before the batch
+    graph_cache.invalidate(id)
+    graph_cache.put(id, old_version, old_graph)
+    version, graph = load(db, id)
+    assert version == old_version + 2
+    assert edge_set(graph) == {frozenset(edge) for edge in ("ab", "bc", "cd", "de", "ef")}
+
+
+BATCH = "source,target,weight\nc,d,4\na,b,7\nd,e,1\nc,d,2\ne,e,3\n"
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("attempts", [mutation_log.BATCH_OPTIMISTIC_ATTEMPTS, 0])
+def test_batch_is_one_snapshot_on_top_of_the_log(client, db, monkeypatch, directed, attempts):
+    # No optimistic attempt takes the write lock before loading the graph
+    monkeypatch.setattr(mutation_log, "BATCH_OPTIMISTIC_ATTEMPTS", attempts)
+    id = create_graph(client, [("a", "b", 1), ("b", "c", 1)], directed=directed)
+    client.put("/add-edge/", params={"id": id}, data={"source": "c", "target": "a", "weight": 2})
+    client.put("/add-node/", params={"id": id}, data={"node": "z"})
+    before, reference = load(db, id)
+    reference = reference.copy()
+
+    response = client.put("/add-edges/", params={"id": id}, data={"edges": BATCH})
+    for operation, source, target, weight in functions.parse_edge_batch(BATCH):
+        functions.apply_mutation(reference, operation, source, target, weight)
+    assert response.json() == {"message": "Edges added successfully!", "version": before + 1,
+                               "edges_added": 3, "duplicates_merged": 2, "new_nodes": 2}
+    # The batch is a snapshot of its own and the log it folded is gone
+    version, graph = load(db, id)
+    assert version == GraphRepository.find_snapshot_version(db, id) == before + 1
+    assert MutationRepository.find_range(db, id, 0, version) == []
+    assert edges_with_data(graph) == edges_with_data(reference)
+
+    # Later mutations are logged on top of the batch snapshot
+    client.put("/add-edge/", params={"id": id}, data={"source": "e", "target": "f"})
+    functions.apply_mutation(reference, "add_edge", "e", "f")
+    assert [mutation.version for mutation in MutationRepository.find_range(db, id, 0, version + 1)] == [version + 1]
+    graph_cache.invalidate(id)
+    version, graph = load(db, id)
+    assert version == before + 2
+    assert list(graph.nodes) == list(reference.nodes)
+    assert edges_with_data(graph) == edges_with_data(reference)
+
+
+def test_failed_batch_leaves_the_graph_unchanged(client, db, monkeypatch):
+    id = create_graph(client, [("a", "b"), ("b", "c")])
+    client.put("/add-edge/", params={"id": id}, data={"source": "c", "target": "d"})
+    before, reference = load(db, id)
+    snapshot_version = GraphRepository.find_snapshot_version(db, id)
+
+    # Fails after the snapshot was written and the log deleted
+    def fail(*args):
+        raise RuntimeError("degrees not written")
+    monkeypatch.setattr(DegreeRepository, "upsert_all", fail)
+    with pytest.raises(RuntimeError):
+        apply_batch(db, GraphRepository.find_by_id(db, id), functions.parse_edge_batch(BATCH))
+    monkeypatch.undo()
+    response = client.put("/add-edges/", params={"id": id}, data={"edges": "[[\"d\", \"e\"], [\"e\"]]", "format": "json"})
+    assert response.json()["message"].startswith("Invalid edge batch!")
+
+    graph_cache.invalidate(id)
+    version, graph = load(db, id)
+    assert version == before
+    assert GraphRepository.find_snapshot_version(db, id) == snapshot_version
+    assert len(MutationRepository.find_range(db, id, snapshot_version, version)) == 1
+    assert edges_with_data(graph) == edges_with_data(reference)
+    assert client.get("/get-order/", params={"id": id}).json()["order"] == 4
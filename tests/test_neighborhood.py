@@ -0,0 +1,135 @@
+import json
+import random
+
+import networkx as nx
+import pytest
+from conftest import create_graph
+
+from src.neighborhood import NeighborhoodIndex
+from src.storage import CSRGraph
+
+
+def random_graph(directed, seed, nodes=12, edges=20):
+    # Edges without a weight count 1 as a path cost, like in NetworkX
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    graph.add_nodes_from(range(nodes))
+    for _ in range(edges):
+        u, v = rng.randrange(nodes), rng.randrange(nodes)
+        if rng.random() < 0.3:
+            graph.add_edge(u, v)
+        else:
+            graph.add_edge(u, v, weight=rng.randint(1, 4))
+    return graph
+
+
+def indexed(graph, seed):
+    # Part of the edges go through the overlay, as if logged after the snapshot
+    rng = random.Random(seed)
+    edges = list(graph.edges(data="weight"))
+    rng.shuffle(edges)
+    snapshot = graph.copy()
+    snapshot.remove_edges_from(edges[:5])
+    index = NeighborhoodIndex(CSRGraph.from_networkx(snapshot))
+    for u, v, weight in edges[:5]:
+        index.apply_mutation("add_edge", u, v, weight)
+    return index
+
+
+def undirected(graph):
+    # Opposite edges are one step at the cheaper weight, where NetworkX's
+    # to_undirected would keep the weight of either
+    result = nx.Graph()
+    result.add_nodes_from(graph)
+    for u, v, weight in graph.edges(data="weight", default=1):
+        if not result.has_edge(u, v) or weight < result[u][v]["weight"]:
+            result.add_edge(u, v, weight=weight)
+    return result
+
+
+def ego_graph(graph, center, radius, direction, distance=None):
+    if graph.is_directed() and direction == "in":
+        return nx.ego_graph(graph.reverse(), center, radius=radius, distance=distance).reverse()
+    if graph.is_directed() and direction == "both":
+        return graph.subgraph(nx.ego_graph(undirected(graph), center, radius=radius, distance=distance))
+    return nx.ego_graph(graph, center, radius=radius, distance=distance)
+
+
+def reference_distances(graph, center, radius, direction, weight=None):
+    if graph.is_directed() and direction == "in":
+        graph = graph.reverse()
+    elif graph.is_directed() and direction == "both":
+        graph = undirected(graph)
+    if weight is None:
+        return nx.single_source_shortest_path_length(graph, center, cutoff=radius)
+    return nx.single_source_dijkstra_path_length(graph, center, cutoff=radius, weight=weight)
+
+
+def edge_set(edges, directed):
+    key = tuple if directed else frozenset
+    return {(key((edge["source"], edge["target"])), edge.get("weight")) for edge in edges}
+
+
+def ego_edge_set(ego):
+    key = tuple if ego.is_directed() else frozenset
+    return {(key((u, v)), weight) for u, v, weight in ego.edges(data="weight")}
+
+
+DIRECTIONS = [pytest.param(False, "both", id="undirected")] + [
+    pytest.param(True, direction, id=f"directed-{direction}") for direction in ("out", "in", "both")]
+
+
+@pytest.mark.parametrize("directed, direction", DIRECTIONS)
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("hops", [0, 1, 2, 3])
+def test_hops_match_ego_graph(directed, direction, seed, hops):
+    graph = random_graph(directed, seed)
+    index = indexed(graph, seed)
+    for center in graph:
+        result = index.neighborhood(center, hops, direction=direction)
+        expected = reference_distances(graph, center, hops, direction)
+        assert {entry["node"]: entry["hops"] for entry in result["nodes"]} == expected
+        assert [entry["hops"] for entry in result["nodes"]] == sorted(expected.values())
+        assert edge_set(result["edges"], directed) == ego_edge_set(ego_graph(graph, center, hops, direction))
+
+
+@pytest.mark.parametrize("directed, direction", DIRECTIONS)
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("radius", [0, 2, 3.5, 6])
+def test_cost_radius_matches_ego_graph(directed, direction, seed, radius):
+    graph = random_graph(directed, seed)
+    index = indexed(graph, seed)
+    for center in graph:
+        result = index.neighborhood(center, None, radius, direction=direction)
+        expected = reference_distances(graph, center, radius, direction, weight="weight")
+        assert {entry["node"]: entry["cost"] for entry in result["nodes"]} == expected
+        assert edge_set(result["edges"], directed) == ego_edge_set(ego_graph(graph, center, radius, direction, "weight"))
+
+
+def test_limits_keep_the_nearest_nodes():
+    index = NeighborhoodIndex(CSRGraph.from_networkx(nx.path_graph(10)))
+    result = index.neighborhood(5, None, max_nodes=5, max_edges=2)
+    assert [entry["node"] for entry in result["nodes"]][:1] == [5]
+    assert sorted(entry["hops"] for entry in result["nodes"]) == [0, 1, 1, 2, 2]
+    assert len(result["edges"]) == 2
+    assert result["truncated"] == {"nodes": True, "edges": True}
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson"])
+def test_endpoint_matches_ego_graph(client, format):
+    edges = [("a", "b", 2), ("b", "c", 1), ("c", "d", 5), ("d", "a", 1), ("e", "a", 3)]
+    id = create_graph(client, edges, directed=True)
+    client.put("/add-edge/", params={"id": id}, data={"source": "c", "target": "f", "weight": 1})
+    graph = nx.DiGraph()
+    graph.add_weighted_edges_from(edges + [("c", "f", 1)])
+    response = client.request("GET", "/get-neighborhood/", data={"node": "b"},
+                              params={"id": id, "max_hops": 2, "direction": "out", "format": format})
+    if format == "ndjson":
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        nodes = [line for line in lines if "hops" in line]
+        result_edges = [line for line in lines if "source" in line]
+    else:
+        result = response.json()["result"]
+        nodes, result_edges = result["nodes"], result["edges"]
+    assert {entry["node"]: entry["hops"] for entry in nodes} == nx.single_source_shortest_path_length(graph, "b", cutoff=2)
+    assert edge_set(result_edges, True) == ego_edge_set(nx.ego_graph(graph, "b", radius=2))
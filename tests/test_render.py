@@ -0,0 +1,59 @@
+import os
+
+import networkx as nx
+from conftest import create_graph
+
+from src import render
+from src.dao.graphs import GraphRepository
+
+
+def test_image_key_follows_version_and_options():
+    options = {"width": 12, "height": 8, "dpi": 100, "labels": True, "edge_labels": True, "seed": None}
+    key = render.image_key(1, 3, options)
+    assert key.startswith("1-3-") and key.endswith(".png")
+    assert render.image_key(1, 3, dict(reversed(options.items()))) == key
+    assert render.image_key(1, 4, options) != key
+    assert render.image_key(1, 3, {**options, "dpi": 200}) != key
+
+
+def test_image_path_rejects_other_files():
+    assert render.image_path("../db.sqlite3") is None
+    assert render.image_path("1-3-abc.txt") is None
+    assert render.image_path("1-3-abc.png") == os.path.join(render.RENDER_CACHE_DIR, "1-3-abc.png")
+
+
+def test_new_version_drops_older_images(tmp_path, monkeypatch):
+    monkeypatch.setattr(render, "RENDER_CACHE_DIR", str(tmp_path))
+    render.write_image(1, "1-2-aaaa.png", b"v2")
+    render.write_image(1, "1-2-bbbb.png", b"v2 small")
+    render.write_image(10, "10-1-aaaa.png", b"other graph")
+    assert render.read_image("1-2-aaaa.png") == b"v2"
+    render.write_image(1, "1-3-aaaa.png", b"v3")
+    assert sorted(os.listdir(tmp_path)) == ["1-3-aaaa.png", "10-1-aaaa.png"]
+    assert render.read_image("1-2-bbbb.png") is None
+    assert render.read_image("1-3-aaaa.png") == b"v3"
+
+
+def test_draw_graph_uses_the_given_positions():
+    graph = nx.DiGraph([("a", "b", {"weight": 2}), ("b", "c", {})])
+    pos = render.compute_layout(graph, seed=1)
+    assert set(pos) == set(graph)
+    assert render.compute_layout(graph, seed=1) == pos
+    image = render.draw_graph(graph, True, pos, {**render.DEFAULT_RENDER_OPTIONS, "width": 2, "height": 2, "dpi": 20})
+    assert image.startswith(b"\x89PNG")
+
+
+def test_cached_image_is_served_without_rendering(client, db, tmp_path, monkeypatch):
+    import main
+    monkeypatch.setattr(render, "RENDER_CACHE_DIR", str(tmp_path))
+    id = create_graph(client, [("a", "b")])
+    version = GraphRepository.find_by_id(db, id).version
+    key = render.image_key(id, version, {**render.DEFAULT_RENDER_OPTIONS, "seed": None})
+    render.write_image(id, key, b"cached image")
+
+    def fail():
+        raise AssertionError("rendered again")
+    monkeypatch.setattr(main, "get_process_pool", fail)
+    assert client.get("/get-image-graph/", params={"id": id}).json()["image"] == f"/images/{key}"
+    assert client.get("/get-image-graph/", params={"id": id, "raw": True}).content == b"cached image"
+    assert client.get(f"/images/{key}").content == b"cached image"
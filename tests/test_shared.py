@@ -0,0 +1,76 @@
+import os
+
+import networkx as nx
+import numpy as np
+import pytest
+from conftest import create_graph
+
+from src import shared, storage
+from src.cache import csr_cache, load_shared_graph, load_versioned_graph, load_versioned_snapshot_csr
+from src.dao.graphs import GraphRepository
+from src.storage import CSRGraph
+
+pytestmark = pytest.mark.skipif(not shared.SHARED_GRAPH_DIR, reason="shared segments are disabled")
+
+# Graph ids no stored graph has, so the segments never mix with the API's
+SEGMENT_ID = 10 ** 9
+
+
+def test_published_segment_round_trips(client):
+    graph = nx.DiGraph([("a", "b", {"weight": 2}), ("b", "c", {}), ("c", "a", {"weight": 1})])
+    csr = CSRGraph.from_networkx(graph)
+    shared.publish_csr(SEGMENT_ID, 3, csr)
+    attached = shared.attach_csr(SEGMENT_ID, 3)
+    assert isinstance(attached, shared.SharedCSRGraph)
+    assert attached.nodes == csr.nodes and attached.directed
+    for name in ("indptr", "indices", "weights", "weight_mask"):
+        assert np.array_equal(getattr(attached, name), getattr(csr, name))
+    assert not attached.indices.flags.writeable
+    for expected, found in zip(csr.reverse_index(), attached.reverse_index()):
+        assert np.array_equal(expected, found)
+    assert list(attached.to_networkx().edges(data=True)) == list(graph.edges(data=True))
+    assert shared.attach_csr(SEGMENT_ID, 4) is None
+
+
+def test_newer_version_unlinks_the_older_segment(client):
+    old = CSRGraph.from_networkx(nx.path_graph(3))
+    shared.publish_csr(SEGMENT_ID + 1, 1, old)
+    attached = shared.attach_csr(SEGMENT_ID + 1, 1)
+    shared.publish_csr(SEGMENT_ID + 1, 2, CSRGraph.from_networkx(nx.path_graph(4)))
+    assert shared.attach_csr(SEGMENT_ID + 1, 1) is None
+    assert not os.path.exists(attached.path)
+    # Processes that attached the old segment keep reading it
+    assert np.array_equal(attached.indices, old.indices)
+    assert shared.attach_csr(SEGMENT_ID + 1, 2).number_of_nodes() == 4
+
+
+def test_segment_is_reused_until_a_new_snapshot(client, db, monkeypatch):
+    id = create_graph(client, [("a", "b"), ("b", "c")])
+    snapshot_version, csr = load_versioned_snapshot_csr(db, id)
+    assert isinstance(csr, shared.SharedCSRGraph)
+    client.put("/add-edge/", params={"id": id}, data={"source": "c", "target": "d", "weight": 2})
+
+    # Another process, with nothing cached, attaches the segment instead of decoding the row
+    def fail(*args):
+        raise AssertionError("decoded again")
+    csr_cache.invalidate(id)
+    monkeypatch.setattr(storage.CSRGraph, "from_bytes", fail)
+    db.expire_all()
+    assert load_versioned_snapshot_csr(db, id)[1].path == csr.path
+    graph = GraphRepository.find_by_id(db, id)
+    reference = load_versioned_graph(graph)[1]
+    # Pool tasks get the segment and the mutations logged since
+    shared_graph = load_shared_graph(graph)
+    assert shared_graph.snapshot_version == snapshot_version
+    assert shared_graph.mutations == [("add_edge", "c", "d", 2)]
+    shared._worker_graphs.clear()
+    assert list(shared_graph.load().edges(data=True)) == list(reference.edges(data=True))
+    monkeypatch.undo()
+
+    # A batch writes a new snapshot, so a new segment replaces the old one
+    client.put("/add-edges/", params={"id": id}, data={"edges": "source,target\nd,e\n"})
+    db.expire_all()
+    new_version, new_csr = load_versioned_snapshot_csr(db, id)
+    assert new_version == snapshot_version + 2
+    assert new_csr.path != csr.path and not os.path.exists(csr.path)
+    assert load_shared_graph(GraphRepository.find_by_id(db, id)).mutations == []
@@ -0,0 +1,129 @@
+import random
+
+import networkx as nx
+import pytest
+
+from src.sparse import SparseGraph
+from src.storage import CSRGraph
+
+
+def random_graph(directed, seed, nodes=9, edges=14, floats=False):
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    graph.add_nodes_from(range(nodes))
+    for _ in range(edges):
+        u, v = rng.randrange(nodes), rng.randrange(nodes)
+        # Self-loops, zero weights and edges without a weight (stored under weight_mask) included
+        if rng.random() < 0.3:
+            graph.add_edge(u, v)
+        else:
+            graph.add_edge(u, v, weight=rng.uniform(0, 3) if floats else rng.randint(0, 4))
+    return graph
+
+
+def path_length(graph, path):
+    # Edges without a weight count 1, like in NetworkX's shortest path functions
+    return sum(graph[u][v].get("weight", 1) for u, v in zip(path, path[1:]))
+
+
+def sparse(graph):
+    return SparseGraph(CSRGraph.from_networkx(graph))
+
+
+GRAPHS = [pytest.param(directed, seed, floats, id=f"{'directed' if directed else 'undirected'}-{seed}{'-floats' if floats else ''}")
+          for directed in (False, True) for seed in range(6) for floats in (False, True)]
+
+
+def test_unweighted_edges_are_masked():
+    graph = nx.DiGraph([(0, 1), (1, 2, {"weight": 5}), (2, 2)])
+    assert CSRGraph.from_networkx(graph).weight_mask is not None
+    assert sparse(graph).shortest_path(0, 2) == (6, [0, 1, 2])
+
+
+@pytest.mark.parametrize("directed, seed, floats", GRAPHS)
+def test_shortest_path_length_matches_networkx(directed, seed, floats):
+    graph = random_graph(directed, seed, floats=floats)
+    backend = sparse(graph)
+    for source in graph:
+        for target in graph:
+            try:
+                expected = nx.shortest_path_length(graph, source, target, weight="weight")
+            except nx.NetworkXNoPath:
+                with pytest.raises(nx.NetworkXNoPath):
+                    backend.shortest_path(source, target)
+                continue
+            length, path = backend.shortest_path(source, target)
+            if not floats:
+                # Only int weights give int lengths, see SparseGraph
+                assert type(length) is type(expected)
+            assert length == pytest.approx(expected)
+            # Equally short paths may differ from NetworkX's, but must be paths of that length
+            assert path[0] == source and path[-1] == target
+            assert path_length(graph, path) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("directed, seed, floats", GRAPHS)
+def test_distances_match_networkx(directed, seed, floats):
+    graph = random_graph(directed, seed, floats=floats)
+    backend = sparse(graph)
+    for reverse in (False, True):
+        reference = graph.reverse() if reverse and directed else graph
+        for source in graph:
+            hops = nx.single_source_shortest_path_length(reference, source)
+            lengths = nx.single_source_dijkstra_path_length(reference, source, weight="weight")
+            for weight, expected in ((None, hops), ("weight", lengths)):
+                distances = backend.distances(backend.index[source], weight, reverse)
+                found = {backend.nodes[i]: backend.value(d, weight) for i, d in enumerate(distances) if d != float("inf")}
+                assert found == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("edges", [4, 30])
+def test_eccentricity_matches_networkx(directed, seed, edges):
+    # Few edges leave the graph disconnected, and both backends fail alike
+    graph = random_graph(directed, seed, nodes=6, edges=edges)
+    backend = sparse(graph)
+    for node in graph:
+        try:
+            expected = nx.eccentricity(graph, v=node)
+        except nx.NetworkXError as error:
+            with pytest.raises(nx.NetworkXError, match=str(error)):
+                backend.eccentricity(node)
+            continue
+        assert backend.eccentricity(node) == expected
+
+
+EULERIAN = [
+    pytest.param(nx.cycle_graph(4), id="cycle"),
+    pytest.param(nx.path_graph(4), id="path"),
+    pytest.param(nx.Graph([(0, 1), (1, 2), (2, 0), (0, 0)]), id="cycle-self-loop"),
+    pytest.param(nx.Graph([(0, 1), (1, 1)]), id="edge-self-loop"),
+    pytest.param(nx.Graph([(0, 0)]), id="self-loop"),
+    pytest.param(nx.cycle_graph(3, create_using=nx.DiGraph), id="directed-cycle"),
+    pytest.param(nx.path_graph(3, create_using=nx.DiGraph), id="directed-path"),
+    pytest.param(nx.DiGraph([(0, 1), (1, 0), (1, 1)]), id="directed-self-loop"),
+    pytest.param(nx.DiGraph([(0, 1), (1, 2), (2, 0), (3, 3)]), id="directed-disconnected"),
+    pytest.param(nx.Graph([(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3)]), id="disconnected"),
+    pytest.param(nx.empty_graph(3), id="isolated"),
+]
+
+
+@pytest.mark.parametrize("graph", EULERIAN)
+def test_eulerian_matches_networkx(graph):
+    backend = sparse(graph)
+    assert backend.is_eulerian() == nx.is_eulerian(graph)
+    assert backend.is_semi_eulerian() == nx.is_semieulerian(graph)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(40))
+def test_eulerian_matches_networkx_on_random_graphs(directed, seed):
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    graph.add_nodes_from(range(5))
+    for _ in range(rng.randint(3, 10)):
+        graph.add_edge(rng.randrange(5), rng.randrange(5))
+    backend = sparse(graph)
+    assert backend.is_eulerian() == nx.is_eulerian(graph)
+    assert backend.is_semi_eulerian() == nx.is_semieulerian(graph)
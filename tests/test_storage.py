@@ -0,0 +1,61 @@
+import random
+
+import networkx as nx
+import pytest
+
+from src import storage
+from src.storage import CSRGraph
+
+
+def edges_with_data(graph):
+    key = tuple if graph.is_directed() else frozenset
+    return {key((u, v)): data for u, v, data in graph.edges(data=True)}
+
+
+def random_graph(directed, seed, weights):
+    rng = random.Random(seed)
+    graph = nx.DiGraph() if directed else nx.Graph()
+    # Mixed labels and isolated nodes, numbered in order of first appearance
+    labels = [f"n{i}" if i % 3 else i for i in range(10)] + ["isolated"]
+    graph.add_nodes_from(rng.sample(labels, len(labels)))
+    for _ in range(25):
+        u, v = rng.choice(labels), rng.choice(labels)
+        if weights == "none" or (weights == "some" and rng.random() < 0.4):
+            graph.add_edge(u, v)
+        elif weights == "float":
+            graph.add_edge(u, v, weight=rng.uniform(-2, 2))
+        else:
+            graph.add_edge(u, v, weight=rng.randint(-3, 3))
+    return graph
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("weights", ["int", "float", "some", "none"])
+@pytest.mark.parametrize("seed", range(3))
+def test_round_trip_keeps_nodes_edges_and_weights(directed, weights, seed):
+    graph = random_graph(directed, seed, weights)
+    decoded = storage.decode_graph(storage.encode_graph(graph), directed)
+    assert decoded.is_directed() == directed
+    assert list(decoded.nodes) == list(graph.nodes)
+    assert edges_with_data(decoded) == edges_with_data(graph)
+    for _, _, weight in decoded.edges(data="weight"):
+        if weight is not None:
+            assert type(weight) is (float if weights == "float" else int)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_csr_answers_like_networkx(directed):
+    graph = random_graph(directed, 7, "some")
+    csr = CSRGraph.from_bytes(CSRGraph.from_networkx(graph).to_bytes(), directed)
+    assert csr.number_of_nodes() == graph.number_of_nodes()
+    assert csr.number_of_edges() == graph.number_of_edges()
+    for u in graph:
+        for v in graph:
+            assert csr.has_edge(u, v) == graph.has_edge(u, v)
+
+
+@pytest.mark.parametrize("graph", [nx.Graph(), nx.empty_graph(3), nx.DiGraph([(0, 0)])], ids=["null", "isolated", "self-loop"])
+def test_round_trip_of_degenerate_graphs(graph):
+    decoded = storage.decode_graph(storage.encode_graph(graph), graph.is_directed())
+    assert list(decoded.nodes) == list(graph.nodes)
+    assert edges_with_data(decoded) == edges_with_data(graph)
@@ -0,0 +1,90 @@
+import random
+
+import networkx as nx
+import pytest
+from conftest import create_graph
+from sqlalchemy import update
+
+from src import cache, functions, mutation_log, summary
+from src.dao.degrees import DegreeRepository
+from src.dao.graphs import GraphRepository
+from src.dao.mutations import MutationRepository
+from src.models.graphs import Graph
+
+
+def make_legacy(db, id, graph_object):
+    # A row stored before CSR payloads and summaries, that no cache or segment has seen
+    db.execute(update(Graph).where(Graph.id == id).values(
+        graph=functions.convert_graph_to_json(graph_object), data=None, summary=None))
+    db.commit()
+    cache.graph_cache.invalidate(id)
+    cache.csr_cache.invalidate(id)
+
+
+def random_steps(seed, count=30):
+    # Single mutations and small batches, mixed; a closed walk first so some graphs stay Eulerian
+    rng = random.Random(seed)
+    nodes = list("abcdef")
+    steps = [[("add_edge", u, v, None)] for u, v in zip(nodes, nodes[1:] + nodes[:1])]
+    for _ in range(count):
+        if rng.random() < 0.1:
+            steps.append([("add_node", rng.choice(nodes + ["x"]), None, None)])
+        else:
+            edges = [("add_edge", rng.choice(nodes), rng.choice(nodes), None) for _ in range(rng.choice([1, 1, 3]))]
+            steps.append(edges)
+    return steps
+
+
+def check_summary(client, db, id, reference):
+    assert client.get("/get-order/", params={"id": id}).json()["order"] == reference.number_of_nodes()
+    assert client.get("/get-size/", params={"id": id}).json()["size"] == reference.number_of_edges()
+    assert client.get("/get-degree/", params={"id": id}).json()["degree"] == dict(reference.degree)
+    if reference.is_directed():
+        rows = {summary.decode_node(row.node): (row.in_degree, row.out_degree) for row in DegreeRepository.find_all(db, id)}
+        assert rows == {node: (reference.in_degree(node), reference.out_degree(node)) for node in reference}
+    assert client.get("/is-eulerian/", params={"id": id}).json()["is_eulerian"] == nx.is_eulerian(reference)
+    assert client.get("/is-semi-eulerian/", params={"id": id}).json()["is_semi_eulerian"] == nx.is_semieulerian(reference)
+
+
+@pytest.mark.parametrize("directed", [False, True])
+@pytest.mark.parametrize("seed", range(3))
+def test_summary_matches_networkx_after_mixed_appends(client, db, directed, seed):
+    id = create_graph(client, [("a", "b")], directed=directed)
+    reference = nx.DiGraph([("a", "b")]) if directed else nx.Graph([("a", "b")])
+    steps = random_steps(seed)
+    for step, mutations in enumerate(steps):
+        if len(mutations) > 1:
+            batch = "source,target\n" + "".join(f"{source},{target}\n" for _, source, target, _ in mutations)
+            client.put("/add-edges/", params={"id": id}, data={"edges": batch})
+        elif mutations[0][0] == "add_node":
+            client.put("/add-node/", params={"id": id}, data={"node": mutations[0][1]})
+        else:
+            _, source, target, _ = mutations[0]
+            client.put("/add-edge/", params={"id": id}, data={"source": source, "target": target})
+        for mutation in mutations:
+            functions.apply_mutation(reference, *mutation)
+        if step % 10 == 5 or step == len(steps) - 1:
+            db.expire_all()
+            check_summary(client, db, id, reference)
+            assert GraphRepository.find_summary(db, id) == summary.compute_summary(reference)[0]
+
+
+def test_legacy_row_is_not_migrated_mid_transaction(client, db, monkeypatch):
+    id = create_graph(client, [("a", "b"), ("b", "c")])
+    graph = GraphRepository.find_by_id(db, id)
+    _, graph_object = cache.load_versioned_graph(graph)
+    make_legacy(db, id, graph_object)
+    version = graph.version
+    monkeypatch.setattr(cache, "attach_csr", lambda id, version: None)
+
+    def fail(*args):
+        raise RuntimeError("mutation not logged")
+    monkeypatch.setattr(MutationRepository, "add", fail)
+    db.expire_all()
+    with pytest.raises(RuntimeError):
+        mutation_log.append_mutation(db, GraphRepository.find_by_id(db, id), "add_edge", "c", "d")
+    # The migration went with the rest of the transaction, the version bump included
+    db.expire_all()
+    graph = GraphRepository.find_by_id(db, id)
+    assert graph.version == version
+    assert graph.data is None and graph.summary is None
@@ -0,0 +1,48 @@
+import networkx as nx
+
+from src import render, viewport
+
+
+def index_of(graph, seed=1):
+    pos = render.compute_layout(graph, seed=seed)
+    community, edges = viewport.aggregate_communities(graph, list(pos), seed)
+    return viewport.ViewportIndex(graph, pos, community, edges), pos
+
+
+def test_refined_layout_keeps_the_placed_nodes(monkeypatch):
+    # Past the spring layout limit, new nodes are placed next to their neighbors
+    monkeypatch.setattr(render, "LAYOUT_SPRING_MAX_NODES", 2)
+    graph = nx.path_graph(5)
+    initial = render.compute_layout(graph, seed=1)
+    graph.add_edge(4, "new")
+    pos = render.compute_layout(graph, seed=1, initial=initial)
+    assert {node: pos[node] for node in initial} == initial
+    assert abs(pos["new"][0] - initial[4][0]) < 0.1 and abs(pos["new"][1] - initial[4][1]) < 0.1
+
+
+def test_zoomed_in_viewport_gets_nodes_and_their_edges():
+    graph = nx.les_miserables_graph()
+    index, pos = index_of(graph)
+    x_min, y_min, x_max, y_max = index.bounds()
+    bounds = [x_min, y_min, (x_min + x_max) / 2, (y_min + y_max) / 2]
+    view = index.query(graph, bounds, max_nodes=1000, max_edges=10000)
+    inside = {node for node, (x, y) in pos.items() if bounds[0] <= x <= bounds[2] and bounds[1] <= y <= bounds[3]}
+    assert view["level"] == "nodes" and not view["truncated"]
+    assert {node["id"] for node in view["nodes"]} == inside
+    assert {frozenset((edge["source"], edge["target"])) for edge in view["edges"]} == {
+        frozenset(edge) for edge in graph.subgraph(inside).edges}
+
+
+def test_zoomed_out_viewport_gets_communities_within_the_limits():
+    graph = nx.les_miserables_graph()
+    index, _ = index_of(graph)
+    view = index.query(graph, max_nodes=20, max_edges=5)
+    assert view["level"] == "communities"
+    assert len(view["nodes"]) <= 20 and len(view["edges"]) <= 5
+    # Every community is shown, only the edges between them were cut
+    assert sum(node["size"] for node in view["nodes"]) == graph.number_of_nodes()
+    assert view["truncated"]
+    # Limited to the best connected nodes when forced to the node level
+    view = index.query(graph, level="nodes", max_nodes=3, max_edges=100)
+    assert view["truncated"]
+    assert {node["id"] for node in view["nodes"]} == {node for node, _ in sorted(graph.degree, key=lambda item: -item[1])[:3]}